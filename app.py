@@ -10,8 +10,14 @@
 # 📦 IMPORTS SECTION
 # =============================================================================
 import os
+import sys
+import argparse
+import multiprocessing
+import signal
+import socket
 import tempfile
-import traceback
+import tarfile
+import zipfile
 import sqlite3
 import uuid
 import json
@@ -19,13 +25,52 @@ import re
 import math
 import glob
 import io
+import base64
+import time
+import queue
+import bisect
+import heapq
+import hashlib
+import mmap
+import itertools
+import colorsys
+import atexit
+import logging
+import functools
+import contextlib
+import threading
+import shutil
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
+from werkzeug.datastructures import MultiDict
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
 from werkzeug.utils import secure_filename
-from flask import Flask, request, jsonify, render_template, url_for, send_file
-from PIL import Image, ExifTags
+from flask import (Flask, Response, g, has_request_context, request, jsonify, render_template,
+                   stream_template, url_for, send_file, stream_with_context)
+from flask.json.provider import DefaultJSONProvider
+from PIL import Image, ImageOps, ExifTags
 from PIL.PngImagePlugin import PngInfo
 from PIL.ExifTags import TAGS, GPSTAGS
 
+# Optional faster JSON encoder for large listings
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Unix-only; elsewhere there is no pre-fork mode, so one process owns every side file
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 # =============================================================================
 # ⚙️ CONFIGURATION SECTION
 # =============================================================================
@@ -36,17 +81,457 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'svg'}
 MAX_IMAGE_SIZE = (1920, 1080)
 THUMBNAIL_SIZE = (400, 400)
 IMAGE_QUALITY = 85
+MAX_IMAGE_PIXELS = 100_000_000  # larger images are refused as decompression bombs
+DECODE_BUDGET_BYTES = int(os.environ.get('GALLERY_DECODE_BUDGET_MB', '512')) * 1024 * 1024  # split across serve workers
+DECODE_WORKING_COPIES = 2      # full-size copies alive while an upload is converted and resized
+DECODE_QUEUE_LIMIT = 16        # uploads waiting for decode budget before new ones get 503
+DECODE_QUEUE_WAIT = 30         # seconds an upload may wait for budget
+DECODE_RETRY_AFTER = 5         # Retry-After seconds sent with 503
+PLACEHOLDER_SIZE = (12, 12)    # tiny inline preview shown while thumbnails load
+PLACEHOLDER_QUALITY = 30
+DUPLICATE_RADIUS = 4           # max dHash bit distance treated as a near-duplicate
+SIMILAR_MAX_RADIUS = 16        # largest ?radius= for /similar; random 64-bit hashes are ~32 bits apart
+SIMILAR_MAX_RESULTS = 200      # cap on ?k= and on what a ?radius= query returns
+DUPLICATE_MAX_RADIUS = 6       # largest ?radius= the duplicate report accepts; cost grows steeply with it
+COLOR_LEVELS = 4               # quantization levels per RGB channel (4^3 = 64 histogram bins)
+COLOR_SAMPLE_SIZE = (64, 64)   # pixels sampled for the histogram
+PALETTE_SIZE = 5
+COLOR_TOLERANCE = 80           # RGB distance from a hex target that still counts as a match
+COLOR_MIN_SHARE = 0.3          # default fraction of the image that must match a color filter
+FACET_KINDS = ('model', 'sampler', 'scheduler', 'lora', 'steps', 'cfg', 'seed')
+COUNTED_FACETS = ('model', 'sampler', 'scheduler', 'lora', 'steps', 'cfg')  # seed is filter-only
+FACET_LIMIT = 50               # default values per facet returned by /api/facets
+PROMPT_INDEX_FOLDER = 'prompt_index'
+PROMPT_INDEX_COMPACT_MIN = 1000     # pending documents before the on-disk segment is rebuilt...
+PROMPT_INDEX_COMPACT_RATIO = 0.1    # ...or this fraction of it, whichever is larger
+SUGGEST_LIMIT = 8              # default suggestions per /api/suggest response
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_MIN_TOKEN_COUNT = 2    # prompt tokens must appear in this many artworks to be suggested
+SUGGEST_CACHE_SIZE = 2048      # cached prefix results
+IMPORT_BATCH_SIZE = 200        # rows committed per bulk-import transaction
+IMPORT_CHUNK_SIZE = 4          # files handed to a pool worker at a time
+EXPORT_CHUNK_SIZE = 1024 * 1024       # bytes of an original copied into the archive per step
+EXPORT_MANIFEST_SPOOL = 8 * 1024 * 1024  # manifest bytes kept in memory before spilling to disk
+RESIZE_SIZES = (64, 128, 160, 240, 320, 480, 640, 800, 960, 1080, 1280, 1600, 1920, 2560)  # allowed ?w= / ?h=
+RESIZE_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG', 'png': 'PNG'}
+RESIZE_CACHE_FOLDER = 'image_cache'
+RESIZE_CACHE_MAX_BYTES = int(os.environ.get('GALLERY_IMAGE_CACHE_MB', '512')) * 1024 * 1024
+RESIZE_CACHE_LOW_WATER = 0.9   # eviction frees space down to this fraction of the budget
+RESIZE_CACHE_TOUCH_INTERVAL = 60  # seconds between access-time updates of one entry
+RESIZE_MAX_AGE = 86400         # browser cache lifetime of /img responses whose ?v= names the current image
+THUMBNAIL_PACK_ENABLED = os.environ.get('GALLERY_THUMBNAIL_PACK', '0') == '1'
+THUMBNAIL_PACK_FOLDER = 'thumbnail_pack'
+THUMBNAIL_PACK_SEGMENT_BYTES = 256 * 1024 * 1024  # a segment is sealed once it would grow past this
+THUMBNAIL_PACK_COMPACT_RATIO = 0.5  # dead fraction of a sealed segment that triggers its compaction
+MEMORY_CACHE_BYTES = int(os.environ.get('GALLERY_MEMORY_CACHE_MB', '64')) * 1024 * 1024  # 0 disables
+MEMORY_CACHE_MAX_ENTRY = 4 * 1024 * 1024  # larger payloads (e.g. huge listings) are not kept
+MEMORY_CACHE_SHARED = os.environ.get('GALLERY_MEMORY_CACHE_SHARED', '0') == '1'  # one copy for all workers (serve turns it on)
+MEMORY_CACHE_SHARED_FOLDER = os.environ.get('GALLERY_MEMORY_CACHE_DIR', os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+    f'gallery-cache-{hashlib.blake2b(os.getcwd().encode(), digest_size=4).hexdigest()}'))
+SPRITE_PAGE_SIZE = 60          # default artworks per sprite sheet - one grid page
+SPRITE_MAX_PAGE_SIZE = 100
+SPRITE_MAX_PAGE = 1000000      # pages past the last row are empty anyway; keeps the OFFSET in range
+SPRITE_COLUMNS = 10            # THUMBNAIL_SIZE cells per sprite row
+SPRITE_QUALITY = 80
+SPRITE_RENDER_DELAY = 1.0      # seconds a render waits so a burst of uploads renders once
+METADATA_BATCH_MAX = 50        # ids per /api/metadata?ids= request
+METADATA_CACHE_SIZE = 1024     # extracted metadata dicts kept per process
+LIGHTBOX_WINDOW_RADIUS = 3     # default neighbours on each side in /api/lightbox/window
+LIGHTBOX_WINDOW_MAX = 10
+BULK_MAX_OPERATIONS = 5000      # operations accepted by one /api/artworks/bulk request
+GC_INTERVAL = 30               # seconds between storage collector runs
+GC_DELETE_GRACE = 60           # seconds a deleted/replaced original stays servable before removal
+GC_BATCH_SIZE = 500            # queued deletions handled per transaction
+GC_PAGE_SIZE = 1000            # files checked per reconciliation step
+GC_ORPHAN_MIN_AGE = 3600       # unreferenced files younger than this may be uploads in flight
+GC_RETRY_DELAY = 60            # base backoff after a failed deletion
+
+# Sort key shared by the a-z/z-a listings and their expression indexes -
+# the ORDER BY text must match the indexed expression for SQLite to use it
+UNTITLED_LAST = "CASE WHEN title IS NULL OR title = '' THEN 1 ELSE 0 END"
+
+# Listing payload: explicit columns plus the thumbnail URL computed in SQL
+# (rtrim/replace strips the directory part, like os.path.basename)
+ARTWORK_COLUMNS = ('id', 'title', 'description', 'image_path', 'position', 'created_at', 'updated_at', 'version',
+                   'width', 'height', 'byte_size', 'format', 'placeholder')
+THUMBNAIL_PATH_SQL = "'/thumbnail/' || replace(image_path, rtrim(image_path, replace(image_path, '/', '')), '')"
+ARTWORK_LISTING_SELECT = f"SELECT {', '.join(ARTWORK_COLUMNS)}, {THUMBNAIL_PATH_SQL} AS thumbnail_path FROM artworks"
+STREAM_BATCH_SIZE = 500        # rows fetched and flushed per chunk
+EVENT_POLL_INTERVAL = 0.5      # seconds between broker polls of the event log
+EVENT_HEARTBEAT_INTERVAL = 15  # seconds between SSE keep-alive comments
+EVENT_RETENTION = 10000        # events kept for Last-Event-ID resume
+EVENT_QUEUE_SIZE = 256         # per-subscriber backlog before it is dropped
+METRICS_ENABLED = os.environ.get('GALLERY_METRICS', '0') == '1'
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOG_LEVEL = os.environ.get('GALLERY_LOG_LEVEL', 'INFO').upper()
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('GALLERY_LOG_DEBUG_SAMPLE', '0.1'))  # fraction of DEBUG kept
+SERVE_WORKERS = os.cpu_count() or 1
+SERVE_THREADS = 16             # request threads per worker process
+SERVE_STREAMS = 64             # open /api/events streams per worker, each on a thread outside the pool
+SERVE_CLIENT_TIMEOUT = 15      # seconds a slow or silent client may hold a request thread
+SERVE_GRACEFUL_TIMEOUT = 30    # seconds workers get to finish in-flight requests on reload/stop
+LOG_QUEUE_SIZE = 10000         # records buffered before new ones are dropped
+
+# Pillow's own bomb check (a warning up to 2x, an error beyond) follows the same limit
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
 
 # Ensure upload and thumbnail directories exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(THUMBNAIL_FOLDER, exist_ok=True)
 
+# =============================================================================
+# 📜 LOGGING SECTION
+# =============================================================================
+logger = logging.getLogger('gallery')
+
+class StructuredFormatter(logging.Formatter):
+    """Append structured fields (artwork_id, stage, duration_ms, ...) as key=value"""
+    
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return line
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep every record above DEBUG and a deterministic 1-in-N of DEBUG ones"""
+    
+    def __init__(self, rate):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self.counter = 0
+    
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        if not self.every:
+            return False
+        self.counter += 1
+        return (self.counter - 1) % self.every == 0
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+    
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+log_listener = None
+
+def configure_logging(level=LOG_LEVEL, debug_sample_rate=LOG_DEBUG_SAMPLE_RATE):
+    """
+    Route the gallery logger through a queue drained by a background thread
+    Request threads only enqueue; the listener thread does the stdout I/O
+    """
+    global log_listener
+    if log_listener is not None:
+        return log_listener
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(StructuredFormatter('%(asctime)s %(levelname)s %(message)s'))
+    
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    queue_handler.addFilter(DebugSamplingFilter(debug_sample_rate))
+    
+    logger.setLevel(level)
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+    
+    log_listener = QueueListener(queue_handler.queue, stream_handler, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+    return log_listener
+
+def reconfigure_logging_after_fork():
+    """
+    A forked worker inherits the queue handler but not the listener thread
+    that drains it; give it a fresh queue and listener of its own
+    """
+    global log_listener
+    for handler in list(logger.handlers):
+        if isinstance(handler, DroppingQueueHandler):
+            logger.removeHandler(handler)
+    log_listener = None
+    return configure_logging()
+
+def log_event(level, message, **fields):
+    """Log a message with structured fields; skips all work when the level is off"""
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={'fields': fields})
+
+configure_logging()
+
+# =============================================================================
+# ⏱️ INSTRUMENTATION SECTION
+# =============================================================================
+class LatencyHistogram:
+    """
+    Thread-safe latency histogram keyed by a label tuple
+    Rendered in Prometheus text exposition format
+    """
+    
+    def __init__(self, label_names, buckets=LATENCY_BUCKETS):
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+    
+    def observe(self, labels, seconds):
+        idx = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][idx] += 1
+            series[1] += seconds
+            series[2] += 1
+    
+    def render(self, name, help_text):
+        lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        with self.lock:
+            snapshot = [(labels, list(s[0]), s[1], s[2]) for labels, s in sorted(self.series.items())]
+        for labels, counts, total, count in snapshot:
+            label_str = ','.join(f'{k}="{v}"' for k, v in zip(self.label_names, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{label_str},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{label_str},le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{{label_str}}} {total:.6f}')
+            lines.append(f'{name}_count{{{label_str}}} {count}')
+        return lines
+
+request_histogram = LatencyHistogram(('route', 'method'))
+stage_histogram = LatencyHistogram(('route', 'stage'))
+
+class StageTimer:
+    """Context manager that records elapsed time for one pipeline stage"""
+    __slots__ = ('stage', 'start')
+    
+    def __init__(self, stage):
+        self.stage = stage
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        record_stage(self.stage, time.perf_counter() - self.start)
+        return False
+
+class _NullTimer:
+    """Shared no-op timer used while metrics are disabled"""
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_TIMER = _NullTimer()
+
+def timed(stage):
+    """Return a timer for `with timed('stage'):` blocks"""
+    return StageTimer(stage) if METRICS_ENABLED else NULL_TIMER
+
+def timed_stage(stage):
+    """Decorator form of timed() for whole functions"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS_ENABLED:
+                return func(*args, **kwargs)
+            with StageTimer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_stage(stage, seconds):
+    """
+    Accumulate a stage duration on the current request
+    Work outside a request (startup, broker thread) goes straight to the histogram
+    """
+    if has_request_context():
+        timings = g.setdefault('stage_timings', {})
+        entry = timings.get(stage)
+        if entry is None:
+            timings[stage] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+    else:
+        stage_histogram.observe(('background', stage), seconds)
+
+def format_server_timing(timings, total):
+    """Build a Server-Timing header value from per-stage totals"""
+    parts = [
+        f'{stage};dur={seconds * 1000:.2f};desc="{count} calls"'
+        for stage, (seconds, count) in timings.items()
+    ]
+    parts.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(parts)
+
+def render_metrics():
+    """Render all collected metrics in Prometheus text format"""
+    lines = [
+        '# HELP gallery_metrics_enabled Whether timing instrumentation is active',
+        '# TYPE gallery_metrics_enabled gauge',
+        f'gallery_metrics_enabled {1 if METRICS_ENABLED else 0}'
+    ]
+    lines += request_histogram.render('gallery_request_duration_seconds', 'Request latency per route')
+    lines += stage_histogram.render('gallery_stage_duration_seconds', 'Time spent per stage per request')
+    lines += decode_admission.render('gallery_decode_admission')
+    stats = memory_cache.stats()
+    backend = stats.pop('backend')
+    for name, value in stats.items():
+        kind = 'counter' if name in ('hits', 'misses', 'evictions') else 'gauge'
+        suffix = '_total' if kind == 'counter' else ''
+        lines += [f'# TYPE gallery_memory_cache_{name}{suffix} {kind}',
+                  f'gallery_memory_cache_{name}{suffix}{{backend="{backend}"}} {value}']
+    return '\n'.join(lines) + '\n'
+
+class QueryRecorder:
+    """
+    Records every statement run on the current thread's gallery connections
+    Used by the query-budget harness to catch N+1 patterns and plan regressions
+    """
+    
+    def __init__(self):
+        self.queries = []
+    
+    def record(self, sql, parameters, seconds, many=False):
+        self.queries.append({
+            'sql': ' '.join(sql.split()),
+            'parameters': parameters,
+            'seconds': seconds,
+            'many': many,
+            'plan': None
+        })
+    
+    def explain(self, conn):
+        """Attach EXPLAIN QUERY PLAN rows to every recorded data statement"""
+        plans = {}
+        for query in self.queries:
+            sql = query['sql']
+            if sql.split(' ', 1)[0].upper() not in ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH'):
+                continue
+            if sql not in plans:
+                try:
+                    rows = conn.execute('EXPLAIN QUERY PLAN ' + sql, query['parameters']).fetchall()
+                    plans[sql] = [row[-1] for row in rows]
+                except sqlite3.Error as e:
+                    plans[sql] = [f'EXPLAIN failed: {e}']
+            query['plan'] = plans[sql]
+        return self
+    
+    @property
+    def count(self):
+        return len(self.queries)
+    
+    def full_scans(self):
+        """
+        Queries whose plan reads a whole table without an index
+        (json_each over a bound id list is a scan of the parameter, not a table)
+        """
+        return [q for q in self.queries if q['plan'] and any(
+            step.startswith('SCAN ') and ' USING ' not in step and 'VIRTUAL TABLE' not in step
+            for step in q['plan'])]
+    
+    def temp_sorts(self):
+        """Queries that need a temporary B-tree to sort or group"""
+        return [q for q in self.queries if q['plan'] and any(
+            step.startswith('USE TEMP B-TREE') for step in q['plan'])]
+    
+    def repeated(self, threshold=3):
+        """Identical statements run at least threshold times - the N+1 signature"""
+        counts = {}
+        for q in self.queries:
+            counts[q['sql']] = counts.get(q['sql'], 0) + 1
+        return {sql: n for sql, n in counts.items() if n >= threshold}
+
+_query_context = threading.local()
+
+@contextlib.contextmanager
+def record_queries():
+    """
+    Install a QueryRecorder on the current thread
+    
+        with record_queries() as recorder:
+            client.get('/api/artworks')
+        recorder.explain(get_db_connection())
+    """
+    previous = getattr(_query_context, 'recorder', None)
+    recorder = QueryRecorder()
+    _query_context.recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _query_context.recorder = previous
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that times serialization as the 'serialize' stage"""
+    
+    def response(self, *args, **kwargs):
+        with timed('serialize'):
+            return super().response(*args, **kwargs)
+
 # =============================================================================
 # 🗄️ DATABASE FUNCTIONS SECTION
 # =============================================================================
+class GalleryConnection(sqlite3.Connection):
+    """
+    sqlite3 connection that times statements as the 'db' stage and feeds
+    the thread's QueryRecorder when one is installed
+    """
+    
+    def execute(self, sql, parameters=()):
+        recorder = getattr(_query_context, 'recorder', None)
+        if recorder is None and not METRICS_ENABLED:
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - start
+            if METRICS_ENABLED:
+                record_stage('db', elapsed)
+            if recorder is not None:
+                recorder.record(sql, parameters, elapsed)
+    
+    def executemany(self, sql, seq_of_parameters):
+        recorder = getattr(_query_context, 'recorder', None)
+        if recorder is None and not METRICS_ENABLED:
+            return super().executemany(sql, seq_of_parameters)
+        if recorder is not None:
+            seq_of_parameters = list(seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            elapsed = time.perf_counter() - start
+            if METRICS_ENABLED:
+                record_stage('db', elapsed)
+            if recorder is not None:
+                recorder.record(sql, seq_of_parameters[0] if seq_of_parameters else (), elapsed, many=True)
+    
+    def commit(self):
+        if not METRICS_ENABLED:
+            return super().commit()
+        with StageTimer('db'):
+            return super().commit()
+
 def get_db_connection():
     """Get database connection with row factory"""
-    conn = sqlite3.connect('database.db')
+    conn = sqlite3.connect('database.db', factory=GalleryConnection)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -75,12 +560,386 @@ def init_db():
         conn.execute('UPDATE artworks SET position = id')
         conn.commit()
     
+    # Add row-version columns for delta sync and initialize
+    cur.execute("PRAGMA table_info(artworks)")
+    cols = [row[1] for row in cur.fetchall()]
+    if 'version' not in cols:
+        conn.execute('ALTER TABLE artworks ADD COLUMN updated_at TIMESTAMP')
+        conn.execute('ALTER TABLE artworks ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+        conn.execute('ALTER TABLE artworks ADD COLUMN created_version INTEGER NOT NULL DEFAULT 1')
+        conn.execute('ALTER TABLE artworks ADD COLUMN content_version INTEGER NOT NULL DEFAULT 1')
+        conn.execute('UPDATE artworks SET updated_at = created_at')
+        conn.commit()
+
+    # Add image info columns (dimensions, size, format, inline placeholder)
+    cur.execute("PRAGMA table_info(artworks)")
+    cols = [row[1] for row in cur.fetchall()]
+    if 'placeholder' not in cols:
+        conn.execute('ALTER TABLE artworks ADD COLUMN width INTEGER')
+        conn.execute('ALTER TABLE artworks ADD COLUMN height INTEGER')
+        conn.execute('ALTER TABLE artworks ADD COLUMN byte_size INTEGER')
+        conn.execute('ALTER TABLE artworks ADD COLUMN format TEXT')
+        conn.execute('ALTER TABLE artworks ADD COLUMN placeholder TEXT')
+        conn.commit()
+
+    # Add color histogram (64 uint8 bins) and palette (packed RGB triples) columns
+    cur.execute("PRAGMA table_info(artworks)")
+    cols = [row[1] for row in cur.fetchall()]
+    for column in ('color_histogram', 'palette'):
+        if column not in cols:
+            conn.execute(f'ALTER TABLE artworks ADD COLUMN {column} BLOB')
+    conn.commit()
+    
+    # Add perceptual hash column (64-bit dHash stored as signed INTEGER)
+    cur.execute("PRAGMA table_info(artworks)")
+    cols = [row[1] for row in cur.fetchall()]
+    if 'phash' not in cols:
+        conn.execute('ALTER TABLE artworks ADD COLUMN phash INTEGER')
+        conn.commit()
+
+    # Add facet extraction marker (rows without AI metadata have no facet rows)
+    cur.execute("PRAGMA table_info(artworks)")
+    cols = [row[1] for row in cur.fetchall()]
+    if 'facets_indexed' not in cols:
+        conn.execute('ALTER TABLE artworks ADD COLUMN facets_indexed INTEGER NOT NULL DEFAULT 0')
+        conn.commit()
+    
+    # Add prompt text columns; re-run metadata extraction so existing rows get them
+    cur.execute("PRAGMA table_info(artworks)")
+    cols = [row[1] for row in cur.fetchall()]
+    if 'prompt' not in cols:
+        conn.execute('ALTER TABLE artworks ADD COLUMN prompt TEXT')
+        conn.execute('ALTER TABLE artworks ADD COLUMN negative_prompt TEXT')
+        conn.execute('UPDATE artworks SET facets_indexed = 0')
+        conn.commit()
+    
+    # Generation-parameter facets and their maintained counts
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS artwork_facets (
+        facet TEXT NOT NULL,
+        value TEXT NOT NULL COLLATE NOCASE,
+        artwork_id INTEGER NOT NULL,
+        PRIMARY KEY (facet, value, artwork_id)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS facet_counts (
+        facet TEXT NOT NULL,
+        value TEXT NOT NULL COLLATE NOCASE,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (facet, value)
+    ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_artwork_facets_artwork ON artwork_facets(artwork_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_facet_counts_rank ON facet_counts(facet, count DESC, value)')
+    conn.commit()
+    
+    # Source files already ingested by the bulk importer (resume checkpoint)
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS imported_files (
+        source_path TEXT PRIMARY KEY,
+        artwork_id INTEGER NOT NULL,
+        imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    conn.commit()
+    
+    # Deferred file deletions and the storage reconciliation cursor
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS pending_deletes (
+        path TEXT PRIMARY KEY,
+        due_at REAL NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT
+    ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS storage_gc_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        folder TEXT NOT NULL,
+        cursor TEXT NOT NULL
+    )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO storage_gc_state (id, folder, cursor) VALUES (1, ?, ?)', (UPLOAD_FOLDER, ''))
+    # Sorted snapshot of the folder being reconciled, taken when its pass starts
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS storage_gc_listing (
+        name TEXT PRIMARY KEY
+    ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_pending_deletes_due ON pending_deletes(due_at)')
+    conn.commit()
+    
+    # Gallery-wide version counter and tombstones for deleted artworks
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS gallery_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO gallery_state (id, version) VALUES (1, 1)')
+    # Random per-database id, so cache keys built from the version cannot
+    # match entries left by another database (e.g. one reset or restored)
+    cols = [row[1] for row in conn.execute('PRAGMA table_info(gallery_state)')]
+    if 'nonce' not in cols:
+        conn.execute('ALTER TABLE gallery_state ADD COLUMN nonce TEXT')
+    conn.execute('UPDATE gallery_state SET nonce = ? WHERE nonce IS NULL', (uuid.uuid4().hex,))
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS artwork_tombstones (
+        artwork_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL,
+        deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    conn.commit()
+    
     # Add indexes for better performance
     conn.execute('CREATE INDEX IF NOT EXISTS idx_position ON artworks(position)')
     conn.execute('CREATE INDEX IF NOT EXISTS idx_created_at ON artworks(created_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_version ON artworks(version)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tombstone_version ON artwork_tombstones(version)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_image_path ON artworks(image_path)')
+    
+    # Expression indexes for the title sorts (untitled last, case-insensitive)
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_title_az ON artworks({UNTITLED_LAST}, LOWER(title))')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_title_za ON artworks({UNTITLED_LAST}, LOWER(title) DESC)')
+    conn.commit()
+    
+    # Refresh planner statistics for the new indexes
+    conn.execute('PRAGMA optimize')
+
+    # Append-only change log shared by all worker processes (SSE feed)
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS gallery_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_type TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
     conn.commit()
     conn.close()
 
+def bump_gallery_version(conn):
+    """
+    Advance the gallery-wide version inside the caller's transaction
+    Every row written by the same transaction shares the returned version
+    """
+    conn.execute('UPDATE gallery_state SET version = version + 1 WHERE id = 1')
+    return conn.execute('SELECT version FROM gallery_state WHERE id = 1').fetchone()[0]
+
+def get_gallery_version(conn):
+    """Return the current gallery-wide version"""
+    row = conn.execute('SELECT version FROM gallery_state WHERE id = 1').fetchone()
+    return row[0] if row else 0
+
+def get_gallery_stamp(conn):
+    """(version, nonce) - the version qualified by the database it belongs to"""
+    row = conn.execute('SELECT version, nonce FROM gallery_state WHERE id = 1').fetchone()
+    return (row[0], row[1]) if row else (0, '')
+
+# =============================================================================
+# 📡 EVENT BROKER SECTION
+# =============================================================================
+def publish_event(conn, event_type, payload):
+    """
+    Append a change event inside the caller's transaction
+    The event becomes visible to every worker process once the caller commits
+    """
+    cursor = conn.execute(
+        'INSERT INTO gallery_events (event_type, payload) VALUES (?, ?)',
+        (event_type, json.dumps(payload))
+    )
+    # Trim the log now and then so it stays a bounded resume window
+    if cursor.lastrowid % 100 == 0:
+        conn.execute('DELETE FROM gallery_events WHERE id <= ?',
+                     (cursor.lastrowid - EVENT_RETENTION,))
+    return cursor.lastrowid
+
+class EventBroker:
+    """
+    Fan-out broker for gallery change events
+    One thread per process tails the gallery_events table and pushes new rows
+    to local subscriber queues, so any worker's writes reach every client
+    """
+    
+    def __init__(self, poll_interval=EVENT_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.last_id = None
+        self.thread = None
+        self.closed = False
+    
+    def notify(self):
+        """Wake the poller after a local commit instead of waiting a full interval"""
+        self.wakeup.set()
+    
+    def subscribe(self):
+        q = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+        with self.lock:
+            if self.closed:
+                q.put_nowait(None)
+                return q
+            self.subscribers.add(q)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='event-broker', daemon=True)
+                self.thread.start()
+        return q
+    
+    def unsubscribe(self, q):
+        with self.lock:
+            self.subscribers.discard(q)
+    
+    def _end(self, q):
+        """Unsubscribe a queue and make None the next thing its stream reads"""
+        self.unsubscribe(q)
+        while not q.empty():
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                break
+        q.put_nowait(None)
+    
+    def close(self):
+        """End every open stream, and any opened later, so a stopping worker can drain"""
+        with self.lock:
+            self.closed = True
+            subscribers = list(self.subscribers)
+        for q in subscribers:
+            self._end(q)
+    
+    def replay(self, after_id):
+        """
+        Return (events, complete) for ids after after_id
+        complete is False when the requested id fell out of the retention window
+        """
+        conn = get_db_connection()
+        oldest = conn.execute('SELECT MIN(id) FROM gallery_events').fetchone()[0]
+        rows = conn.execute(
+            'SELECT id, event_type, payload FROM gallery_events WHERE id > ? ORDER BY id',
+            (after_id,)
+        ).fetchall()
+        conn.close()
+        complete = oldest is None or oldest <= after_id + 1
+        return [(r['id'], r['event_type'], r['payload']) for r in rows], complete
+    
+    def _run(self):
+        conn = get_db_connection()
+        if self.last_id is None:
+            self.last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM gallery_events').fetchone()[0]
+        try:
+            while True:
+                self.wakeup.wait(self.poll_interval)
+                self.wakeup.clear()
+                
+                with self.lock:
+                    if not self.subscribers:
+                        self.thread = None
+                        return
+                
+                rows = conn.execute(
+                    'SELECT id, event_type, payload FROM gallery_events WHERE id > ? ORDER BY id',
+                    (self.last_id,)
+                ).fetchall()
+                if not rows:
+                    continue
+                self.last_id = rows[-1]['id']
+                events = [(r['id'], r['event_type'], r['payload']) for r in rows]
+                
+                with self.lock:
+                    subscribers = list(self.subscribers)
+                for q in subscribers:
+                    for event in events:
+                        try:
+                            q.put_nowait(event)
+                        except queue.Full:
+                            # Slow client - drop it, it will resume with Last-Event-ID
+                            self._end(q)
+                            break
+        except Exception as e:
+            log_event(logging.ERROR, "❌ Event broker error", error=e)
+            with self.lock:
+                self.thread = None
+        finally:
+            conn.close()
+
+event_broker = EventBroker()
+
+def format_sse(event_id, event_type, payload):
+    """Format one Server-Sent Events frame"""
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+
+# =============================================================================
+# 📤 SERIALIZATION SECTION
+# =============================================================================
+def encode_json(obj):
+    """Compact JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def iter_artworks(conn, sql, params=(), close=False, batch_size=STREAM_BATCH_SIZE):
+    """
+    Yield artwork dicts from a listing query without materialising the result
+    Closes the connection when exhausted if close=True (for streamed responses)
+    """
+    try:
+        cursor = conn.execute(sql, params)
+        columns = [d[0] for d in cursor.description]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(zip(columns, row))
+    finally:
+        if close:
+            conn.close()
+
+def stream_artwork_listing(conn, sql, params, envelope, batch_size=STREAM_BATCH_SIZE, cache_key=None, etag=None):
+    """
+    Stream {**envelope, "artworks": [...], "count": N} row by row
+    The first bytes go out before the query finishes and memory stays flat;
+    count comes last because it is only known once the cursor is drained.
+    With cache_key, a body small enough for the memory cache is kept there
+    once it has been sent in full
+    """
+    def body():
+        head = encode_json(envelope)
+        yield head[:-1] + (b',"artworks":[' if envelope else b'"artworks":[')
+        count = 0
+        chunk = []
+        for artwork in iter_artworks(conn, sql, params, close=True, batch_size=batch_size):
+            chunk.append(encode_json(artwork))
+            if len(chunk) >= batch_size:
+                yield (b',' if count else b'') + b','.join(chunk)
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            yield (b',' if count else b'') + b','.join(chunk)
+            count += len(chunk)
+        yield b'],"count":' + str(count).encode() + b'}'
+    
+    def generate():
+        kept, size = [], 0
+        for chunk in body():
+            if kept is not None and cache_key:
+                size += len(chunk)
+                if size > MEMORY_CACHE_MAX_ENTRY:
+                    kept = None
+                else:
+                    kept.append(chunk)
+            yield chunk
+        if kept is not None and cache_key:
+            memory_cache.put(cache_key, b''.join(kept), etag, 'application/json')
+    
+    response = Response(generate(), mimetype='application/json')
+    if etag:
+        response.set_etag(etag)
+    return response
+
 # =============================================================================
 # 🛠️ UTILITY FUNCTIONS SECTION
 # =============================================================================
@@ -116,8 +975,10 @@ def cleanup_old_files(image_path):
             thumb_path = image_path.replace('/uploads/', '/thumbnails/')
             if os.path.exists(thumb_path):
                 os.remove(thumb_path)
+            if THUMBNAIL_PACK_ENABLED:
+                thumbnail_pack.discard([os.path.basename(image_path)])
         except OSError as e:
-            print(f"Error removing files: {e}")
+            log_event(logging.WARNING, "Error removing files", path=image_path, error=e)
 
 def ensure_directories():
     """Ensure upload and thumbnail directories exist"""
@@ -135,37 +996,187 @@ def get_file_size_formatted(size_bytes):
         i += 1
     return f"{size_bytes:.1f}{size_names[i]}"
 
-def cleanup_orphaned_files():
-    """Remove files that don't have corresponding database entries"""
-    # Get all image paths from database
+# =============================================================================
+# 🧹 STORAGE GC SECTION
+# =============================================================================
+def _queue_deletes(conn, paths, due_at):
+    conn.executemany('INSERT OR IGNORE INTO pending_deletes (path, due_at) VALUES (?, ?)',
+                     [(path, due_at) for path in paths])
+
+def enqueue_file_deletes(conn, image_paths, delay=GC_DELETE_GRACE):
+    """
+    Queue originals and their thumbnails for deletion inside the caller's
+    transaction - files only go once the row change has committed, and stay
+    servable for a grace period to clients still showing them
+    """
+    paths = []
+    for image_path in image_paths:
+        if image_path and image_path.startswith('static/uploads/'):
+            paths.extend([image_path, image_path.replace('/uploads/', '/thumbnails/', 1)])
+    if paths:
+        _queue_deletes(conn, paths, time.time() + delay)
+        invalidate_thumbnails(paths)
+
+def collect_pending_deletes(conn, batch_size=GC_BATCH_SIZE):
+    """
+    Delete queued files that are due, a batch per transaction
+    Paths referenced again by an artwork are dropped from the queue untouched;
+    failures are retried with exponential backoff
+    """
+    removed = 0
+    while True:
+        now = time.time()
+        rows = conn.execute(
+            'SELECT path, attempts FROM pending_deletes WHERE due_at <= ? ORDER BY due_at LIMIT ?',
+            (now, batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        originals = [row['path'].replace('/thumbnails/', '/uploads/', 1) for row in rows]
+        referenced = {r[0] for r in conn.execute(
+            'SELECT image_path FROM artworks WHERE image_path IN (SELECT value FROM json_each(?))',
+            (json.dumps(originals),)
+        )}
+        done = []
+        failed = []
+        gone = [os.path.basename(row['path']) for row, original in zip(rows, originals)
+                if original not in referenced and row['path'].startswith(f'{THUMBNAIL_FOLDER}/')]
+        if THUMBNAIL_PACK_ENABLED:
+            thumbnail_pack.discard(gone)
+        invalidate_thumbnails(gone)
+        for row, original in zip(rows, originals):
+            if original not in referenced:
+                try:
+                    os.remove(row['path'])
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    retry_at = now + GC_RETRY_DELAY * 2 ** min(row['attempts'], 6)
+                    failed.append((retry_at, str(e), row['path']))
+                    continue
+            done.append((row['path'],))
+        conn.executemany('DELETE FROM pending_deletes WHERE path = ?', done)
+        conn.executemany(
+            'UPDATE pending_deletes SET attempts = attempts + 1, due_at = ?, last_error = ? WHERE path = ?',
+            failed
+        )
+        conn.commit()
+        for _retry_at, error, path in failed:
+            log_event(logging.WARNING, "⚠️ Deferred delete failed", path=path, error=error)
+        if len(rows) < batch_size:
+            break
+    return removed
+
+def reconcile_storage_page(conn, page_size=GC_PAGE_SIZE, min_age=GC_ORPHAN_MIN_AGE):
+    """
+    Check the next page of file names after the saved cursor in the uploads or
+    thumbnails folder and queue the ones no artwork references
+    
+    The folder is listed once when its pass starts, streamed into the
+    storage_gc_listing table; each step then reads one page of that snapshot
+    past the cursor, so memory is bounded by page_size and a full pass costs
+    one directory scan rather than one per page. Files added mid-pass are
+    picked up by the next one.
+    Returns (folder, files checked, orphans queued, True when the folder pass ended)
+    """
+    folder, cursor = conn.execute('SELECT folder, cursor FROM storage_gc_state WHERE id = 1').fetchone()
+    if not cursor:
+        conn.execute('DELETE FROM storage_gc_listing')
+        try:
+            with os.scandir(folder) as entries:
+                conn.executemany('INSERT INTO storage_gc_listing (name) VALUES (?)',
+                                 ((e.name,) for e in entries if e.is_file()))
+        except FileNotFoundError:
+            pass
+    names = [row[0] for row in conn.execute(
+        'SELECT name FROM storage_gc_listing WHERE name > ? ORDER BY name LIMIT ?', (cursor, page_size)
+    )]
+    
+    # Thumbnails mirror their original's file name
+    originals = [f'static/uploads/{name}' for name in names]
+    referenced = {r[0] for r in conn.execute(
+        'SELECT image_path FROM artworks WHERE image_path IN (SELECT value FROM json_each(?))',
+        (json.dumps(originals),)
+    )}
+    cutoff = time.time() - min_age
+    orphans = []
+    for name, original in zip(names, originals):
+        path = f'{folder}/{name}'
+        if original in referenced:
+            continue
+        try:
+            if os.stat(path).st_mtime > cutoff:
+                continue
+        except FileNotFoundError:
+            continue
+        orphans.append(path)
+    _queue_deletes(conn, orphans, 0)
+    
+    finished = len(names) < page_size
+    if finished:
+        next_folder, cursor = (THUMBNAIL_FOLDER if folder == UPLOAD_FOLDER else UPLOAD_FOLDER), ''
+    else:
+        next_folder, cursor = folder, names[-1]
+    conn.execute('UPDATE storage_gc_state SET folder = ?, cursor = ? WHERE id = 1', (next_folder, cursor))
+    conn.commit()
+    return folder, len(names), len(orphans), finished
+
+def cleanup_orphaned_files(min_age=GC_ORPHAN_MIN_AGE):
+    """Run reconciliation through both folders, then delete what is due; returns files removed"""
     conn = get_db_connection()
-    db_paths = set()
-    artworks = conn.execute('SELECT image_path FROM artworks').fetchall()
-    for artwork in artworks:
-        db_paths.add(artwork['image_path'])
-    conn.close()
+    try:
+        conn.execute('UPDATE storage_gc_state SET folder = ?, cursor = ? WHERE id = 1', (UPLOAD_FOLDER, ''))
+        passes = orphans = 0
+        while passes < 2:
+            _folder, _checked, queued, finished = reconcile_storage_page(conn, min_age=min_age)
+            orphans += queued
+            passes += finished
+        removed = collect_pending_deletes(conn)
+    finally:
+        conn.close()
+    log_event(logging.INFO, "🧹 Storage reconciled", orphans=orphans, removed=removed)
+    return removed
+
+class StorageCollector:
+    """
+    Background thread that drains the deferred-delete queue and advances the
+    reconciliation cursor by one page every GC_INTERVAL seconds
+    """
     
-    # Check files in upload folder
-    upload_files = glob.glob(os.path.join(UPLOAD_FOLDER, '*'))
-    removed_count = 0
+    def __init__(self, interval=GC_INTERVAL):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
     
-    for file_path in upload_files:
-        relative_path = file_path.replace('\\', '/')  # Normalize path separators
-        if relative_path not in db_paths:
-            try:
-                os.remove(file_path)
-                removed_count += 1
-                
-                # Also remove corresponding thumbnail
-                filename = os.path.basename(file_path)
-                thumb_path = os.path.join(THUMBNAIL_FOLDER, filename)
-                if os.path.exists(thumb_path):
-                    os.remove(thumb_path)
-                    
-            except OSError as e:
-                print(f"Error removing orphaned file {file_path}: {e}")
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.stopped.clear()
+                self.thread = threading.Thread(target=self._run, name='storage-gc', daemon=True)
+                self.thread.start()
+    
+    def stop(self):
+        self.stopped.set()
     
-    return removed_count
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            conn = get_db_connection()
+            try:
+                removed = collect_pending_deletes(conn)
+                folder, checked, orphans, finished = reconcile_storage_page(conn)
+                if removed or orphans:
+                    log_event(logging.INFO, "🧹 Storage collected", removed=removed,
+                              orphans=orphans, folder=folder, checked=checked)
+                if THUMBNAIL_PACK_ENABLED:
+                    thumbnail_pack.compact()
+            except Exception as e:
+                log_event(logging.ERROR, "❌ Storage collector error", error=e)
+            finally:
+                conn.close()
+
+storage_collector = StorageCollector()
 
 # =============================================================================
 # 🖼️ IMAGE PROCESSING UTILITIES SECTION
@@ -174,6 +1185,17 @@ def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def open_image(fp, decode=False):
+    """
+    Open an image, timing header parsing (and pixel decode if requested)
+    as the 'decode' stage
+    """
+    with timed('decode'):
+        img = Image.open(fp)
+        if decode:
+            img.load()
+    return img
+
 def extract_all_metadata(img):
     """
     Extract both EXIF and PNG metadata from PIL Image object
@@ -189,7 +1211,7 @@ def extract_all_metadata(img):
             if exif_dict:
                 exif_bytes = img.info.get('exif')
     except Exception as e:
-        print(f"EXIF extraction error: {e}")
+        log_event(logging.WARNING, "EXIF extraction error", error=e)
     
     try:
         # Extract PNG info
@@ -204,21 +1226,23 @@ def extract_all_metadata(img):
                     if isinstance(value, (str, int, float)):
                         pnginfo.add_text(str(key), str(value))
                 except Exception as e:
-                    print(f"PNG metadata key {key} skipped: {e}")
+                    log_event(logging.DEBUG, "PNG metadata key skipped", key=key, error=e)
     except Exception as e:
-        print(f"PNG info extraction error: {e}")
+        log_event(logging.WARNING, "PNG info extraction error", error=e)
     
     return exif_bytes, pnginfo
 
+@timed_stage('optimize')
 def optimize_image_with_metadata(file_stream, max_size=MAX_IMAGE_SIZE, quality=IMAGE_QUALITY):
     """
     Optimized version that properly preserves ALL metadata
     """
+    started = time.perf_counter()
     try:
         # Save original position
         original_position = file_stream.tell()
         
-        img = Image.open(file_stream)
+        img = open_image(file_stream, decode=True)
         original_format = img.format
         
         # Extract ALL metadata BEFORE any modifications
@@ -265,29 +1289,34 @@ def optimize_image_with_metadata(file_stream, max_size=MAX_IMAGE_SIZE, quality=I
         img.save(output, **save_kwargs)
         output.seek(0)
         
-        print(f"✅ Image optimized: {original_format} → {save_kwargs['format']}, metadata preserved")
+        log_event(logging.DEBUG, "✅ Image optimized, metadata preserved", stage='optimize',
+                  src=original_format, dst=save_kwargs['format'],
+                  duration_ms=f"{(time.perf_counter() - started) * 1000:.1f}")
         return output
         
     except Exception as e:
-        print(f"❌ Image optimization error: {e}")
+        log_event(logging.ERROR, "❌ Image optimization error", stage='optimize', error=e)
         # Reset file stream and return original
         file_stream.seek(original_position)
         return file_stream
 
+@timed_stage('thumbnail')
 def create_thumbnail_with_metadata(original_path, thumb_size=THUMBNAIL_SIZE):
     """
     Create thumbnail preserving ALL metadata
     """
+    started = time.perf_counter()
     try:
         # Create thumbnail directory
         thumb_dir = original_path.replace('/uploads/', '/thumbnails/')
-        os.makedirs(os.path.dirname(thumb_dir), exist_ok=True)
+        if not THUMBNAIL_PACK_ENABLED:
+            os.makedirs(os.path.dirname(thumb_dir), exist_ok=True)
         
         # Skip if thumbnail exists
-        if os.path.exists(thumb_dir):
+        if os.path.exists(thumb_dir) or (THUMBNAIL_PACK_ENABLED and thumbnail_pack.lookup(os.path.basename(thumb_dir))):
             return thumb_dir
             
-        img = Image.open(original_path)
+        img = open_image(original_path, decode=True)
         original_format = img.format
         
         # Extract metadata from original
@@ -325,22 +1354,117 @@ def create_thumbnail_with_metadata(original_path, thumb_size=THUMBNAIL_SIZE):
             if exif_bytes:
                 save_kwargs['exif'] = exif_bytes
         
-        img.save(thumb_dir, **save_kwargs)
-        print(f"✅ Thumbnail created with metadata: {thumb_dir}")
+        if THUMBNAIL_PACK_ENABLED:
+            buffer = io.BytesIO()
+            img.save(buffer, **save_kwargs)
+            thumbnail_pack.append(os.path.basename(thumb_dir), buffer.getvalue())
+        else:
+            img.save(thumb_dir, **save_kwargs)
+        log_event(logging.DEBUG, "✅ Thumbnail created with metadata", stage='thumbnail', path=thumb_dir,
+                  duration_ms=f"{(time.perf_counter() - started) * 1000:.1f}")
         
         return thumb_dir
         
     except Exception as e:
-        print(f"❌ Thumbnail creation error: {e}")
+        log_event(logging.ERROR, "❌ Thumbnail creation error", stage='thumbnail', path=original_path, error=e)
         return None
 
-def ensure_thumbnails_exist():
-    """Generate thumbnails for existing images"""
-    uploads = glob.glob('static/uploads/*')
-    
-    for upload in uploads:
-        if any(upload.endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']):
-            create_thumbnail_with_metadata(upload)
+def thumbnail_source(image_path):
+    """
+    The thumbnail of an upload to decode in place of the original: a loose
+    file path, a BytesIO of its packed bytes, or None when there is none yet
+    """
+    thumb_path = image_path.replace('/uploads/', '/thumbnails/')
+    if thumb_path == image_path:
+        return None
+    if THUMBNAIL_PACK_ENABLED:
+        data = thumbnail_pack.read(os.path.basename(thumb_path))
+        if data is not None:
+            return io.BytesIO(data)
+    return thumb_path if os.path.exists(thumb_path) else None
+
+@timed_stage('image_info')
+def compute_image_info(image_path):
+    """
+    Collect width, height, byte size, format and a tiny base64 WebP placeholder
+    The placeholder is downscaled from the thumbnail when one exists
+    """
+    info = {'width': None, 'height': None, 'byte_size': None, 'format': None, 'placeholder': None}
+    try:
+        info['byte_size'] = os.path.getsize(image_path)
+    except OSError:
+        return info
+    
+    if image_path.lower().endswith('.svg'):
+        info['format'] = 'SVG'
+        return info
+    
+    try:
+        img = open_image(image_path)
+        info.update(width=img.width, height=img.height, format=img.format)
+        
+        thumb = thumbnail_source(image_path)
+        src = open_image(thumb) if thumb else img
+        src.draft('RGB', PLACEHOLDER_SIZE)  # JPEG decodes at reduced scale
+        src.thumbnail(PLACEHOLDER_SIZE, Image.Resampling.BILINEAR)
+        
+        tiny = src.convert('RGBA')
+        background = Image.new('RGB', tiny.size, (255, 255, 255))
+        background.paste(tiny, mask=tiny.split()[-1])
+        
+        output = io.BytesIO()
+        background.save(output, format='WEBP', quality=PLACEHOLDER_QUALITY)
+        info['placeholder'] = 'data:image/webp;base64,' + base64.b64encode(output.getvalue()).decode('ascii')
+    except Exception as e:
+        log_event(logging.WARNING, "⚠️ Image info extraction error", path=image_path, error=e)
+    
+    return info
+
+def backfill_image_info(batch_size=200):
+    """
+    Compute image info for artworks stored before it existed
+    Walks by id so missing files can't stall it. The columns are part of the
+    listing payload, so each batch is stamped with a new gallery version for
+    delta sync and version-keyed caches to pick up
+    """
+    conn = get_db_connection()
+    last_id = 0
+    filled = 0
+    while True:
+        rows = conn.execute(
+            'SELECT id, image_path FROM artworks WHERE byte_size IS NULL AND id > ? ORDER BY id LIMIT ?',
+            (last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        updates = []
+        for row in rows:
+            info = compute_image_info(row['image_path'])
+            if info['byte_size'] is not None:
+                updates.append((info['width'], info['height'], info['byte_size'],
+                                info['format'], info['placeholder'], row['id']))
+        if updates:
+            version = bump_gallery_version(conn)
+            conn.executemany(
+                'UPDATE artworks SET width = ?, height = ?, byte_size = ?, format = ?, placeholder = ?,'
+                ' version = ?, content_version = ? WHERE id = ?',
+                [update[:-1] + (version, version, update[-1]) for update in updates]
+            )
+        conn.commit()
+        filled += len(updates)
+    conn.close()
+    if filled:
+        log_event(logging.INFO, "✅ Image info backfilled", artworks=filled)
+    return filled
+
+def ensure_thumbnails_exist():
+    """Generate thumbnails for existing images"""
+    uploads = glob.glob('static/uploads/*')
+    
+    for upload in uploads:
+        if any(upload.endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']):
+            create_thumbnail_with_metadata(upload)
 
 # Backward compatibility aliases
 def optimize_image(file_stream, max_size=MAX_IMAGE_SIZE, quality=IMAGE_QUALITY):
@@ -351,6 +1475,850 @@ def create_thumbnail(original_path, thumb_size=THUMBNAIL_SIZE):
     """Backward compatibility - redirects to create_thumbnail_with_metadata"""
     return create_thumbnail_with_metadata(original_path, thumb_size)
 
+@timed_stage('resize')
+def render_resized(original_path, width, height, fit, fmt):
+    """
+    Encoded rendition of an original using the thumbnail LANCZOS pipeline
+    'contain' fits inside width x height (0 = unbounded) without upscaling,
+    'cover' crops to exactly width x height. Metadata is not carried over
+    """
+    img = open_image(original_path, decode=True)
+    has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+    if has_alpha and fmt != 'jpeg':
+        img = img.convert('RGBA')
+    elif has_alpha:
+        rgba = img.convert('RGBA')
+        img = Image.new('RGB', img.size, (255, 255, 255))
+        img.paste(rgba, mask=rgba.split()[-1])
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+    
+    if fit == 'cover':
+        img = ImageOps.fit(img, (width, height), Image.Resampling.LANCZOS)
+    else:
+        unbounded = max(img.size)
+        img.thumbnail((width or unbounded, height or unbounded), Image.Resampling.LANCZOS)
+    
+    save_kwargs = {
+        'webp': {'quality': 80, 'method': 4},
+        'jpeg': {'quality': 85, 'optimize': True, 'progressive': True},
+        'png': {'optimize': True, 'compress_level': 6},
+    }[fmt]
+    buffer = io.BytesIO()
+    img.save(buffer, format=RESIZE_FORMATS[fmt], **save_kwargs)
+    return buffer.getvalue()
+
+# =============================================================================
+# 🚦 ADMISSION CONTROL SECTION
+# =============================================================================
+class AdmissionRejected(Exception):
+    """An upload turned away before decoding: too large (413) or server busy (503)"""
+    
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+class DecodeAdmission:
+    """
+    Byte-weighted semaphore over the estimated decode memory of this process
+    
+    Uploads take their estimate from the budget for as long as they run. When
+    it is used up they wait in arrival order, at most queue_limit of them for
+    at most wait seconds; beyond that they get 503 + Retry-After, so a burst
+    slows down instead of running a worker out of memory. An upload estimated
+    above the whole budget is admitted alone
+    """
+    
+    def __init__(self, budget=DECODE_BUDGET_BYTES, queue_limit=DECODE_QUEUE_LIMIT, wait=DECODE_QUEUE_WAIT):
+        self.budget = budget
+        self.queue_limit = queue_limit
+        self.wait = wait
+        self.in_use = 0
+        self.waiters = deque()  # one token per waiting upload, oldest first
+        self.admitted = self.rejected = 0
+        self.condition = threading.Condition()
+    
+    def _busy(self, message):
+        self.rejected += 1
+        return AdmissionRejected(503, message, DECODE_RETRY_AFTER)
+    
+    def acquire(self, cost):
+        """Reserve cost bytes, waiting if needed; returns the amount to release"""
+        cost = min(cost, self.budget)
+        with self.condition:
+            # Newcomers queue behind waiters instead of overtaking them, so a
+            # large upload is not starved by a stream of small ones
+            if self.waiters or self.in_use + cost > self.budget:
+                if len(self.waiters) >= self.queue_limit:
+                    raise self._busy('Server is busy processing images, please retry')
+                token = object()
+                self.waiters.append(token)
+                deadline = time.monotonic() + self.wait
+                try:
+                    while self.waiters[0] is not token or self.in_use + cost > self.budget:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise self._busy('Timed out waiting to process the image, please retry')
+                        self.condition.wait(remaining)
+                finally:
+                    self.waiters.remove(token)
+                    self.condition.notify_all()  # the next in line may fit now
+            self.in_use += cost
+            self.admitted += 1
+            return cost
+    
+    def release(self, cost):
+        with self.condition:
+            self.in_use -= cost
+            self.condition.notify_all()
+    
+    @contextlib.contextmanager
+    def admit(self, cost):
+        cost = self.acquire(cost)
+        try:
+            yield
+        finally:
+            self.release(cost)
+    
+    def render(self, name):
+        with self.condition:
+            values = {'bytes_in_use': self.in_use, 'budget_bytes': self.budget, 'waiting': len(self.waiters),
+                      'admitted_total': self.admitted, 'rejected_total': self.rejected}
+        lines = []
+        for key, value in values.items():
+            lines += [f'# TYPE {name}_{key} {"counter" if key.endswith("_total") else "gauge"}',
+                      f'{name}_{key} {value}']
+        return lines
+
+decode_admission = DecodeAdmission()
+
+def estimate_decode_bytes(stream):
+    """
+    Memory an upload needs while it is processed, from its header alone:
+    width x height x bands for each working copy. Headers Pillow cannot read
+    cost nothing here and fail later in the normal pipeline
+    """
+    position = stream.tell()
+    try:
+        with Image.open(stream) as img:
+            pixels = img.width * img.height
+            bands = len(img.getbands())
+    except Image.DecompressionBombError as e:
+        raise AdmissionRejected(413, f'Image too large: {e}')
+    except Exception:
+        return 0
+    finally:
+        stream.seek(position)
+    if pixels > MAX_IMAGE_PIXELS:
+        raise AdmissionRejected(413, f'Image too large: {pixels:,} pixels exceeds the {MAX_IMAGE_PIXELS:,} limit')
+    # Palette and greyscale images are converted to RGB(A) on the way
+    return pixels * max(bands, 3) * DECODE_WORKING_COPIES
+
+def admit_image_upload(view):
+    """
+    Run an upload view under decode_admission, sized from the header of its
+    'image' file; requests without one (or with an SVG) pass straight through
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        file = request.files.get('image')
+        if file is None or not file.filename or file.filename.lower().endswith('.svg'):
+            return view(*args, **kwargs)
+        try:
+            cost = decode_admission.acquire(estimate_decode_bytes(file.stream))
+        except AdmissionRejected as e:
+            log_event(logging.WARNING, "🚦 Upload rejected", status=e.status, reason=str(e))
+            response = jsonify({'success': False, 'message': str(e)})
+            response.status_code = e.status
+            if e.retry_after:
+                response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        try:
+            return view(*args, **kwargs)
+        finally:
+            decode_admission.release(cost)
+    return wrapper
+
+# =============================================================================
+# 🗜️ RESIZE CACHE SECTION
+# =============================================================================
+class ResizeCache:
+    """
+    Size-capped disk cache of resized renditions with LRU eviction
+    
+    The access-time index is its own SQLite file in WAL mode, so all worker
+    processes share one byte budget. Files are written under a temp name and
+    renamed into place, so readers never see a partial image
+    """
+    
+    def __init__(self, folder=RESIZE_CACHE_FOLDER, max_bytes=RESIZE_CACHE_MAX_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.ready = False
+    
+    def _connect(self):
+        if not self.ready:
+            os.makedirs(self.folder, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.folder, 'index.db'), timeout=10, isolation_level=None)
+        if not self.ready:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            ) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access)')
+            conn.execute('CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 1), bytes INTEGER NOT NULL)')
+            conn.execute('INSERT OR IGNORE INTO totals (id, bytes) VALUES (1, 0)')
+            self.ready = True
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+    
+    def path(self, key):
+        return os.path.join(self.folder, key)
+    
+    def open(self, key):
+        """
+        Open file of a cached rendition, or None on a miss
+        The access time is only written when older than RESIZE_CACHE_TOUCH_INTERVAL,
+        so hot entries cost a read, not a write
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT last_access FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            try:
+                fp = open(self.path(key), 'rb')
+            except FileNotFoundError:
+                return None  # evicted by another process in between
+            now = time.time()
+            if now - row[0] > RESIZE_CACHE_TOUCH_INTERVAL:
+                conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+            return fp
+        finally:
+            conn.close()
+    
+    def put(self, key, data):
+        """Store a rendition, then evict least recently used entries past the byte budget"""
+        path = self.path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        
+        evicted = []
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            old = conn.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+            conn.execute('INSERT OR REPLACE INTO entries (key, size, last_access) VALUES (?, ?, ?)',
+                         (key, len(data), time.time()))
+            conn.execute('UPDATE totals SET bytes = bytes + ? WHERE id = 1', (len(data) - (old[0] if old else 0),))
+            total = conn.execute('SELECT bytes FROM totals WHERE id = 1').fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - int(self.max_bytes * RESIZE_CACHE_LOW_WATER)
+                freed = 0
+                for victim, size in conn.execute(
+                    'SELECT key, size FROM entries WHERE key != ? ORDER BY last_access', (key,)
+                ).fetchmany(10000):
+                    evicted.append(victim)
+                    freed += size
+                    if freed >= excess:
+                        break
+                conn.executemany('DELETE FROM entries WHERE key = ?', [(victim,) for victim in evicted])
+                conn.execute('UPDATE totals SET bytes = bytes - ? WHERE id = 1', (freed,))
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        
+        for victim in evicted:
+            try:
+                os.remove(self.path(victim))
+            except FileNotFoundError:
+                pass
+        if evicted:
+            log_event(logging.DEBUG, "🗜️ Resize cache evicted", entries=len(evicted))
+
+resize_cache = ResizeCache()
+
+# =============================================================================
+# 📦 THUMBNAIL PACK SECTION
+# =============================================================================
+class ThumbnailPack:
+    """
+    Append-only thumbnail store (enabled with GALLERY_THUMBNAIL_PACK=1)
+    
+    Thumbnails are appended to numbered segment files and located through a
+    (name -> segment, offset, length, etag) index in its own SQLite file, so
+    serving one is an indexed lookup plus a slice of a memory-mapped segment
+    instead of an open() of one small file per request. Replaced and deleted
+    entries leave dead bytes behind until compact() rewrites their segment
+    """
+    
+    def __init__(self, folder=THUMBNAIL_PACK_FOLDER, segment_bytes=THUMBNAIL_PACK_SEGMENT_BYTES):
+        self.folder = folder
+        self.segment_bytes = segment_bytes
+        self.ready = False
+        self.maps = {}  # segment -> mmap, shared by this process's threads
+        self.lock = threading.Lock()
+        self.local = threading.local()
+    
+    def _reader(self):
+        """
+        This thread's long-lived connection for lookups, so serving a thumbnail
+        does not open one per request; one inherited across fork() is replaced
+        """
+        pid, conn = getattr(self.local, 'reader', (None, None))
+        if pid != os.getpid():
+            conn = self._connect()
+            self.local.reader = (os.getpid(), conn)
+        return conn
+    
+    def _connect(self):
+        if not self.ready:
+            os.makedirs(self.folder, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.folder, 'index.db'), timeout=10, isolation_level=None)
+        if not self.ready:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                name TEXT PRIMARY KEY,
+                segment INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                etag TEXT NOT NULL
+            ) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_segment ON entries(segment)')
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS segments (
+                id INTEGER PRIMARY KEY,
+                bytes INTEGER NOT NULL,
+                dead_bytes INTEGER NOT NULL DEFAULT 0
+            )
+            ''')
+            self.ready = True
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+    
+    def segment_path(self, segment):
+        return os.path.join(self.folder, f'{segment:06d}.pack')
+    
+    def lookup(self, name):
+        """(segment, offset, length, etag) of a packed thumbnail, or None"""
+        return self._reader().execute('SELECT segment, offset, length, etag FROM entries WHERE name = ?',
+                                      (name,)).fetchone()
+    
+    def slice(self, entry):
+        """
+        Bytes of an entry from the segment's mapping; a mapping made before the
+        segment grew past the entry is replaced by a fresh one
+        """
+        segment, offset, length, _etag = entry
+        with self.lock:
+            mapped = self.maps.get(segment)
+            if mapped is None or len(mapped) < offset + length:
+                with open(self.segment_path(segment), 'rb') as f:
+                    fresh = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if mapped is not None:
+                    mapped.close()
+                self.maps[segment] = mapped = fresh
+            return mapped[offset:offset + length]
+    
+    def read(self, name):
+        """Bytes of a packed thumbnail, or None"""
+        entry = self.lookup(name)
+        if entry is None:
+            return None
+        try:
+            return self.slice(entry)
+        except FileNotFoundError:
+            return None  # segment compacted away in between
+    
+    def _append(self, conn, name, data, etag):
+        """Write data at the end of the active segment inside the caller's write transaction"""
+        active = conn.execute('SELECT id, bytes FROM segments ORDER BY id DESC LIMIT 1').fetchone()
+        if active is None or (active[1] and active[1] + len(data) > self.segment_bytes):
+            segment, offset = (active[0] + 1 if active else 1), 0
+            conn.execute('INSERT INTO segments (id, bytes) VALUES (?, 0)', (segment,))
+        else:
+            segment, offset = active
+        # The index, not the file size, is authoritative: bytes left by an
+        # append that never committed are simply overwritten
+        fd = os.open(self.segment_path(segment), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.pwrite(fd, data, offset)
+        finally:
+            os.close(fd)
+        old = conn.execute('SELECT segment, length FROM entries WHERE name = ?', (name,)).fetchone()
+        if old:
+            conn.execute('UPDATE segments SET dead_bytes = dead_bytes + ? WHERE id = ?', (old[1], old[0]))
+        conn.execute('INSERT OR REPLACE INTO entries (name, segment, offset, length, etag) VALUES (?, ?, ?, ?, ?)',
+                     (name, segment, offset, len(data), etag))
+        conn.execute('UPDATE segments SET bytes = ? WHERE id = ?', (offset + len(data), segment))
+    
+    def append(self, name, data):
+        """Pack a thumbnail, replacing any previous version; returns its etag"""
+        etag = hashlib.blake2b(data, digest_size=8).hexdigest()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')  # one appender at a time across processes
+            self._append(conn, name, data, etag)
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return etag
+    
+    def discard(self, names):
+        """Drop entries; their bytes stay in the segment as dead space until compaction"""
+        if not names:
+            return
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            names = json.dumps(list(names))
+            dead = conn.execute(
+                'SELECT segment, SUM(length) FROM entries WHERE name IN (SELECT value FROM json_each(?)) '
+                'GROUP BY segment', (names,)
+            ).fetchall()
+            conn.execute('DELETE FROM entries WHERE name IN (SELECT value FROM json_each(?))', (names,))
+            conn.executemany('UPDATE segments SET dead_bytes = dead_bytes + ? WHERE id = ?',
+                             [(length, segment) for segment, length in dead])
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+    
+    def compact(self, ratio=THUMBNAIL_PACK_COMPACT_RATIO, limit=1):
+        """
+        Rewrite up to limit sealed segments whose dead fraction exceeds ratio:
+        live entries are copied to the active segment and the old file removed.
+        Each segment moves in one write transaction, so readers either find the
+        old location (still mapped) or the new one. Returns bytes reclaimed
+        """
+        reclaimed = 0
+        conn = self._connect()
+        try:
+            candidates = conn.execute(
+                'SELECT id, bytes, dead_bytes FROM segments WHERE id < (SELECT MAX(id) FROM segments) '
+                'AND (dead_bytes > bytes * ? OR dead_bytes >= bytes) ORDER BY dead_bytes DESC LIMIT ?',
+                (ratio, limit)
+            ).fetchall()
+            for segment, size, dead_bytes in candidates:
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    live = conn.execute('SELECT name, offset, length, etag FROM entries WHERE segment = ?',
+                                        (segment,)).fetchall()
+                    if live:
+                        with open(self.segment_path(segment), 'rb') as f:
+                            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as source:
+                                for name, offset, length, etag in live:
+                                    self._append(conn, name, source[offset:offset + length], etag)
+                    conn.execute('DELETE FROM segments WHERE id = ?', (segment,))
+                    conn.execute('COMMIT')
+                except Exception:
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    raise
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self.segment_path(segment))
+                with self.lock:
+                    mapped = self.maps.pop(segment, None)
+                    if mapped is not None:
+                        mapped.close()
+                reclaimed += dead_bytes
+                log_event(logging.INFO, "📦 Thumbnail segment compacted", segment=segment,
+                          live=len(live), reclaimed=dead_bytes, size=size)
+        finally:
+            conn.close()
+        return reclaimed
+    
+    def pack_folder(self, folder=THUMBNAIL_FOLDER, remove_files=False):
+        """Append the loose thumbnail files not packed yet; returns how many were packed"""
+        packed = 0
+        with os.scandir(folder) as entries:
+            names = sorted(e.name for e in entries if e.is_file())
+        for name in names:
+            path = os.path.join(folder, name)
+            if self.lookup(name) is None:
+                with open(path, 'rb') as f:
+                    self.append(name, f.read())
+                packed += 1
+            if remove_files:
+                os.remove(path)
+        return packed
+
+thumbnail_pack = ThumbnailPack()
+
+# =============================================================================
+# 🧠 MEMORY CACHE SECTION
+# =============================================================================
+class MemoryCache:
+    """
+    Byte-budgeted LRU of (data, etag, mimetype) entries held in this process
+    Sits in front of thumbnail serving and small listing payloads
+    """
+    
+    def __init__(self, max_bytes=MEMORY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self.lock = threading.Lock()
+    
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+    
+    def put(self, key, data, etag, mimetype):
+        if len(data) > min(MEMORY_CACHE_MAX_ENTRY, self.max_bytes // 8):
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old[0])
+            self.entries[key] = (data, etag, mimetype)
+            self.bytes += len(data)
+            while self.bytes > self.max_bytes:
+                _key, (evicted, _etag, _mimetype) = self.entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+    
+    def invalidate(self, keys):
+        with self.lock:
+            for key in keys:
+                old = self.entries.pop(key, None)
+                if old is not None:
+                    self.bytes -= len(old[0])
+    
+    def stats(self):
+        with self.lock:
+            return {'backend': 'process', 'entries': len(self.entries), 'bytes': self.bytes,
+                    'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions}
+
+class SharedMemoryCache:
+    """
+    MemoryCache interface over one arena file in shared memory (/dev/shm), so
+    every worker process reads the same copy of an entry
+    
+    The arena is a ring: entries are written at the head, which wraps to the
+    start when full, and whatever they overwrite is evicted - recency is
+    approximated by insertion order. The index is a SQLite file beside it;
+    readers check a checksum, so bytes overwritten between lookup and copy
+    count as a miss instead of being served. Hit/miss counts are per process
+    """
+    
+    def __init__(self, folder=MEMORY_CACHE_SHARED_FOLDER, max_bytes=MEMORY_CACHE_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.ready = False
+        self.arena = None
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+    
+    def _connection(self):
+        """
+        This thread's long-lived index connection - cache hits are too cheap to
+        pay for opening one each; one inherited across fork() is replaced
+        """
+        pid, conn = getattr(self.local, 'conn', (None, None))
+        if pid != os.getpid():
+            conn = self._connect()
+            self.local.conn = (os.getpid(), conn)
+        return conn
+    
+    def _connect(self):
+        if not self.ready:
+            os.makedirs(self.folder, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.folder, 'index.db'), timeout=10, isolation_level=None)
+        if not self.ready:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                checksum TEXT NOT NULL,
+                etag TEXT NOT NULL,
+                mimetype TEXT NOT NULL
+            ) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_offset ON entries(offset)')
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS ring (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                head INTEGER NOT NULL,
+                evictions INTEGER NOT NULL
+            )
+            ''')
+            conn.execute('INSERT OR IGNORE INTO ring (id, head, evictions) VALUES (1, 0, 0)')
+            with self.lock:
+                if self.arena is None:
+                    fd = os.open(os.path.join(self.folder, 'arena'), os.O_RDWR | os.O_CREAT, 0o600)
+                    try:
+                        if os.fstat(fd).st_size < self.max_bytes:
+                            os.ftruncate(fd, self.max_bytes)
+                        self.arena = mmap.mmap(fd, self.max_bytes)
+                    finally:
+                        os.close(fd)
+            self.ready = True
+        conn.execute('PRAGMA synchronous=OFF')  # contents are disposable
+        return conn
+    
+    @staticmethod
+    def _checksum(data):
+        return hashlib.blake2b(data, digest_size=8).hexdigest()
+    
+    def get(self, key):
+        if not self.max_bytes:
+            return None
+        row = self._connection().execute('SELECT offset, length, checksum, etag, mimetype FROM entries WHERE key = ?',
+                                         (key,)).fetchone()
+        data = self.arena[row[0]:row[0] + row[1]] if row else None
+        if data is None or self._checksum(data) != row[2]:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data, row[3], row[4]
+    
+    def put(self, key, data, etag, mimetype):
+        if not self.max_bytes or len(data) > min(MEMORY_CACHE_MAX_ENTRY, self.max_bytes // 8):
+            return
+        conn = self._connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            head = conn.execute('SELECT head FROM ring WHERE id = 1').fetchone()[0]
+            if head + len(data) > self.max_bytes:
+                head = 0
+            end = head + len(data)
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            # Entries start at most MEMORY_CACHE_MAX_ENTRY before anything they overlap
+            evicted = conn.execute(
+                'DELETE FROM entries WHERE offset > ? AND offset < ? AND offset + length > ?',
+                (head - MEMORY_CACHE_MAX_ENTRY - 1, end, head)
+            ).rowcount
+            self.arena[head:end] = data
+            conn.execute('INSERT INTO entries (key, offset, length, checksum, etag, mimetype) VALUES (?, ?, ?, ?, ?, ?)',
+                         (key, head, len(data), self._checksum(data), etag, mimetype))
+            conn.execute('UPDATE ring SET head = ?, evictions = evictions + ? WHERE id = 1', (end, evicted))
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+    
+    def clear(self):
+        """Drop every entry, e.g. ones a previous server left in the arena"""
+        if not self.max_bytes:
+            return
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('DELETE FROM entries')
+        conn.execute('UPDATE ring SET head = 0 WHERE id = 1')
+        conn.execute('COMMIT')
+    
+    def invalidate(self, keys):
+        if not self.max_bytes:
+            return
+        self._connection().execute('DELETE FROM entries WHERE key IN (SELECT value FROM json_each(?))',
+                                   (json.dumps(list(keys)),))
+    
+    def stats(self):
+        if not self.max_bytes:
+            entries, size, evictions = 0, 0, 0
+        else:
+            conn = self._connection()
+            entries, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(length), 0) FROM entries').fetchone()
+            evictions = conn.execute('SELECT evictions FROM ring WHERE id = 1').fetchone()[0]
+        return {'backend': 'shared', 'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': evictions}
+
+memory_cache = SharedMemoryCache() if MEMORY_CACHE_SHARED else MemoryCache()
+
+def invalidate_thumbnails(paths):
+    """Drop the memory-cached thumbnails of uploads or thumbnail paths (or bare file names)"""
+    memory_cache.invalidate([f'thumbnail:{os.path.basename(path)}' for path in paths])
+
+def thumbnail_mimetype(data):
+    """Thumbnails are PNG for PNG sources and JPEG otherwise, whatever the file name says"""
+    return 'image/png' if data[:4] == b'\x89PNG' else 'image/jpeg'
+
+def load_thumbnail(filename):
+    """
+    (data, etag, mimetype) of a thumbnail from the pack or its file, creating
+    it if missing. With the pack enabled it is asked first, so a packed
+    thumbnail costs one index lookup and no stat of the thumbnails folder
+    """
+    thumb_path = f"static/thumbnails/{filename}"
+    original_path = f"static/uploads/{filename}"
+    data = None
+    if THUMBNAIL_PACK_ENABLED:
+        entry = thumbnail_pack.lookup(filename)
+        if entry is None and not os.path.exists(thumb_path) and os.path.exists(original_path):
+            create_thumbnail_with_metadata(original_path)
+            entry = thumbnail_pack.lookup(filename)
+        if entry is not None:
+            try:
+                data = thumbnail_pack.slice(entry)
+                return data, entry[3], thumbnail_mimetype(data)
+            except FileNotFoundError:
+                data = thumbnail_pack.read(filename)  # segment compacted in between
+    if data is None:
+        if not os.path.exists(thumb_path) and os.path.exists(original_path):
+            create_thumbnail_with_metadata(original_path)
+        try:
+            with open(thumb_path, 'rb') as f:
+                data = f.read()
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+    return data, hashlib.blake2b(data, digest_size=8).hexdigest(), thumbnail_mimetype(data)
+
+# =============================================================================
+# 🧩 SPRITE SHEET SECTION
+# =============================================================================
+def sprite_page_key(conn, sort, page, per_page):
+    """
+    Rows of one gallery page in a WINDOW_SORTS order and the cache key of its
+    sprite. The key hashes each row's id, image and version, so it changes
+    exactly when an artwork on that page is added, edited, moved or removed
+    """
+    keys = WINDOW_SORTS[sort]
+    order = ', '.join(f'{expr} {direction}' for expr, direction in keys)
+    rows = conn.execute(
+        f'SELECT id, image_path, version FROM artworks ORDER BY {order}, id {keys[-1][1]} LIMIT ? OFFSET ?',
+        (per_page, page * per_page)
+    ).fetchall()
+    digest = hashlib.blake2b(json.dumps([tuple(row) for row in rows]).encode(), digest_size=8).hexdigest()
+    return rows, f'sprite-{sort}-{page}-{per_page}-{digest}'
+
+@timed_stage('sprite')
+def render_sprite(rows):
+    """
+    Compose the thumbnails of a page into one WebP of SPRITE_COLUMNS
+    THUMBNAIL_SIZE cells per row; returns (data, layout) with each tile's id
+    and rectangle. Artworks without a decodable image (e.g. SVG) are left out
+    """
+    tiles = []
+    for row in rows:
+        image_path = row['image_path']
+        if image_path.lower().endswith('.svg') or not os.path.exists(image_path):
+            continue
+        source = thumbnail_source(image_path)
+        if source is None:
+            create_thumbnail_with_metadata(image_path)
+            source = thumbnail_source(image_path) or image_path
+        try:
+            img = open_image(source, decode=True)
+            img.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)  # only shrinks an original fallback
+            tiles.append((row['id'], img))
+        except Exception as e:
+            log_event(logging.DEBUG, "Sprite tile skipped", path=image_path, error=e)
+    
+    has_alpha = any(img.mode in ('RGBA', 'LA') or 'transparency' in img.info for _id, img in tiles)
+    cell_width, cell_height = THUMBNAIL_SIZE
+    columns = max(1, min(SPRITE_COLUMNS, len(tiles)))
+    sheet = Image.new('RGBA' if has_alpha else 'RGB',
+                      (columns * cell_width, max(1, math.ceil(len(tiles) / columns)) * cell_height),
+                      (255, 255, 255, 0) if has_alpha else (255, 255, 255))
+    layout = []
+    for index, (artwork_id, img) in enumerate(tiles):
+        x, y = (index % columns) * cell_width, (index // columns) * cell_height
+        sheet.paste(img.convert(sheet.mode), (x, y))
+        layout.append({'id': artwork_id, 'x': x, 'y': y, 'w': img.width, 'h': img.height})
+    
+    buffer = io.BytesIO()
+    sheet.save(buffer, format='WEBP', quality=SPRITE_QUALITY, method=4)
+    return buffer.getvalue(), {'width': sheet.width, 'height': sheet.height, 'tiles': layout}
+
+def build_sprite(sort, page, per_page, render=True):
+    """
+    Key and layout of a page's current sprite. Layout and image live in the
+    resize cache, so sprites of pages that changed age out of its LRU. A
+    missing sprite is rendered, or with render=False its layout is None.
+    A page past the end has no sprite and an empty layout
+    """
+    conn = get_db_connection()
+    try:
+        rows, key = sprite_page_key(conn, sort, page, per_page)
+    finally:
+        conn.close()
+    if not rows:
+        return None, {'tiles': []}
+    fp = resize_cache.open(f'{key}.json')
+    if fp is not None:
+        with fp:
+            layout = json.load(fp)
+        image = resize_cache.open(f'{key}.webp')
+        if image is not None:
+            image.close()
+            return key, layout
+    if not render:
+        return key, None
+    data, layout = render_sprite(rows)
+    resize_cache.put(f'{key}.webp', data)
+    resize_cache.put(f'{key}.json', encode_json(layout))
+    return key, layout
+
+class SpriteRenderer:
+    """
+    Background thread that renders sprites off the request path. Requests for
+    a page are coalesced, and each render waits SPRITE_RENDER_DELAY so a burst
+    of uploads costs one render of the final state
+    """
+    
+    def __init__(self, delay=SPRITE_RENDER_DELAY):
+        self.delay = delay
+        self.pending = set()  # (sort, page, per_page)
+        self.condition = threading.Condition()
+        self.thread = None
+    
+    def request(self, sort, page, per_page):
+        with self.condition:
+            self.pending.add((sort, page, per_page))
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='sprite-renderer', daemon=True)
+                self.thread.start()
+            self.condition.notify()
+    
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+            time.sleep(self.delay)
+            with self.condition:
+                pages, self.pending = self.pending, set()
+            for sort, page, per_page in pages:
+                try:
+                    build_sprite(sort, page, per_page)
+                except Exception as e:
+                    log_event(logging.ERROR, "❌ Sprite render failed", sort=sort, page=page, error=e)
+
+sprite_renderer = SpriteRenderer()
+
 # =============================================================================
 # 🤖 AI METADATA EXTRACTION SECTION
 # =============================================================================
@@ -445,29 +2413,31 @@ def parse_ai_text_parameters(params_text):
     
     return metadata
 
+@timed_stage('metadata')
 def extract_ai_metadata_detailed(image_path):
     """
     Enhanced extraction for AI-generation metadata only
     Supports: SwarmUI, A1111, ComfyUI, Evoke formats
     """
-    print(f"🔍 Extracting AI metadata from: {image_path}")
+    log_event(logging.DEBUG, "🔍 Extracting AI metadata", stage='metadata', path=image_path)
+    started = time.perf_counter()
     metadata = {}
     
     try:
-        img = Image.open(image_path)
-        print(f"📷 Opened: {img.format} {img.width}x{img.height}")
+        img = open_image(image_path)
+        log_event(logging.DEBUG, "📷 Opened", format=img.format, size=f"{img.width}x{img.height}")
 
         # 1. Priority: PNG parameters (most common for AI images)
         if img.format == 'PNG' and hasattr(img, 'info') and img.info:
             if 'parameters' in img.info:
                 params = img.info['parameters']
-                print(f"📝 Found PNG parameters field")
+                log_event(logging.DEBUG, "📝 Found PNG parameters field")
                 
                 # Try JSON parse first (SwarmUI format)
                 try:
                     data = json.loads(params)
                     if 'sui_image_params' in data:
-                        print("✅ Detected SwarmUI format")
+                        log_event(logging.DEBUG, "✅ Detected SwarmUI format")
                         sui_params = data['sui_image_params']
                         sui_extra = data.get('sui_extra_data', {})
                         
@@ -502,7 +2472,7 @@ def extract_ai_metadata_detailed(image_path):
                     else:
                         # Try ComfyUI format
                         if 'prompt' in data:
-                            print("✅ Detected ComfyUI format")
+                            log_event(logging.DEBUG, "✅ Detected ComfyUI format")
                             metadata['prompt'] = str(data.get('prompt', ''))
                             if 'workflow' in data:
                                 # Extract from workflow nodes
@@ -511,7 +2481,7 @@ def extract_ai_metadata_detailed(image_path):
                                 pass
                         
                 except json.JSONDecodeError:
-                    print("📄 Parsing as text format (A1111/Evoke)")
+                    log_event(logging.DEBUG, "📄 Parsing as text format (A1111/Evoke)")
                     # Parse A1111/Evoke text format
                     metadata.update(parse_ai_text_parameters(params))
             
@@ -535,7 +2505,7 @@ def extract_ai_metadata_detailed(image_path):
                                 if key not in metadata or not metadata[key]:
                                     metadata[key] = value
         except Exception as e:
-            print(f"⚠️ EXIF parsing error: {e}")
+            log_event(logging.WARNING, "⚠️ EXIF parsing error", path=image_path, error=e)
         
         # 3. Calculate aspect ratio if not present
         if metadata.get('width') and metadata.get('height') and not metadata.get('aspect_ratio'):
@@ -551,19 +2521,29 @@ def extract_ai_metadata_detailed(image_path):
             metadata['width'] = str(img.width)
             metadata['height'] = str(img.height)
         
-        print(f"✅ Extracted AI metadata fields: {list(metadata.keys())}")
+        log_event(logging.DEBUG, "✅ Extracted AI metadata", stage='metadata', path=image_path,
+                  fields=len(metadata), duration_ms=f"{(time.perf_counter() - started) * 1000:.1f}")
         return metadata
         
     except Exception as e:
-        print(f"❌ Error extracting AI metadata: {e}")
+        log_event(logging.ERROR, "❌ Error extracting AI metadata", stage='metadata', path=image_path, error=e)
         return {}
 
+@functools.lru_cache(maxsize=METADATA_CACHE_SIZE)
+def cached_ai_metadata(image_path):
+    """
+    extract_ai_metadata_detailed memoized by path - uploads get a new uuid
+    name whenever the image changes, so a path's metadata never goes stale
+    """
+    return extract_ai_metadata_detailed(image_path)
+
+@timed_stage('metadata')
 def extract_and_store_metadata_separately(image_path):
     """
     IMPROVED: Extract all PNG and EXIF metadata into a flat dict
     """
     try:
-        img = Image.open(image_path)
+        img = open_image(image_path)
         metadata = {}
 
         # PNG info - improved handling
@@ -582,7 +2562,7 @@ def extract_and_store_metadata_separately(image_path):
                     else:
                         metadata[f'png_{key}'] = str(value)
                 except Exception as e:
-                    print(f"PNG metadata key {key} error: {e}")
+                    log_event(logging.DEBUG, "PNG metadata key error", key=key, error=e)
 
         # EXIF - improved handling
         try:
@@ -601,15 +2581,15 @@ def extract_and_store_metadata_separately(image_path):
                         else:
                             metadata[f'exif_{tag}'] = str(val)
                     except Exception as e:
-                        print(f"EXIF tag {tag} error: {e}")
+                        log_event(logging.DEBUG, "EXIF tag error", tag=tag, error=e)
         except Exception as e:
-            print(f"EXIF extraction error: {e}")
+            log_event(logging.WARNING, "EXIF extraction error", error=e)
 
-        print(f"📊 Extracted {len(metadata)} metadata fields from {image_path}")
+        log_event(logging.DEBUG, "📊 Extracted metadata fields", stage='metadata', path=image_path, fields=len(metadata))
         return metadata
         
     except Exception as e:
-        print(f"❌ Error extracting metadata from {image_path}: {e}")
+        log_event(logging.ERROR, "❌ Error extracting metadata", stage='metadata', path=image_path, error=e)
         return {}
 
 def process_uploaded_image(uploaded_file_path, save_path, thumbnail_path=None):
@@ -640,102 +2620,1755 @@ def process_uploaded_image(uploaded_file_path, save_path, thumbnail_path=None):
         if thumbnail_path:
             create_thumbnail_with_metadata(save_path)
 
-        print(f"✅ Image processed successfully: {save_path}")
-        print(f"📊 Metadata keys preserved: {list(original_metadata.keys())}")
+        log_event(logging.DEBUG, "✅ Image processed successfully", path=save_path,
+                  metadata_keys=len(original_metadata))
+        
+        return original_metadata
+        
+    except Exception as e:
+        log_event(logging.ERROR, "❌ Upload processing failed", path=save_path, error=e)
+        return {}
+
+# =============================================================================
+# 🏷️ FACETS SECTION
+# =============================================================================
+MODEL_EXTENSIONS = ('.safetensors', '.ckpt', '.pt', '.pth', '.bin', '.gguf')
+
+def _model_name(value):
+    """'models/Stable-diffusion/sdxl_base_1.0.safetensors' -> 'sdxl_base_1.0'"""
+    name = re.split(r'[\\/]', value.strip())[-1]
+    for extension in MODEL_EXTENSIONS:
+        if name.lower().endswith(extension):
+            return name[:-len(extension)]
+    return name
+
+def extract_facets(metadata):
+    """
+    Normalized (facet, value) pairs from extract_ai_metadata_detailed output
+    LoRA weights are dropped so 'detail_tweaker:0.8' and ':1.0' share a facet value
+    """
+    facets = []
+    
+    def add(facet, value):
+        value = str(value).strip()[:200]
+        if value:
+            facets.append((facet, value))
+    
+    if metadata.get('model'):
+        add('model', _model_name(metadata['model']))
+    for facet in ('sampler', 'scheduler'):
+        if metadata.get(facet):
+            add(facet, metadata[facet])
+    for entry in (metadata.get('lora') or '').split(','):
+        if entry.strip():
+            add('lora', _model_name(entry.split(':')[0]))
+    for facet, key in (('steps', 'steps'), ('seed', 'seed')):
+        try:
+            add(facet, int(metadata.get(key)))
+        except (TypeError, ValueError):
+            pass
+    try:
+        add('cfg', f"{float(metadata.get('cfg_scale')):g}")
+    except (TypeError, ValueError):
+        pass
+    
+    # NOCASE values: keep the first spelling of each
+    unique = {}
+    for facet, value in facets:
+        unique.setdefault((facet, value.lower()), (facet, value))
+    return list(unique.values())
+
+def compute_generation_info(image_path):
+    """
+    Facet pairs plus prompt and negative prompt text for an image file
+    (empty for SVG or images without AI metadata)
+    """
+    metadata = {} if image_path.lower().endswith('.svg') else extract_ai_metadata_detailed(image_path)
+    return {
+        'facets': extract_facets(metadata),
+        'prompt': (metadata.get('prompt') or '').strip() or None,
+        'negative_prompt': (metadata.get('negative_prompt') or '').strip() or None,
+    }
+
+def set_artwork_facets(conn, artwork_id, facets, is_new=False):
+    """
+    Replace an artwork's facet rows inside the caller's transaction and
+    adjust facet_counts by the difference - counts are never recomputed
+    """
+    old = {} if is_new else {
+        (row[0], row[1].lower()): (row[0], row[1]) for row in conn.execute(
+            'SELECT facet, value FROM artwork_facets WHERE artwork_id = ?', (artwork_id,)
+        )
+    }
+    new = {(facet, value.lower()): (facet, value) for facet, value in facets}
+    removed = [old[key] for key in old.keys() - new.keys()]
+    added = [new[key] for key in new.keys() - old.keys()]
+    
+    if removed:
+        conn.executemany(
+            'DELETE FROM artwork_facets WHERE facet = ? AND value = ? AND artwork_id = ?',
+            [(facet, value, artwork_id) for facet, value in removed]
+        )
+        counted = [pair for pair in removed if pair[0] in COUNTED_FACETS]
+        conn.executemany('UPDATE facet_counts SET count = count - 1 WHERE facet = ? AND value = ?', counted)
+        conn.executemany('DELETE FROM facet_counts WHERE facet = ? AND value = ? AND count <= 0', counted)
+    if added:
+        conn.executemany(
+            'INSERT OR IGNORE INTO artwork_facets (facet, value, artwork_id) VALUES (?, ?, ?)',
+            [(facet, value, artwork_id) for facet, value in added]
+        )
+        conn.executemany(
+            '''INSERT INTO facet_counts (facet, value, count) VALUES (?, ?, 1)
+               ON CONFLICT (facet, value) DO UPDATE SET count = count + 1''',
+            [pair for pair in added if pair[0] in COUNTED_FACETS]
+        )
+
+def backfill_generation_info(batch_size=200):
+    """Extract facets and prompts for artworks stored before they existed"""
+    conn = get_db_connection()
+    last_id = 0
+    filled = 0
+    while True:
+        rows = conn.execute(
+            'SELECT id, image_path FROM artworks WHERE facets_indexed = 0 AND id > ? ORDER BY id LIMIT ?',
+            (last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        updates = []
+        for row in rows:
+            generation = compute_generation_info(row['image_path'])
+            set_artwork_facets(conn, row['id'], generation['facets'])
+            updates.append((generation['prompt'], generation['negative_prompt'], row['id']))
+        conn.executemany(
+            'UPDATE artworks SET facets_indexed = 1, prompt = ?, negative_prompt = ? WHERE id = ?', updates
+        )
+        conn.commit()
+        filled += len(rows)
+    conn.close()
+    if filled:
+        log_event(logging.INFO, "✅ Facets and prompts backfilled", artworks=filled)
+    return filled
+
+def remove_artwork_facets(conn, artwork_ids):
+    """
+    Drop the facet rows of deleted artworks and decrement their counts,
+    aggregated across all of them so a bulk delete stays a handful of statements
+    """
+    ids = json.dumps(list(artwork_ids))
+    counted = conn.execute(
+        f"""SELECT facet, value, COUNT(*) FROM artwork_facets
+            WHERE artwork_id IN (SELECT value FROM json_each(?))
+              AND facet IN ({', '.join('?' * len(COUNTED_FACETS))})
+            GROUP BY facet, value""",
+        (ids, *COUNTED_FACETS)
+    ).fetchall()
+    conn.execute('DELETE FROM artwork_facets WHERE artwork_id IN (SELECT value FROM json_each(?))', (ids,))
+    if counted:
+        conn.executemany('UPDATE facet_counts SET count = count - ? WHERE facet = ? AND value = ?',
+                         [(n, facet, value) for facet, value, n in counted])
+        conn.executemany('DELETE FROM facet_counts WHERE facet = ? AND value = ? AND count <= 0',
+                         [(facet, value) for facet, value, _n in counted])
+
+def facet_filter_sql(args):
+    """
+    SQL fragment and params for ?model=&lora=... filters; repeated parameters
+    (e.g. two lora values) must all match
+    """
+    sql = ''
+    params = []
+    applied = {}
+    for facet in FACET_KINDS:
+        values = [v.strip() for v in args.getlist(facet) if v.strip()]
+        if facet == 'model':
+            values = [_model_name(v) for v in values]
+        for value in values:
+            sql += ' AND id IN (SELECT artwork_id FROM artwork_facets WHERE facet = ? AND value = ?)'
+            params.extend([facet, value])
+        if values:
+            applied[facet] = values
+    return sql, params, applied
+
+# =============================================================================
+# 🧬 SIMILARITY INDEX SECTION
+# =============================================================================
+def hamming_distance(a, b):
+    """Number of differing bits between two 64-bit hashes"""
+    return bin(a ^ b).count('1')
+
+def to_signed64(value):
+    """Map an unsigned 64-bit hash into SQLite's signed INTEGER range"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+def to_unsigned64(value):
+    return value + (1 << 64) if value < 0 else value
+
+@timed_stage('phash')
+def compute_perceptual_hash(image_path):
+    """
+    64-bit difference hash (dHash) of an image, computed from its thumbnail
+    when one exists; returns None for files PIL can't read (e.g. SVG)
+    """
+    source = thumbnail_source(image_path) or image_path
+    try:
+        img = open_image(source)
+        img.draft('L', (64, 64))  # JPEG decodes at reduced scale
+        pixels = img.convert('L').resize((9, 8), Image.Resampling.BILINEAR).tobytes()
+    except Exception as e:
+        log_event(logging.DEBUG, "Perceptual hash skipped", path=image_path, error=e)
+        return None
+    
+    bits = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+def backfill_perceptual_hashes(batch_size=500):
+    """Compute dHashes for artworks stored before they existed"""
+    conn = get_db_connection()
+    last_id = 0
+    filled = 0
+    while True:
+        rows = conn.execute(
+            'SELECT id, image_path FROM artworks WHERE phash IS NULL AND id > ? ORDER BY id LIMIT ?',
+            (last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        updates = []
+        for row in rows:
+            value = compute_perceptual_hash(row['image_path'])
+            if value is not None:
+                updates.append((to_signed64(value), row['id']))
+        conn.executemany('UPDATE artworks SET phash = ? WHERE id = ?', updates)
+        conn.commit()
+        filled += len(updates)
+    conn.close()
+    if filled:
+        log_event(logging.INFO, "✅ Perceptual hashes backfilled", artworks=filled)
+    return filled
+
+class BKTree:
+    """
+    Burkhard-Keller tree over 64-bit hashes with Hamming distance
+    Each node holds one hash and the set of artwork ids sharing it
+    """
+    
+    def __init__(self):
+        self.root = None  # [hash, ids, {distance: child}]
+        self.size = 0
+    
+    def add(self, value, artwork_id):
+        if self.root is None:
+            self.root = [value, {artwork_id}, {}]
+            self.size += 1
+            return
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].add(artwork_id)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, {artwork_id}, {}]
+                self.size += 1
+                return
+            node = child
+    
+    def discard(self, value, artwork_id):
+        """Remove an id; empty nodes stay as routing nodes"""
+        node = self.root
+        while node is not None:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].discard(artwork_id)
+                return
+            node = node[2].get(distance)
+    
+    def search(self, value, radius):
+        """Return [(distance, artwork_id)] within radius, nearest first"""
+        results = []
+        if self.root is None:
+            return results
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= radius:
+                results.extend((distance, artwork_id) for artwork_id in node[1])
+            low, high = distance - radius, distance + radius
+            for child_distance, child in node[2].items():
+                if low <= child_distance <= high:
+                    stack.append(child)
+        results.sort()
+        return results
+
+def cluster_hashes(items, radius):
+    """
+    Near-duplicate clusters among (artwork_id, hash) pairs. Hashes within
+    radius bits agree exactly on at least one of radius + 1 disjoint bit
+    chunks, so only hashes sharing a chunk value are ever compared
+    """
+    by_hash = {}
+    for artwork_id, value in items:
+        by_hash.setdefault(value, []).append(artwork_id)
+    values = list(by_hash)
+    parent = list(range(len(values)))
+    
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+    
+    bounds = [64 * i // (radius + 1) for i in range(radius + 2)]
+    for low, high in zip(bounds, bounds[1:]):
+        mask = (1 << (high - low)) - 1
+        buckets = {}
+        for index, value in enumerate(values):
+            buckets.setdefault((value >> low) & mask, []).append(index)
+        for members in buckets.values():
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    root_a, root_b = find(a), find(b)
+                    if root_a != root_b and hamming_distance(values[a], values[b]) <= radius:
+                        parent[root_b] = root_a
+    
+    groups = {}
+    for index, value in enumerate(values):
+        groups.setdefault(find(index), []).extend(by_hash[value])
+    return sorted((sorted(g) for g in groups.values() if len(g) > 1), key=lambda g: (-len(g), g[0]))
+
+class VersionedIndex:
+    """
+    Base for in-memory indexes over one artworks column
+    Loads on first use and catches up with add/edit/delete from any worker
+    through the row versions and tombstones used by delta sync
+    """
+    column = None         # one column, or several comma-separated (values become tuples)
+    present = None        # column that must be non-NULL for the initial load (default: column)
+    
+    def __init__(self):
+        self.version = None
+        self.lock = threading.Lock()
+    
+    def _set(self, artwork_id, value):
+        """Insert, replace or (value None) remove one artwork"""
+        raise NotImplementedError
+    
+    def _changed(self):
+        """Called under the lock after a refresh applied changes"""
+    
+    def refresh(self, conn):
+        """Load the index, or apply changes since the last refresh"""
+        with self.lock:
+            version = get_gallery_version(conn)
+            if self.version == version:
+                return
+            if self.version is None:
+                rows = conn.execute(
+                    f'SELECT id, {self.column} FROM artworks WHERE {self.present or self.column} IS NOT NULL'
+                ).fetchall()
+                deleted = []
+            else:
+                # version >= content_version on every row, so idx_version narrows the search
+                rows = conn.execute(
+                    f'SELECT id, {self.column} FROM artworks WHERE version > ? AND content_version > ?',
+                    (self.version, self.version)
+                ).fetchall()
+                deleted = conn.execute(
+                    'SELECT artwork_id FROM artwork_tombstones WHERE version > ?', (self.version,)
+                ).fetchall()
+            for row in rows:
+                self._set(row[0], row[1] if len(row) == 2 else tuple(row[1:]))
+            for row in deleted:
+                self._set(row[0], None)
+            changed = rows or deleted or self.version is None
+            self.version = version
+            if changed:
+                self._changed()
+
+class SimilarityIndex(VersionedIndex):
+    """In-memory BK-tree of artwork dHashes"""
+    column = 'phash'
+    
+    def __init__(self):
+        super().__init__()
+        self.tree = BKTree()
+        self.hashes = {}      # artwork_id -> unsigned hash
+        self.generation = 0   # bumped whenever a hash changes
+        self.reports = {}     # radius -> (generation, clusters)
+    
+    def _set(self, artwork_id, value):
+        old = self.hashes.pop(artwork_id, None)
+        if old is not None:
+            self.tree.discard(old, artwork_id)
+        if value is not None:
+            value = to_unsigned64(value)
+            self.hashes[artwork_id] = value
+            self.tree.add(value, artwork_id)
+    
+    def _changed(self):
+        self.generation += 1
+
+    def hash_of(self, artwork_id):
+        return self.hashes.get(artwork_id)
+    
+    def within(self, value, radius):
+        with self.lock:
+            return self.tree.search(value, radius)
+    
+    def nearest(self, value, k, exclude=None):
+        """k nearest neighbours, widening the search radius until k are found"""
+        radius = DUPLICATE_RADIUS
+        while True:
+            matches = [m for m in self.within(value, radius) if m[1] != exclude]
+            if len(matches) >= k or radius >= 64:
+                return matches[:k]
+            radius *= 2
+    
+    def clusters(self, radius=DUPLICATE_RADIUS):
+        """Near-duplicate clusters, computed once per radius and set of hashes"""
+        with self.lock:
+            cached = self.reports.get(radius)
+            if cached is not None and cached[0] == self.generation:
+                return cached[1]
+            generation = self.generation
+            items = list(self.hashes.items())
+        clusters = cluster_hashes(items, radius)
+        with self.lock:
+            self.reports[radius] = (generation, clusters)
+        return clusters
+
+similarity_index = SimilarityIndex()
+
+# =============================================================================
+# 🎨 COLOR INDEX SECTION
+# =============================================================================
+COLOR_BINS = COLOR_LEVELS ** 3
+COLOR_STEP = 256 // COLOR_LEVELS
+
+def _bin_center(index):
+    r, rem = divmod(index, COLOR_LEVELS * COLOR_LEVELS)
+    g, b = divmod(rem, COLOR_LEVELS)
+    half = COLOR_STEP // 2
+    return (r * COLOR_STEP + half, g * COLOR_STEP + half, b * COLOR_STEP + half)
+
+def _color_family(rgb):
+    """Coarse color name of an RGB triple"""
+    h, s, v = colorsys.rgb_to_hsv(*(c / 255 for c in rgb))
+    if v < 0.25:
+        return 'black'
+    if s < 0.2:
+        return 'white' if v > 0.85 else 'gray'
+    hue = h * 360
+    if hue < 15 or hue >= 345:
+        return 'red'
+    if hue < 40:
+        return 'orange' if v >= 0.6 else 'brown'
+    if hue < 70:
+        return 'yellow'
+    if hue < 165:
+        return 'green'
+    if hue < 195:
+        return 'cyan'
+    if hue < 255:
+        return 'blue'
+    if hue < 290:
+        return 'purple'
+    return 'pink'
+
+BIN_CENTERS = [_bin_center(i) for i in range(COLOR_BINS)]
+COLOR_FAMILIES = {}
+for _index, _center in enumerate(BIN_CENTERS):
+    COLOR_FAMILIES.setdefault(_color_family(_center), []).append(_index)
+
+def parse_color(value):
+    """
+    Histogram bins matching a color filter value, or None if it isn't one
+    Accepts a family name ('blue') or a hex color ('#3366cc', '36c')
+    """
+    value = value.strip().lower()
+    if value in COLOR_FAMILIES:
+        return COLOR_FAMILIES[value]
+    hex_value = value.lstrip('#')
+    if len(hex_value) == 3:
+        hex_value = ''.join(c * 2 for c in hex_value)
+    if not re.fullmatch(r'[0-9a-f]{6}', hex_value):
+        return None
+    target = tuple(int(hex_value[i:i + 2], 16) for i in (0, 2, 4))
+    distances = [math.dist(target, center) for center in BIN_CENTERS]
+    bins = [i for i, d in enumerate(distances) if d <= COLOR_TOLERANCE]
+    return bins or [distances.index(min(distances))]
+
+@timed_stage('color')
+def compute_color_features(image_path):
+    """
+    Color histogram and dominant palette of an image, computed with NumPy from
+    its thumbnail. The histogram is 64 uint8 bins summing to ~255, the palette
+    packed RGB triples of the most common bins
+    """
+    features = {'color_histogram': None, 'palette': None}
+    if np is None or image_path.lower().endswith('.svg'):
+        return features
+    
+    source = thumbnail_source(image_path) or image_path
+    try:
+        img = open_image(source)
+        img.draft('RGB', COLOR_SAMPLE_SIZE)
+        img.thumbnail(COLOR_SAMPLE_SIZE, Image.Resampling.BILINEAR)
+        pixels = np.asarray(img.convert('RGBA'), dtype=np.uint8).reshape(-1, 4)
+    except Exception as e:
+        log_event(logging.DEBUG, "Color extraction skipped", path=image_path, error=e)
+        return features
+    
+    pixels = pixels[pixels[:, 3] >= 128, :3]  # ignore transparent areas
+    if not len(pixels):
+        return features
+    
+    quantized = (pixels // COLOR_STEP).astype(np.intp)
+    bins = (quantized[:, 0] * COLOR_LEVELS + quantized[:, 1]) * COLOR_LEVELS + quantized[:, 2]
+    counts = np.bincount(bins, minlength=COLOR_BINS)
+    histogram = np.rint(counts * (255 / len(pixels))).astype(np.uint8)
+    
+    # Palette entries are the mean color of the most populated bins
+    top = np.argsort(counts)[::-1][:PALETTE_SIZE]
+    top = top[counts[top] > 0]
+    sums = np.stack([np.bincount(bins, weights=pixels[:, c], minlength=COLOR_BINS) for c in range(3)], axis=1)
+    palette = np.rint(sums[top] / counts[top, None]).astype(np.uint8)
+    
+    features['color_histogram'] = histogram.tobytes()
+    features['palette'] = palette.tobytes()
+    return features
+
+def palette_to_hex(palette):
+    """Packed RGB triples -> ['#rrggbb', ...]"""
+    if not palette:
+        return []
+    return ['#' + palette[i:i + 3].hex() for i in range(0, len(palette), 3)]
+
+def backfill_color_features(batch_size=200):
+    """Compute color histograms for artworks stored before they existed"""
+    if np is None:
+        return 0
+    conn = get_db_connection()
+    last_id = 0
+    filled = 0
+    while True:
+        rows = conn.execute(
+            'SELECT id, image_path FROM artworks WHERE color_histogram IS NULL AND id > ? ORDER BY id LIMIT ?',
+            (last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        updates = []
+        for row in rows:
+            features = compute_color_features(row['image_path'])
+            if features['color_histogram'] is not None:
+                updates.append((features['color_histogram'], features['palette'], row['id']))
+        conn.executemany('UPDATE artworks SET color_histogram = ?, palette = ? WHERE id = ?', updates)
+        conn.commit()
+        filled += len(updates)
+    conn.close()
+    if filled:
+        log_event(logging.INFO, "✅ Color histograms backfilled", artworks=filled)
+    return filled
+
+class ColorIndex(VersionedIndex):
+    """
+    All color histograms as one (artworks x bins) uint8 matrix, so a color
+    filter is a single vectorized column sum instead of per-row Python
+    """
+    column = 'color_histogram'
+    
+    def __init__(self):
+        super().__init__()
+        self.histograms = {}  # artwork_id -> histogram bytes
+        self.ids = None
+        self.matrix = None
+    
+    def _set(self, artwork_id, value):
+        if value is None:
+            self.histograms.pop(artwork_id, None)
+        else:
+            self.histograms[artwork_id] = bytes(value)
+    
+    def _changed(self):
+        # Rebuilding from the packed bytes is one join plus a zero-copy view
+        self.ids = np.fromiter(self.histograms.keys(), dtype=np.int64, count=len(self.histograms))
+        self.matrix = np.frombuffer(b''.join(self.histograms.values()), dtype=np.uint8).reshape(-1, COLOR_BINS)
+    
+    def matching(self, bins, min_share=COLOR_MIN_SHARE):
+        """Ids of artworks where at least min_share of the pixels fall in bins"""
+        with self.lock:
+            ids, matrix = self.ids, self.matrix
+        if ids is None or not len(ids):
+            return []
+        share = matrix[:, bins].sum(axis=1, dtype=np.uint32)
+        return ids[share >= min_share * 255].tolist()
+
+color_index = ColorIndex()
+
+# =============================================================================
+# 🔎 PROMPT INDEX SECTION
+# =============================================================================
+PROMPT_STOPWORDS = frozenset('''
+    a an and are as at be but by for from in into is it its of on or over the this to under with without break
+'''.split())
+EXTRA_NETWORK_PATTERN = re.compile(r'<(lora|lyco|hypernet):([^:>]+)[^>]*>', re.IGNORECASE)
+PROMPT_WEIGHT_PATTERN = re.compile(r':\s*-?\d+(?:\.\d+)?')
+PROMPT_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['_-][a-z0-9]+)*")
+
+def tokenize_prompt(text, prefix=''):
+    """
+    Prompt text -> tokens. Extra-network tags become single tokens
+    ('<lora:film_grain:0.8>' -> 'lora:film_grain') and attention syntax
+    ('(castle:1.2)', '[[sky]]') is reduced to its words
+    """
+    if not text:
+        return []
+    tokens = [f'{prefix}{kind.lower()}:{_model_name(name).lower()}'
+              for kind, name in EXTRA_NETWORK_PATTERN.findall(text)]
+    text = PROMPT_WEIGHT_PATTERN.sub(' ', EXTRA_NETWORK_PATTERN.sub(' ', text).lower())
+    tokens.extend(f'{prefix}{token}' for token in PROMPT_TOKEN_PATTERN.findall(text)
+                  if len(token) > 1 and token not in PROMPT_STOPWORDS and not token.isdigit())
+    return tokens
+
+def prompt_document(prompt, description):
+    """
+    Prompt text of an artwork. Artworks without AI metadata fall back to
+    their description, which usually holds the prompt
+    """
+    if prompt or description == 'No description provided':
+        return prompt
+    return description
+
+def prompt_terms(prompt, negative_prompt=None, description=None):
+    """
+    Term counts of an artwork's prompt document; negative prompt terms get a
+    '-' prefix so they never match positive ones
+    """
+    counts = {}
+    for token in (tokenize_prompt(prompt_document(prompt, description))
+                  + tokenize_prompt(negative_prompt, prefix='-')):
+        counts[token] = counts.get(token, 0) + 1
+    return counts
+
+class PromptIndex(VersionedIndex):
+    """
+    TF-IDF index over prompt documents with cosine-similarity search
+    
+    Documents live in two segments:
+    - base: term-major sparse matrix (CSC) of log term frequencies, saved as
+      .npy files and memory-mapped, so every worker shares the page cache
+    - delta: documents added or changed since the base was built, kept in
+      memory as small COO arrays
+    Base rows of changed/deleted artworks are masked as stale. When the delta
+    grows past PROMPT_INDEX_COMPACT_* both are merged into a new base, IDF and
+    norms are recomputed and the result is written to disk - without
+    re-tokenizing anything
+    """
+    column = 'prompt, negative_prompt, description'
+    present = 'description'
+    
+    def __init__(self, folder=PROMPT_INDEX_FOLDER):
+        super().__init__()
+        self.folder = folder
+        self.snapshot_checked = False
+        self.vocab = {}           # term -> term id
+        self.terms = []           # term id -> term
+        self.df = []              # document frequency per term (exact after compaction)
+        self._set_base(np.zeros(0, np.int64), np.zeros(1, np.int64), np.zeros(0, np.int32),
+                       np.zeros(0, np.float32), np.zeros(0, np.float32), np.zeros(0, np.float32))
+        self.delta = {}           # artwork_id -> (term ids, log tf)
+        self._build_delta()
+    
+    def _set_base(self, doc_ids, term_ptr, postings, weights, norms, idf):
+        self.doc_ids = doc_ids
+        self.term_ptr = term_ptr
+        self.postings = postings
+        self.weights = weights
+        self.norms = norms
+        self.idf = idf
+        self.rows = {int(artwork_id): row for row, artwork_id in enumerate(doc_ids)}
+        self.stale = np.zeros(len(doc_ids), dtype=bool)
+    
+    def _idf(self, term_ids):
+        """IDF from the last compaction; terms first seen since use their running df"""
+        idf = np.empty(len(term_ids), dtype=np.float32)
+        known = term_ids < len(self.idf)
+        idf[known] = self.idf[term_ids[known]]
+        documents = len(self.doc_ids) + len(self.delta)
+        for i in np.flatnonzero(~known):
+            idf[i] = math.log((documents + 1) / (self.df[term_ids[i]] + 1)) + 1
+        return idf
+    
+    def _set(self, artwork_id, value):
+        row = self.rows.get(artwork_id)
+        if row is not None:
+            self.stale[row] = True
+        self.delta.pop(artwork_id, None)
+        counts = prompt_terms(*value) if value else None
+        if not counts:
+            return
+        term_ids = []
+        for term in counts:
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                term_id = self.vocab[term] = len(self.terms)
+                self.terms.append(term)
+                self.df.append(0)
+            self.df[term_id] += 1
+            term_ids.append(term_id)
+        frequencies = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        self.delta[artwork_id] = (np.array(term_ids, dtype=np.int64), 1 + np.log(frequencies))
+    
+    def _build_delta(self):
+        entries = list(self.delta.values())
+        self.delta_ids = np.fromiter(self.delta.keys(), dtype=np.int64, count=len(self.delta))
+        self.delta_rows = np.repeat(np.arange(len(entries)), [len(terms) for terms, _ in entries])
+        self.delta_terms = np.concatenate([terms for terms, _ in entries]) if entries else np.zeros(0, np.int64)
+        self.delta_tf = np.concatenate([tf for _, tf in entries]) if entries else np.zeros(0, np.float32)
+        weighted = (self.delta_tf * self._idf(self.delta_terms)) ** 2
+        self.delta_norms = np.sqrt(np.bincount(self.delta_rows, weighted, minlength=len(entries)))
+    
+    def _changed(self):
+        if len(self.delta) >= max(PROMPT_INDEX_COMPACT_MIN, PROMPT_INDEX_COMPACT_RATIO * len(self.doc_ids)) \
+                or (self.delta and not len(self.doc_ids)):
+            self._compact()
+            self._save()
+        else:
+            self._build_delta()
+    
+    def _compact(self):
+        """Merge live base rows and the delta into a new base segment"""
+        started = time.perf_counter()
+        vocab_size = len(self.terms)
+        base_terms = np.repeat(np.arange(len(self.term_ptr) - 1), np.diff(self.term_ptr))
+        live = ~self.stale
+        keep = live[self.postings]
+        new_row = np.cumsum(live) - 1
+        base_count = int(live.sum())
+        
+        entries = list(self.delta.values())
+        rows = np.concatenate([new_row[self.postings[keep]],
+                               base_count + np.repeat(np.arange(len(entries)), [len(t) for t, _ in entries])])
+        terms = np.concatenate([base_terms[keep]] + [t for t, _ in entries])
+        tf = np.concatenate([np.asarray(self.weights)[keep]] + [f for _, f in entries]).astype(np.float32)
+        doc_ids = np.concatenate([np.asarray(self.doc_ids)[live],
+                                  np.fromiter(self.delta.keys(), dtype=np.int64, count=len(entries))])
+        
+        documents = len(doc_ids)
+        df = np.bincount(terms, minlength=vocab_size)
+        idf = (np.log((documents + 1) / (df + 1)) + 1).astype(np.float32)
+        norms = np.sqrt(np.bincount(rows, (tf * idf[terms]) ** 2, minlength=documents)).astype(np.float32)
+        order = np.argsort(terms, kind='stable')
+        term_ptr = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+        
+        self.df = df.tolist()
+        self.delta = {}
+        self._set_base(doc_ids, term_ptr, rows[order].astype(np.int32), tf[order], norms, idf)
+        self._build_delta()
+        log_event(logging.INFO, "✅ Prompt index compacted", documents=documents, terms=vocab_size,
+                  duration_ms=f"{(time.perf_counter() - started) * 1000:.1f}")
+    
+    def _save(self):
+        """
+        Write the base segment to a new version directory and switch 'current'
+        to it. Workers see the same changes and compact at the same refresh, so
+        only the one holding the folder's lock writes; the others keep their
+        compacted base in memory and load the saved one on restart
+        """
+        if not len(self.doc_ids):
+            return
+        name = f'v{self.version}-{os.getpid()}'
+        path = os.path.join(self.folder, name)
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            with open(os.path.join(self.folder, 'write.lock'), 'w') as lock:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        return  # another worker is saving the same changes
+                os.makedirs(path, exist_ok=True)
+                for key in ('doc_ids', 'term_ptr', 'postings', 'weights', 'norms', 'idf'):
+                    np.save(os.path.join(path, f'{key}.npy'), getattr(self, key))
+                with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+                    json.dump({'version': self.version, 'terms': self.terms, 'df': self.df}, f)
+                pointer = os.path.join(self.folder, f'current.{os.getpid()}.tmp')
+                with open(pointer, 'w') as f:
+                    f.write(name)
+                os.replace(pointer, os.path.join(self.folder, 'current'))
+                # Under the lock 'current' names this snapshot; older ones stay
+                # readable by workers that mapped them until they unmap
+                for entry in os.listdir(self.folder):
+                    if entry.startswith('v') and entry != name:
+                        shutil.rmtree(os.path.join(self.folder, entry), ignore_errors=True)
+        except OSError as e:
+            log_event(logging.WARNING, "⚠️ Prompt index not saved", path=path, error=e)
+            return
+        try:
+            self._open(path)
+        except (OSError, ValueError) as e:
+            # The in-memory base is complete; only the page-cache sharing is lost
+            log_event(logging.WARNING, "⚠️ Prompt index snapshot not mapped", path=path, error=e)
+
+    def _open(self, path):
+        """Memory-map a saved base segment"""
+        arrays = {key: np.load(os.path.join(path, f'{key}.npy'), mmap_mode='r')
+                  for key in ('doc_ids', 'term_ptr', 'postings', 'weights', 'norms', 'idf')}
+        stale = self.stale
+        self._set_base(**arrays)
+        self.stale = stale
+    
+    def _load_snapshot(self, conn):
+        """Start from the saved base segment, if any; refresh() then applies later changes"""
+        try:
+            with open(os.path.join(self.folder, 'current')) as f:
+                path = os.path.join(self.folder, f.read().strip())
+            with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta['version'] > get_gallery_version(conn):
+                return  # database was reset
+            self.terms = meta['terms']
+            self.vocab = {term: term_id for term_id, term in enumerate(self.terms)}
+            self.df = meta['df']
+            self._open(path)
+            self.stale = np.zeros(len(self.doc_ids), dtype=bool)
+            self.version = meta['version']
+            log_event(logging.INFO, "✅ Prompt index loaded", documents=len(self.doc_ids), version=self.version)
+        except (OSError, ValueError, KeyError) as e:
+            log_event(logging.DEBUG, "Prompt index snapshot unavailable", error=e)
+    
+    def refresh(self, conn):
+        with self.lock:
+            if not self.snapshot_checked:
+                self.snapshot_checked = True
+                self._load_snapshot(conn)
+        super().refresh(conn)
+    
+    def search(self, counts, k, exclude=None):
+        """Top-k [(cosine similarity, artwork_id)] for a term-count query"""
+        with self.lock:
+            known = [term for term in counts if term in self.vocab]
+            if not known or k <= 0:
+                return []
+            term_ids = np.array([self.vocab[term] for term in known], dtype=np.int64)
+            idf = self._idf(term_ids)
+            query = (1 + np.log(np.array([counts[term] for term in known], dtype=np.float32))) * idf
+            query /= np.linalg.norm(query)
+            multipliers = query * idf  # doc weight = log tf * idf / norm
+            
+            scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+            in_base = term_ids < len(self.term_ptr) - 1
+            if len(self.doc_ids) and in_base.any():
+                ptr = self.term_ptr
+                spans = [(ptr[t], ptr[t + 1], m) for t, m in zip(term_ids[in_base], multipliers[in_base])]
+                rows = np.concatenate([self.postings[a:b] for a, b, _ in spans])
+                weights = np.concatenate([self.weights[a:b] * m for a, b, m in spans])
+                scores = np.bincount(rows, weights, minlength=len(self.doc_ids)) / self.norms
+                scores[self.stale] = 0
+            
+            delta_scores = np.zeros(len(self.delta_ids), dtype=np.float32)
+            if len(self.delta_ids):
+                dense = np.zeros(len(self.terms), dtype=np.float32)
+                dense[term_ids] = multipliers
+                delta_scores = np.bincount(self.delta_rows, self.delta_tf * dense[self.delta_terms],
+                                           minlength=len(self.delta_ids)) / self.delta_norms
+            
+            ids = np.concatenate([self.doc_ids, self.delta_ids])
+        scores = np.concatenate([scores, delta_scores])
+        if exclude is not None:
+            scores[ids == exclude] = 0
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(round(float(scores[i]), 4), int(ids[i])) for i in top if scores[i] > 0]
+
+prompt_index = PromptIndex() if np is not None else None
+
+def fetch_ranked_artworks(conn, ranked, key):
+    """
+    Listing rows for [(value, artwork_id)] in the given order, with value
+    stored under key (e.g. 'distance', 'score')
+    """
+    if not ranked:
+        return []
+    values = {artwork_id: value for value, artwork_id in ranked}
+    artworks = {artwork['id']: artwork for artwork in iter_artworks(
+        conn, f'{ARTWORK_LISTING_SELECT} WHERE id IN (SELECT value FROM json_each(?))', (json.dumps(list(values)),)
+    )}
+    ranked_artworks = []
+    for _value, artwork_id in ranked:
+        artwork = artworks.get(artwork_id)
+        if artwork is not None:
+            artwork[key] = values[artwork_id]
+            ranked_artworks.append(artwork)
+    return ranked_artworks
+
+# =============================================================================
+# 💬 SUGGEST INDEX SECTION
+# =============================================================================
+SUGGEST_KIND_RANK = {'model': 3, 'lora': 2, 'title': 1, 'tag': 0}  # tie-break for equal counts
+
+class SuggestIndex(VersionedIndex):
+    """
+    Autocomplete over titles, model names, LoRA names and prompt tokens
+    
+    Every (text, kind) is counted once per artwork that contributes it. Keys
+    are kept in a sorted list, so a prefix is a bisect plus a scan of its
+    range, and per-prefix results are cached until a write touches a key
+    under that prefix
+    """
+    column = ("title, prompt, description, (SELECT group_concat(facet || ':' || value, char(31))"
+              " FROM artwork_facets WHERE artwork_id = artworks.id AND facet IN ('model', 'lora'))")
+    present = 'id'
+    
+    def __init__(self):
+        super().__init__()
+        self.entries = {}         # (lowercase text, kind) -> [count, display text]
+        self.keys = []            # sorted entries keys
+        self.contributions = {}   # artwork_id -> frozenset of (kind, text)
+        self.cache = {}           # (prefix, limit) -> suggestions
+        self.changed_keys = set()
+        self.bulk = False
+    
+    @staticmethod
+    def _contributions(value):
+        title, prompt, description, facets = value
+        items = set()
+        if title and title.strip():
+            items.add(('title', title.strip()))
+        for token in tokenize_prompt(prompt_document(prompt, description)):
+            if ':' not in token:  # extra-network tags are covered by the lora facet
+                items.add(('tag', token))
+        for pair in (facets or '').split('\x1f'):
+            facet, _, name = pair.partition(':')
+            if name:
+                items.add((facet, name))
+        return frozenset(items)
+    
+    def _adjust(self, kind, text, delta):
+        key = (text.lower(), kind)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = [delta, text]
+            if not self.bulk:
+                bisect.insort(self.keys, key)
+        else:
+            entry[0] += delta
+            if entry[0] <= 0:
+                del self.entries[key]
+                if not self.bulk:
+                    del self.keys[bisect.bisect_left(self.keys, key)]
+        self.changed_keys.add(key[0])
+    
+    def _set(self, artwork_id, value):
+        if self.version is None:
+            self.bulk = True  # initial load: sort once in _changed
+        old = self.contributions.pop(artwork_id, frozenset())
+        new = self._contributions(value) if value else frozenset()
+        for kind, text in old - new:
+            self._adjust(kind, text, -1)
+        for kind, text in new - old:
+            self._adjust(kind, text, 1)
+        if new:
+            self.contributions[artwork_id] = new
+    
+    def _changed(self):
+        if self.bulk:
+            self.keys = sorted(self.entries)
+            self.bulk = False
+            self.cache.clear()
+        else:
+            changed = self.changed_keys
+            for cache_key in [c for c in self.cache if any(text.startswith(c[0]) for text in changed)]:
+                del self.cache[cache_key]
+        self.changed_keys = set()
+    
+    def suggest(self, prefix, limit=SUGGEST_LIMIT):
+        """Top suggestions for a prefix, most frequent first, one per text"""
+        prefix = prefix.strip().lower()
+        with self.lock:
+            cached = self.cache.get((prefix, limit))
+            if cached is not None:
+                return cached
+            
+            candidates = []
+            for i in range(bisect.bisect_left(self.keys, (prefix,)), len(self.keys)):
+                key = self.keys[i]
+                if not key[0].startswith(prefix):
+                    break
+                count, text = self.entries[key]
+                if key[1] == 'tag' and count < SUGGEST_MIN_TOKEN_COUNT:
+                    continue
+                candidates.append((count, SUGGEST_KIND_RANK[key[1]], key, text))
+            
+            suggestions = []
+            seen = set()
+            for count, _rank, key, text in heapq.nlargest(limit * len(SUGGEST_KIND_RANK), candidates):
+                if key[0] not in seen:
+                    seen.add(key[0])
+                    suggestions.append({'text': text, 'kind': key[1], 'count': count})
+                if len(suggestions) == limit:
+                    break
+            
+            if len(self.cache) >= SUGGEST_CACHE_SIZE:
+                self.cache.clear()
+            self.cache[(prefix, limit)] = suggestions
+            return suggestions
+
+suggest_index = SuggestIndex()
+
+# =============================================================================
+# 📦 EXPORT SECTION
+# =============================================================================
+EXPORT_FORMATS = {'zip': 'application/zip', 'tar': 'application/x-tar'}
+EXPORT_COLUMNS = ("id, title, description, image_path, position, created_at, updated_at, width, height, "
+                  "byte_size, format, prompt, negative_prompt, (SELECT group_concat(facet || ':' || value, char(31))"
+                  " FROM artwork_facets WHERE artwork_id = artworks.id) AS facets")
+
+class FilterError(ValueError):
+    """Invalid listing filter; status is the HTTP status to answer with"""
+    
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+def artwork_filter_sql(args):
+    """
+    ' AND ...' SQL fragment, params and applied filters for the ?q=, facet and
+    ?color= parameters shared by /api/artworks and exports
+    """
+    sql = ''
+    params = []
+    applied = {}
+    q = args.get('q', '').lower().strip()
+    if q:
+        sql += ' AND (LOWER(title) LIKE ? OR LOWER(description) LIKE ?)'
+        params.extend([f'%{q}%', f'%{q}%'])
+        applied['query'] = q
+    facet_sql, facet_params, facets = facet_filter_sql(args)
+    sql += facet_sql
+    params.extend(facet_params)
+    color = args.get('color', '').strip()
+    if color:
+        bins = parse_color(color)
+        if bins is None:
+            raise FilterError('Unknown color')
+        if np is None:
+            raise FilterError('Color filtering requires numpy', 501)
+        try:
+            share = float(args.get('color_share', COLOR_MIN_SHARE))
+        except ValueError:
+            raise FilterError('Invalid color_share')
+        conn = get_db_connection()
+        color_index.refresh(conn)
+        conn.close()
+        sql += ' AND id IN (SELECT value FROM json_each(?))'
+        params.append(encode_json(color_index.matching(bins, share)).decode())
+        applied['color'] = color
+    if facets:
+        applied['facets'] = facets
+    return sql, params, applied
+
+class _ArchiveSink:
+    """Write-only file object for archive writers; drain() hands out what was written since"""
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+class ZipExportWriter:
+    """Streaming ZIP: entries use data descriptors, so nothing is ever seeked back to"""
+    
+    def __init__(self):
+        self.sink = _ArchiveSink()
+        self.archive = zipfile.ZipFile(self.sink, 'w', allowZip64=True)
+    
+    def add(self, name, source, size, mtime, compress=False):
+        info = zipfile.ZipInfo(name, date_time=time.localtime(max(mtime, 315576000))[:6])
+        # Originals are already compressed images - only the manifest is deflated
+        info.compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        info.file_size = size  # lets zipfile pick ZIP64 headers for huge entries up front
+        with self.archive.open(info, 'w') as dest:
+            while True:
+                chunk = source.read(EXPORT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                dest.write(chunk)
+                yield self.sink.drain()
+        yield self.sink.drain()
+    
+    def close(self):
+        self.archive.close()
+        yield self.sink.drain()
+
+class TarExportWriter:
+    """Streaming ustar/PAX: header, data in chunks, padding to the block size"""
+    
+    def __init__(self):
+        self.sink = _ArchiveSink()
+        self.offset = 0
+    
+    def _write(self, data):
+        self.sink.write(data)
+        self.offset += len(data)
+    
+    def add(self, name, source, size, mtime, compress=False):
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(mtime)
+        info.mode = 0o644
+        self._write(info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape'))
+        remaining = size
+        while remaining:
+            chunk = source.read(min(EXPORT_CHUNK_SIZE, remaining))
+            if not chunk:
+                raise OSError(f'{name} shrank while being exported')
+            self._write(chunk)
+            remaining -= len(chunk)
+            yield self.sink.drain()
+        self._write(b'\0' * (-size % tarfile.BLOCKSIZE))
+        yield self.sink.drain()
+    
+    def close(self):
+        self._write(b'\0' * (2 * tarfile.BLOCKSIZE))
+        self._write(b'\0' * (-self.offset % tarfile.RECORDSIZE))
+        yield self.sink.drain()
+
+def export_manifest_entry(row):
+    """Manifest record of one exported artwork; file is its path inside the archive"""
+    facets = {}
+    for pair in (row['facets'] or '').split('\x1f'):
+        facet, _, value = pair.partition(':')
+        if value:
+            facets.setdefault(facet, []).append(value)
+    slug = secure_filename(row['title'] or '')[:60]
+    ext = row['image_path'].rsplit('.', 1)[-1].lower()
+    return {
+        'id': row['id'],
+        'file': f"images/{row['id']}{'-' + slug if slug else ''}.{ext}",
+        'title': row['title'],
+        'description': row['description'],
+        'position': row['position'],
+        'created_at': row['created_at'],
+        'updated_at': row['updated_at'],
+        'width': row['width'],
+        'height': row['height'],
+        'format': row['format'],
+        'byte_size': row['byte_size'],
+        'prompt': row['prompt'],
+        'negative_prompt': row['negative_prompt'],
+        'facets': facets,
+    }
+
+def iter_export_archive(archive_format, filter_sql='', filter_params=(), applied=None,
+                        batch_size=STREAM_BATCH_SIZE):
+    """
+    Yield a ZIP or TAR of the selected originals followed by manifest.json
+    
+    Rows are read in id-keyset batches so no read transaction stays open
+    between them, originals are copied EXPORT_CHUNK_SIZE bytes at a time and
+    the manifest spills to a temp file past EXPORT_MANIFEST_SPOOL - memory
+    stays flat and nothing the size of the archive touches the disk
+    """
+    writer = ZipExportWriter() if archive_format == 'zip' else TarExportWriter()
+    manifest = tempfile.SpooledTemporaryFile(max_size=EXPORT_MANIFEST_SPOOL)
+    manifest.write(b'{"artworks":[')
+    count = missing = total_bytes = 0
+    last_id = 0
+    started = time.perf_counter()
+    conn = get_db_connection()
+    try:
+        while True:
+            rows = conn.execute(
+                f'SELECT {EXPORT_COLUMNS} FROM artworks WHERE id > ?{filter_sql} ORDER BY id LIMIT ?',
+                [last_id, *filter_params, batch_size]
+            ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1]['id']
+            for row in rows:
+                entry = export_manifest_entry(row)
+                try:
+                    source = open(row['image_path'], 'rb')
+                except OSError:
+                    entry['file'] = None
+                    missing += 1
+                else:
+                    with source:
+                        # Size and data come from the open handle, so a concurrent
+                        # edit or delete cannot change what is being copied
+                        stat = os.fstat(source.fileno())
+                        for chunk in writer.add(entry['file'], source, stat.st_size, stat.st_mtime):
+                            if chunk:
+                                yield chunk
+                    total_bytes += stat.st_size
+                manifest.write((b',' if count else b'') + encode_json(entry))
+                count += 1
+        
+        summary = {'count': count, 'missing': missing, 'filters': applied or {},
+                   'exported_at': datetime.now().isoformat(timespec='seconds')}
+        manifest.write(b'],' + encode_json(summary)[1:])
+        size = manifest.tell()
+        manifest.seek(0)
+        for chunk in writer.add('manifest.json', manifest, size, time.time(), compress=True):
+            if chunk:
+                yield chunk
+        for chunk in writer.close():
+            if chunk:
+                yield chunk
+        log_event(logging.INFO, "📦 Export finished", format=archive_format, artworks=count,
+                  missing=missing, bytes=total_bytes, duration_s=f"{time.perf_counter() - started:.1f}")
+    finally:
+        conn.close()
+        manifest.close()
+
+def export_to_file(output, archive_format, args):
+    """Write an export to a path ('-' for stdout); args holds the same filters as /api/export"""
+    filter_sql, filter_params, applied = artwork_filter_sql(args)
+    target = sys.stdout.buffer if output == '-' else open(output, 'wb')
+    try:
+        for chunk in iter_export_archive(archive_format, filter_sql, filter_params, applied):
+            target.write(chunk)
+    except BaseException:
+        if target is not sys.stdout.buffer:
+            target.close()
+            os.remove(output)
+        raise
+    if target is not sys.stdout.buffer:
+        target.close()
+
+# =============================================================================
+# 🔌 API ROUTES SECTION
+# =============================================================================
+def register_api_routes(app):
+    """Register standard API routes"""
+    
+    @app.route('/get_description/<int:id>')
+    def get_description(id):
+        try:
+            conn = get_db_connection()
+            row = conn.execute('SELECT title, description FROM artworks WHERE id=?',(id,)).fetchone()
+            conn.close()
+            if row:
+                return jsonify({
+                    'success':True,
+                    'title': row['title'] or 'Untitled',
+                    'description': row['description'] or 'No description.'
+                })
+            return jsonify({'success':False,'message':'Not found'}),404
+        except Exception as e:
+            return jsonify({'success':False,'message':str(e)}),500
+
+    @app.route('/update-order', methods=['POST'])
+    def update_order():
+        try:
+            data = request.get_json()
+            order = data.get('order', [])
+            conn = get_db_connection()
+            version = bump_gallery_version(conn)
+            # One batched statement; only rows whose position actually moves get a new version
+            conn.executemany('UPDATE artworks SET position=?, version=? WHERE id=? AND position IS NOT ?',
+                             [(itm['position'], version, itm['id'], itm['position']) for itm in order])
+            publish_event(conn, 'reorder', {
+                'version': version,
+                'order': [{'id': itm['id'], 'position': itm['position']} for itm in order]
+            })
+            conn.commit()
+            conn.close()
+            event_broker.notify()
+            return jsonify({'success':True,'message':'Order updated'})
+        except Exception as e:
+            return jsonify({'success':False,'message':str(e)}),500
+
+    @app.route('/api/search')
+    def search_artworks():
+        q = request.args.get('q','').strip()
+        if not q:
+            return jsonify({'success':False,'message':'Query required'}),400
+        conn = get_db_connection()
+        return stream_artwork_listing(
+            conn,
+            f'{ARTWORK_LISTING_SELECT} WHERE title LIKE ? OR description LIKE ? ORDER BY position DESC',
+            (f'%{q}%',f'%{q}%'),
+            {'success':True,'query':q}
+        )
+
+    @app.route('/api/suggest')
+    def suggest():
+        """Search-box autocomplete: titles, models, LoRAs and frequent prompt tokens"""
+        prefix = request.args.get('prefix', '')
+        try:
+            limit = max(1, min(int(request.args.get('limit', SUGGEST_LIMIT)), SUGGEST_MAX_LIMIT))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid limit'}), 400
+        
+        suggestions = []
+        if prefix.strip():
+            conn = get_db_connection()
+            suggest_index.refresh(conn)
+            conn.close()
+            suggestions = suggest_index.suggest(prefix, limit)
+        
+        response = jsonify({'success': True, 'prefix': prefix, 'suggestions': suggestions})
+        response.headers['Cache-Control'] = 'private, max-age=10'
+        return response
+    
+    @app.route('/api/health')
+    def health_check():
+        return jsonify({'status':'healthy','service':'art-gallery'})
+
+    @app.route('/api/metrics')
+    def metrics():
+        """Prometheus scrape endpoint - per-process latency histograms"""
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    @app.route('/api/artworks')
+    def get_filtered_artworks():
+        q=request.args.get('q','').lower().strip()
+        sort=request.args.get('sort','newest')
+        try:
+            filter_sql,params,applied=artwork_filter_sql(request.args)
+        except FilterError as e:
+            return jsonify({'success':False,'message':str(e)}),e.status
+        sql=f'{ARTWORK_LISTING_SELECT} WHERE 1=1{filter_sql}'
+        if sort=='newest': sql+=' ORDER BY created_at DESC, id DESC'
+        elif sort=='oldest': sql+=' ORDER BY created_at ASC, id ASC'
+        elif sort=='a-z': sql+=f' ORDER BY {UNTITLED_LAST}, LOWER(title)'
+        elif sort=='z-a': sql+=f' ORDER BY {UNTITLED_LAST}, LOWER(title) DESC'
+        conn=get_db_connection()
+        version,nonce=get_gallery_stamp(conn)
+        # The body is a function of the arguments and the gallery version alone
+        cache_key=f"listing:{nonce}:{version}:{sorted(request.args.items(multi=True))}"
+        etag=hashlib.blake2b(cache_key.encode(),digest_size=8).hexdigest()
+        cached=memory_cache.get(cache_key)
+        if cached or etag in request.if_none_match:
+            conn.close()
+            response=Response(cached[0] if cached else b'',mimetype='application/json')
+            response.set_etag(etag)
+            return response.make_conditional(request)
+        envelope={'success':True,'query':q,'sort':sort,'version':version,**applied}
+        return stream_artwork_listing(conn,sql,params,envelope,cache_key=cache_key,etag=etag)
+
+    @app.route('/api/export')
+    def export_artworks():
+        """
+        Stream a ZIP (default) or ?format=tar of the originals plus manifest.json
+        Takes the /api/artworks filters (?q=, facets, ?color=); none exports everything
+        """
+        archive_format = request.args.get('format', 'zip').lower()
+        if archive_format not in EXPORT_FORMATS:
+            return jsonify({'success': False, 'message': 'Unknown format'}), 400
+        try:
+            filter_sql, filter_params, applied = artwork_filter_sql(request.args)
+        except FilterError as e:
+            return jsonify({'success': False, 'message': str(e)}), e.status
+        
+        filename = f"gallery-export-{datetime.now():%Y%m%d-%H%M%S}.{archive_format}"
+        response = Response(iter_export_archive(archive_format, filter_sql, filter_params, applied),
+                            mimetype=EXPORT_FORMATS[archive_format])
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response.headers['Cache-Control'] = 'no-store'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    
+    @app.route('/api/artworks/bulk', methods=['POST'])
+    def bulk_update_artworks():
+        """
+        Apply many operations in one transaction:
+            {"operations": [{"op": "delete", "id": 1},
+                            {"op": "update", "id": 2, "title": "...", "description": "..."},
+                            {"op": "move", "id": 3, "position": 10}]}
+        Each kind is one executemany, files go to the deferred-delete queue and a
+        single 'bulk' event is published. Items that cannot apply are reported in
+        results and skipped; the rest still commit
+        """
+        data = request.get_json(silent=True) or {}
+        operations = data.get('operations')
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'success': False, 'message': 'operations list required'}), 400
+        if len(operations) > BULK_MAX_OPERATIONS:
+            return jsonify({'success': False, 'message': f'At most {BULK_MAX_OPERATIONS} operations per request'}), 413
+        
+        results = [None] * len(operations)
+        valid = []
+        for index, operation in enumerate(operations):
+            op = operation.get('op') if isinstance(operation, dict) else None
+            artwork_id = operation.get('id') if isinstance(operation, dict) else None
+            message = None
+            if op not in ('delete', 'update', 'move'):
+                message = 'op must be delete, update or move'
+            elif not isinstance(artwork_id, int) or isinstance(artwork_id, bool):
+                message = 'id must be an integer'
+            elif op == 'update' and not ({'title', 'description'} & operation.keys()):
+                message = 'update needs title and/or description'
+            elif op == 'update' and any(not isinstance(operation.get(field), (str, type(None)))
+                                        for field in ('title', 'description')):
+                message = 'title and description must be strings or null'
+            elif op == 'move' and (not isinstance(operation.get('position'), (int, float))
+                                   or isinstance(operation.get('position'), bool)
+                                   or not math.isfinite(operation['position'])):
+                message = 'move needs a finite numeric position'
+            if message:
+                results[index] = {'index': index, 'id': artwork_id, 'op': op, 'status': 'invalid', 'message': message}
+            else:
+                valid.append((index, op, artwork_id, operation))
+        
+        try:
+            conn = get_db_connection()
+            existing = {row['id']: row['image_path'] for row in conn.execute(
+                'SELECT id, image_path FROM artworks WHERE id IN (SELECT value FROM json_each(?))',
+                (json.dumps(sorted({item[2] for item in valid})),)
+            )}
+            deleted_ids = {artwork_id for _i, op, artwork_id, _o in valid if op == 'delete' and artwork_id in existing}
+            
+            deletes, updates, moves = sorted(deleted_ids), [], []
+            for index, op, artwork_id, operation in valid:
+                status = 'ok'
+                if artwork_id not in existing:
+                    status = 'not_found'
+                elif op != 'delete' and artwork_id in deleted_ids:
+                    status = 'conflict'  # also deleted by this request
+                elif op == 'update':
+                    fields = {}
+                    for field in ('title', 'description'):
+                        if field in operation:
+                            value = (operation[field] or '').strip()
+                            if field == 'description':
+                                fields[field] = value or "No description provided"
+                            else:
+                                fields[field] = value or None
+                    updates.append((artwork_id, fields))
+                elif op == 'move':
+                    moves.append((artwork_id, operation['position']))
+                results[index] = {'index': index, 'id': artwork_id, 'op': op, 'status': status}
+            
+            version = bump_gallery_version(conn)
+            if updates:
+                conn.executemany(
+                    '''UPDATE artworks SET title = CASE WHEN ? THEN ? ELSE title END,
+                       description = CASE WHEN ? THEN ? ELSE description END,
+                       version = ?, content_version = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?''',
+                    [('title' in f, f.get('title'), 'description' in f, f.get('description'), version, version, i)
+                     for i, f in updates]
+                )
+            if moves:
+                conn.executemany('UPDATE artworks SET position = ?, version = ? WHERE id = ? AND position IS NOT ?',
+                                 [(position, version, i, position) for i, position in moves])
+            if deletes:
+                ids = json.dumps(deletes)
+                conn.execute('DELETE FROM artworks WHERE id IN (SELECT value FROM json_each(?))', (ids,))
+                remove_artwork_facets(conn, deletes)
+                conn.executemany('INSERT OR REPLACE INTO artwork_tombstones (artwork_id, version) VALUES (?, ?)',
+                                 [(i, version) for i in deletes])
+                enqueue_file_deletes(conn, [existing[i] for i in deletes])
+            publish_event(conn, 'bulk', {
+                'version': version,
+                'deleted': deletes,
+                'updated': [i for i, _f in updates],
+                'moved': [{'id': i, 'position': position} for i, position in moves],
+            })
+            conn.commit()
+            conn.close()
+            event_broker.notify()
+        except Exception as e:
+            log_event(logging.ERROR, "❌ Bulk update failed", operations=len(operations), error=e)
+            return jsonify({'success': False, 'message': str(e)}), 500
+        
+        failed = sum(1 for result in results if result['status'] != 'ok')
+        log_event(logging.INFO, "✅ Bulk update applied", deleted=len(deletes), updated=len(updates),
+                  moved=len(moves), failed=failed, version=version)
+        return jsonify({
+            'success': True,
+            'version': version,
+            'applied': len(results) - failed,
+            'failed': failed,
+            'results': results,
+        })
+    
+    @app.route('/api/artworks/changes')
+    def get_artwork_changes():
+        """
+        Delta sync - return only artworks changed since the client's version
+        Inserted/updated rows are sent in full, reorders as (id, position) pairs
+        """
+        try:
+            since = int(request.args.get('since', '0'))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid version'}), 400
+        
+        conn = get_db_connection()
+        version = get_gallery_version(conn)
+        
+        # A version from the future means the database was reset
+        if since > version:
+            conn.close()
+            return jsonify({'success': True, 'full_resync': True, 'version': version})
+        
+        rows = conn.execute(
+            f'''SELECT {', '.join(ARTWORK_COLUMNS)}, {THUMBNAIL_PATH_SQL} AS thumbnail_path,
+                       created_version, content_version
+                FROM artworks WHERE version > ? ORDER BY position DESC''', (since,)
+        ).fetchall()
+        deleted = [r[0] for r in conn.execute(
+            'SELECT artwork_id FROM artwork_tombstones WHERE version > ?', (since,)
+        ).fetchall()]
+        conn.close()
+        
+        inserted, updated, reordered = [], [], []
+        for r in rows:
+            if r['created_version'] > since or r['content_version'] > since:
+                d = {column: r[column] for column in ARTWORK_COLUMNS}
+                d['thumbnail_path'] = r['thumbnail_path']
+                (inserted if r['created_version'] > since else updated).append(d)
+            else:
+                reordered.append({'id': r['id'], 'position': r['position']})
+        
+        return jsonify({
+            'success': True,
+            'since': since,
+            'version': version,
+            'inserted': inserted,
+            'updated': updated,
+            'deleted': deleted,
+            'reordered': reordered
+        })
+
+    @app.route('/api/events')
+    def stream_events():
+        """
+        Server-Sent Events feed of gallery changes
+        Reconnecting clients send Last-Event-ID and get the missed events replayed
+        """
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+        
+        subscription = event_broker.subscribe()
+        
+        def generate():
+            try:
+                yield f"retry: {int(EVENT_POLL_INTERVAL * 4000)}\n\n"
+                sent_id = last_event_id
+                if sent_id is None:
+                    conn = get_db_connection()
+                    sent_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM gallery_events').fetchone()[0]
+                    conn.close()
+                else:
+                    backlog, complete = event_broker.replay(sent_id)
+                    if not complete:
+                        # Too far behind - tell the client to refetch the listing
+                        yield format_sse(sent_id, 'resync', '{}')
+                    for event_id, event_type, payload in backlog:
+                        yield format_sse(event_id, event_type, payload)
+                        sent_id = event_id
+                
+                while True:
+                    try:
+                        event = subscription.get(timeout=EVENT_HEARTBEAT_INTERVAL)
+                    except queue.Empty:
+                        yield ': keep-alive\n\n'
+                        continue
+                    if event is None:
+                        return
+                    event_id, event_type, payload = event
+                    if event_id <= sent_id:
+                        continue
+                    yield format_sse(event_id, event_type, payload)
+                    sent_id = event_id
+            finally:
+                event_broker.unsubscribe(subscription)
+        
+        response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    @app.route('/api/facets')
+    def get_facets():
+        """
+        Artwork counts per facet value, most common first
+        ?facet=lora restricts to one facet, ?limit=N caps values per facet
+        """
+        facet = request.args.get('facet')
+        if facet is not None and facet not in COUNTED_FACETS:
+            return jsonify({'success': False, 'message': 'Unknown facet'}), 400
+        try:
+            limit = max(1, int(request.args.get('limit', FACET_LIMIT)))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid limit'}), 400
         
-        return original_metadata
+        conn = get_db_connection()
+        if facet:
+            rows = conn.execute(
+                'SELECT facet, value, count FROM facet_counts WHERE facet = ? ORDER BY count DESC, value LIMIT ?',
+                (facet, limit)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                'SELECT facet, value, count FROM facet_counts ORDER BY facet, count DESC, value'
+            ).fetchall()
+        conn.close()
         
-    except Exception as e:
-        print(f"❌ Upload processing failed: {e}")
-        return {}
-
-# =============================================================================
-# 🔌 API ROUTES SECTION
-# =============================================================================
-def register_api_routes(app):
-    """Register standard API routes"""
+        facets = {name: [] for name in ((facet,) if facet else COUNTED_FACETS)}
+        for row in rows:
+            values = facets.get(row['facet'])
+            if values is not None and len(values) < limit:
+                values.append({'value': row['value'], 'count': row['count']})
+        return jsonify({'success': True, 'facets': facets})
     
-    @app.route('/get_description/<int:id>')
-    def get_description(id):
+    @app.route('/api/artwork/<int:artwork_id>/similar')
+    def get_similar_artworks(artwork_id):
+        """
+        Near-duplicate lookup by perceptual hash
+        ?radius=N returns what lies within N bits (nearest first, at most
+        SIMILAR_MAX_RESULTS), otherwise the k nearest
+        """
         try:
-            conn = get_db_connection()
-            row = conn.execute('SELECT title, description FROM artworks WHERE id=?',(id,)).fetchone()
+            k = min(int(request.args.get('k', 12)), SIMILAR_MAX_RESULTS)
+            radius = request.args.get('radius')
+            radius = int(radius) if radius is not None else None
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid k or radius'}), 400
+        if radius is not None and not 0 <= radius <= SIMILAR_MAX_RADIUS:
+            return jsonify({'success': False, 'message': f'radius must be 0-{SIMILAR_MAX_RADIUS}'}), 400
+        
+        conn = get_db_connection()
+        similarity_index.refresh(conn)
+        value = similarity_index.hash_of(artwork_id)
+        if value is None:
             conn.close()
-            if row:
-                return jsonify({
-                    'success':True,
-                    'title': row['title'] or 'Untitled',
-                    'description': row['description'] or 'No description.'
-                })
-            return jsonify({'success':False,'message':'Not found'}),404
-        except Exception as e:
-            return jsonify({'success':False,'message':str(e)}),500
+            return jsonify({'success': False, 'message': 'Artwork not found or has no image hash'}), 404
+        
+        if radius is not None:
+            matches = [m for m in similarity_index.within(value, radius) if m[1] != artwork_id][:SIMILAR_MAX_RESULTS]
+        else:
+            matches = similarity_index.nearest(value, k, exclude=artwork_id)
+        
+        artworks = fetch_ranked_artworks(conn, matches, 'distance')
+        conn.close()
+        
+        return jsonify({'success': True, 'id': artwork_id, 'count': len(artworks), 'artworks': artworks})
 
-    @app.route('/update-order', methods=['POST'])
-    def update_order():
+    @app.route('/api/artwork/<int:artwork_id>/similar-prompts')
+    def get_similar_prompts(artwork_id):
+        """Artworks whose prompts are closest by TF-IDF cosine similarity"""
+        if prompt_index is None:
+            return jsonify({'success': False, 'message': 'Prompt similarity requires numpy'}), 501
         try:
-            data = request.get_json()
-            order = data.get('order', [])
-            conn = get_db_connection()
-            for itm in order:
-                conn.execute('UPDATE artworks SET position=? WHERE id=?',
-                             (itm['position'], itm['id']))
-            conn.commit()
+            k = min(int(request.args.get('k', 12)), 200)
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid k'}), 400
+        
+        conn = get_db_connection()
+        artwork = conn.execute(
+            'SELECT prompt, negative_prompt, description FROM artworks WHERE id = ?', (artwork_id,)
+        ).fetchone()
+        if not artwork:
             conn.close()
-            return jsonify({'success':True,'message':'Order updated'})
-        except Exception as e:
-            return jsonify({'success':False,'message':str(e)}),500
-
-    @app.route('/api/search')
-    def search_artworks():
-        q = request.args.get('q','').strip()
+            return jsonify({'success': False, 'message': 'Artwork not found'}), 404
+        
+        prompt_index.refresh(conn)
+        matches = prompt_index.search(prompt_terms(*artwork), k, exclude=artwork_id)
+        artworks = fetch_ranked_artworks(conn, matches, 'score')
+        conn.close()
+        return jsonify({'success': True, 'id': artwork_id, 'count': len(artworks), 'artworks': artworks})
+    
+    @app.route('/api/search/semantic')
+    def search_semantic():
+        """Free-text prompt search ranked by TF-IDF cosine similarity"""
+        q = request.args.get('q', '').strip()
         if not q:
-            return jsonify({'success':False,'message':'Query required'}),400
+            return jsonify({'success': False, 'message': 'Query required'}), 400
+        if prompt_index is None:
+            return jsonify({'success': False, 'message': 'Semantic search requires numpy'}), 501
+        try:
+            k = min(int(request.args.get('k', 50)), 500)
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid k'}), 400
+        
         conn = get_db_connection()
-        rows = conn.execute(
-            """
-            SELECT * FROM artworks
-            WHERE title LIKE ? OR description LIKE ?
-            ORDER BY position DESC
-            """, (f'%{q}%',f'%{q}%')
-        ).fetchall()
+        prompt_index.refresh(conn)
+        matches = prompt_index.search(prompt_terms(q), k)
+        artworks = fetch_ranked_artworks(conn, matches, 'score')
         conn.close()
-        arts=[]
-        for r in rows:
-            d=dict(r)
-            fn=os.path.basename(d['image_path'])
-            d['thumbnail_path'] = f"/thumbnail/{fn}"
-            arts.append(d)
-        return jsonify({'success':True,'count':len(arts),'artworks':arts,'query':q})
-
-    @app.route('/api/health')
-    def health_check():
-        return jsonify({'status':'healthy','service':'art-gallery'})
-
-    @app.route('/api/artworks')
-    def get_filtered_artworks():
-        q=request.args.get('q','').lower().strip()
-        sort=request.args.get('sort','newest')
-        sql='SELECT * FROM artworks WHERE 1=1'
-        params=[]
-        if q:
-            sql+=" AND (LOWER(title) LIKE ? OR LOWER(description) LIKE ?)"
-            params.extend([f'%{q}%',f'%{q}%'])
-        if sort=='newest': sql+=' ORDER BY created_at DESC, id DESC'
-        elif sort=='oldest': sql+=' ORDER BY created_at ASC, id ASC'
-        elif sort=='a-z': sql+=' ORDER BY CASE WHEN title IS NULL OR title="" THEN 1 ELSE 0 END, LOWER(title)'
-        elif sort=='z-a': sql+=' ORDER BY CASE WHEN title IS NULL OR title="" THEN 1 ELSE 0 END, LOWER(title) DESC'
-        conn=get_db_connection()
-        rows=conn.execute(sql,params).fetchall()
+        return jsonify({'success': True, 'query': q, 'count': len(artworks), 'artworks': artworks})
+    
+    @app.route('/api/duplicates')
+    def get_duplicate_clusters():
+        """Bulk report of near-duplicate clusters (artwork ids, largest first)"""
+        try:
+            radius = int(request.args.get('radius', DUPLICATE_RADIUS))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid radius'}), 400
+        if not 0 <= radius <= DUPLICATE_MAX_RADIUS:
+            return jsonify({'success': False, 'message': f'radius must be 0-{DUPLICATE_MAX_RADIUS}'}), 400
+        
+        conn = get_db_connection()
+        similarity_index.refresh(conn)
         conn.close()
-        arts=[]
-        for r in rows:
-            d=dict(r)
-            fn=os.path.basename(d['image_path'])
-            d['thumbnail_path']=f"/thumbnail/{fn}"
-            arts.append(d)
-        return jsonify({'success':True,'count':len(arts),'query':q,'sort':sort,'artworks':arts})
+        clusters = similarity_index.clusters(radius)
+        return jsonify({
+            'success': True,
+            'radius': radius,
+            'count': len(clusters),
+            'duplicates': sum(len(c) - 1 for c in clusters),
+            'clusters': clusters
+        })
 
+    @app.route('/api/metadata')
+    def get_metadata_batch():
+        """
+        AI metadata for several artworks in one round trip: ?ids=1,2,3
+        Unknown ids and missing files are listed under 'missing'
+        """
+        try:
+            ids = list(dict.fromkeys(int(i) for i in request.args.get('ids', '').split(',') if i.strip()))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'ids must be comma-separated integers'}), 400
+        if not ids:
+            return jsonify({'success': False, 'message': 'ids required'}), 400
+        if len(ids) > METADATA_BATCH_MAX:
+            return jsonify({'success': False, 'message': f'At most {METADATA_BATCH_MAX} ids per request'}), 400
+        
+        conn = get_db_connection()
+        paths = {row['id']: row['image_path'] for row in conn.execute(
+            'SELECT id, image_path FROM artworks WHERE id IN (SELECT value FROM json_each(?))', (json.dumps(ids),)
+        )}
+        conn.close()
+        
+        metadata = {}
+        missing = []
+        for artwork_id in ids:
+            path = paths.get(artwork_id)
+            if path is None or not os.path.exists(path):
+                missing.append(artwork_id)
+            else:
+                metadata[str(artwork_id)] = cached_ai_metadata(path)
+        return jsonify({'success': True, 'metadata': metadata, 'missing': missing})
+    
     @app.route('/api/metadata/<int:id>')
     def get_image_metadata(id):
         """
@@ -755,7 +4388,7 @@ def register_api_routes(app):
                 return jsonify({'success': False, 'message': 'Image file missing'}), 404
             
             # Extract AI metadata using enhanced function
-            metadata = extract_ai_metadata_detailed(path)
+            metadata = cached_ai_metadata(path)
             
             return jsonify({
                 'success': True,
@@ -763,7 +4396,7 @@ def register_api_routes(app):
             })
             
         except Exception as e:
-            print(f"❌ API error: {e}")
+            log_event(logging.ERROR, "❌ API error", artwork_id=id, error=e)
             return jsonify({
                 'success': False,
                 'message': str(e)
@@ -772,6 +4405,47 @@ def register_api_routes(app):
 # =============================================================================
 # 💡 LIGHTBOX API ROUTES SECTION
 # =============================================================================
+# Sort keys of the gallery orders; ties are broken by id in the last key's direction
+WINDOW_SORTS = {
+    'position': (('position', 'DESC'),),
+    'newest': (('created_at', 'DESC'),),
+    'oldest': (('created_at', 'ASC'),),
+    'a-z': ((UNTITLED_LAST, 'ASC'), ("COALESCE(LOWER(title), '')", 'ASC')),
+    'z-a': ((UNTITLED_LAST, 'ASC'), ("COALESCE(LOWER(title), '')", 'DESC')),
+}
+
+def keyset_neighbours_sql(keys, forward):
+    """
+    WHERE condition and ORDER BY for the rows following (forward) or
+    preceding the current one in a multi-key order; the condition takes each
+    current key value twice in key order, then the current id
+    """
+    def op(direction):
+        return '>' if (direction == 'ASC') == forward else '<'
+    
+    id_direction = keys[-1][1]
+    condition = f'id {op(id_direction)} ?'
+    for expr, direction in reversed(keys):
+        condition = f'({expr} {op(direction)} ? OR ({expr} = ? AND {condition}))'
+    # A plain range on the leading key lets its index bound the walk
+    leading, direction = keys[0]
+    condition = f'{leading} {op(direction)}= ? AND {condition}'
+    
+    def flip(direction):
+        return direction if forward else ('ASC' if direction == 'DESC' else 'DESC')
+    
+    order = ', '.join(f'{expr} {flip(direction)}' for expr, direction in keys)
+    return condition, f'{order}, id {flip(id_direction)}'
+
+def lightbox_window_item(row):
+    """Listing fields plus palette and AI metadata for one window entry"""
+    item = {key: row[key] for key in ARTWORK_COLUMNS}
+    item['thumbnail_path'] = row['thumbnail_path']
+    item['palette'] = palette_to_hex(row['palette'])
+    path = row['image_path']
+    item['metadata'] = cached_ai_metadata(path) if os.path.exists(path) else None
+    return item
+
 def register_lightbox_api_routes(app):
     """
     Register API routes specifically for lightbox inline editing
@@ -847,6 +4521,11 @@ def register_lightbox_api_routes(app):
                 update_fields.append('description = ?')
                 update_values.append(description)
             
+            # Stamp the row with a new gallery version for delta sync
+            version = bump_gallery_version(conn)
+            update_fields.extend(['version = ?', 'content_version = ?', 'updated_at = CURRENT_TIMESTAMP'])
+            update_values.extend([version, version])
+            
             # Add artwork_id for WHERE clause
             update_values.append(artwork_id)
             
@@ -854,7 +4533,6 @@ def register_lightbox_api_routes(app):
             update_query = f"UPDATE artworks SET {', '.join(update_fields)} WHERE id = ?"
             
             cursor = conn.execute(update_query, update_values)
-            conn.commit()
             
             # Get updated artwork data
             updated_artwork = conn.execute(
@@ -862,11 +4540,19 @@ def register_lightbox_api_routes(app):
                 (artwork_id,)
             ).fetchone()
             
+            publish_event(conn, 'text-update', {
+                'version': version,
+                'artwork': dict(updated_artwork),
+                'updated_fields': list(data.keys())
+            })
+            conn.commit()
             conn.close()
+            event_broker.notify()
             
             # Log the update
             updated_fields = list(data.keys())
-            print(f"✅ Artwork {artwork_id} text updated via lightbox: {', '.join(updated_fields)}")
+            log_event(logging.INFO, "✅ Artwork text updated via lightbox", artwork_id=artwork_id,
+                      fields=','.join(updated_fields))
             
             # Return success response with updated data
             return jsonify({
@@ -882,12 +4568,64 @@ def register_lightbox_api_routes(app):
             })
             
         except Exception as e:
-            print(f"❌ Error updating artwork text via lightbox: {e}")
+            log_event(logging.ERROR, "❌ Error updating artwork text via lightbox", artwork_id=artwork_id, error=e)
             return jsonify({
                 'success': False,
                 'message': f'Failed to update artwork: {str(e)}'
             }), 500
     
+    @app.route('/api/lightbox/window')
+    def get_lightbox_window():
+        """
+        An artwork plus its ?radius= nearest neighbours on each side in a gallery
+        ?sort= order, each with info and metadata, so paging is served locally
+        Link: rel=preload headers let the browser start fetching the images
+        """
+        sort = request.args.get('sort', 'position')
+        if sort not in WINDOW_SORTS:
+            return jsonify({'success': False, 'message': 'Unknown sort'}), 400
+        try:
+            artwork_id = int(request.args.get('id', ''))
+            radius = max(0, min(int(request.args.get('radius', LIGHTBOX_WINDOW_RADIUS)), LIGHTBOX_WINDOW_MAX))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'id and radius must be integers'}), 400
+        
+        keys = WINDOW_SORTS[sort]
+        select = f'SELECT {", ".join(ARTWORK_COLUMNS)}, {THUMBNAIL_PATH_SQL} AS thumbnail_path, palette'
+        conn = get_db_connection()
+        current = conn.execute(
+            f'{select}, {", ".join(expr for expr, _d in keys)} FROM artworks WHERE id = ?', (artwork_id,)
+        ).fetchone()
+        if current is None:
+            conn.close()
+            return jsonify({'success': False, 'message': 'Artwork not found'}), 404
+        
+        key_values = tuple(current)[-len(keys):]
+        params = [key_values[0]] + [value for value in key_values for _twice in (0, 1)] + [artwork_id, radius]
+        neighbours = {}
+        for side, forward in (('previous', False), ('next', True)):
+            condition, order = keyset_neighbours_sql(keys, forward)
+            neighbours[side] = [lightbox_window_item(row) for row in conn.execute(
+                f'{select} FROM artworks WHERE {condition} ORDER BY {order} LIMIT ?', params
+            )] if radius else []
+        conn.close()
+        
+        response = jsonify({
+            'success': True,
+            'sort': sort,
+            'artwork': lightbox_window_item(current),
+            'previous': neighbours['previous'],
+            'next': neighbours['next'],
+        })
+        # Nearest neighbours first, so the browser fetches them before the far ones
+        preload = [current] + [item for pair in itertools.zip_longest(neighbours['next'], neighbours['previous'])
+                               for item in pair if item]
+        response.headers['Link'] = ', '.join(
+            f'</{item["image_path"]}>; rel=preload; as=image' for item in preload
+        )
+        response.headers['Cache-Control'] = 'private, max-age=10'
+        return response
+    
     @app.route('/api/artwork/<int:artwork_id>/info', methods=['GET'])  
     def get_artwork_info(artwork_id):
         """
@@ -897,7 +4635,7 @@ def register_lightbox_api_routes(app):
         try:
             conn = get_db_connection()
             artwork = conn.execute(
-                'SELECT id, title, description, image_path FROM artworks WHERE id = ?',
+                'SELECT id, title, description, image_path, palette FROM artworks WHERE id = ?',
                 (artwork_id,)
             ).fetchone()
             conn.close()
@@ -914,18 +4652,20 @@ def register_lightbox_api_routes(app):
                     'id': artwork['id'],
                     'title': artwork['title'],
                     'description': artwork['description'],
-                    'image_path': artwork['image_path']
+                    'image_path': artwork['image_path'],
+                    'palette': palette_to_hex(artwork['palette'])
                 }
             })
             
         except Exception as e:
-            print(f"❌ Error fetching artwork info: {e}")
+            log_event(logging.ERROR, "❌ Error fetching artwork info", artwork_id=artwork_id, error=e)
             return jsonify({
                 'success': False,
                 'message': f'Failed to fetch artwork: {str(e)}'
             }), 500
 
     @app.route('/api/extract-metadata', methods=['POST'])
+    @admit_image_upload
     def extract_metadata_api():
         """
         Extract metadata from uploaded image without saving to database
@@ -960,7 +4700,7 @@ def register_lightbox_api_routes(app):
                 
                 # Open image with proper error handling
                 try:
-                    img = Image.open(temp_path)
+                    img = open_image(temp_path)
                 except Exception as e:
                     return jsonify({
                         'success': False,
@@ -979,7 +4719,7 @@ def register_lightbox_api_routes(app):
                         'has_transparency': img.mode in ('RGBA', 'LA', 'P') and 'transparency' in img.info
                     }
                 except Exception as e:
-                    print(f"⚠️ Error getting file info: {e}")
+                    log_event(logging.WARNING, "⚠️ Error getting file info", error=e)
                     metadata['file_info'] = {'filename': file.filename}
                 
                 # Extract AI metadata using existing function
@@ -988,7 +4728,7 @@ def register_lightbox_api_routes(app):
                     if ai_metadata:
                         metadata['ai_generation'] = ai_metadata
                 except Exception as e:
-                    print(f"⚠️ Error extracting AI metadata: {e}")
+                    log_event(logging.WARNING, "⚠️ Error extracting AI metadata", error=e)
                 
                 # Extract EXIF data
                 try:
@@ -1014,7 +4754,7 @@ def register_lightbox_api_routes(app):
                         if exif_data:
                             metadata['exif'] = exif_data
                 except Exception as e:
-                    print(f"⚠️ Error extracting EXIF: {e}")
+                    log_event(logging.WARNING, "⚠️ Error extracting EXIF", error=e)
                 
                 # Extract GPS data
                 try:
@@ -1052,7 +4792,7 @@ def register_lightbox_api_routes(app):
                             if 'GPSTimeStamp' in gps_data:
                                 metadata['gps']['timestamp'] = str(gps_data['GPSTimeStamp'])
                 except Exception as e:
-                    print(f"⚠️ Error extracting GPS: {e}")
+                    log_event(logging.WARNING, "⚠️ Error extracting GPS", error=e)
                 
                 # Extract PNG metadata
                 try:
@@ -1066,12 +4806,12 @@ def register_lightbox_api_routes(app):
                                 except:
                                     pass
                 except Exception as e:
-                    print(f"⚠️ Error extracting PNG metadata: {e}")
+                    log_event(logging.WARNING, "⚠️ Error extracting PNG metadata", error=e)
                 
                 # Clean up empty sections
                 metadata = {k: v for k, v in metadata.items() if v}
                 
-                print(f"✅ Metadata extracted successfully for {file.filename}")
+                log_event(logging.DEBUG, "✅ Metadata extracted successfully", filename=file.filename)
                 return jsonify({
                     'success': True,
                     'metadata': metadata
@@ -1083,11 +4823,11 @@ def register_lightbox_api_routes(app):
                     if os.path.exists(temp_path):
                         os.remove(temp_path)
                 except Exception as e:
-                    print(f"⚠️ Error cleaning up temp file: {e}")
+                    log_event(logging.WARNING, "⚠️ Error cleaning up temp file", path=temp_path, error=e)
             
         except Exception as e:
-            print(f"❌ Metadata extraction error: {e}")
-            traceback.print_exc()  # Print full stack trace for debugging
+            # Full stack trace for debugging
+            logger.exception("❌ Metadata extraction error", extra={'fields': {'error': e}})
             return jsonify({
                 'success': False,
                 'message': f'Failed to extract metadata: {str(e)}'
@@ -1096,40 +4836,159 @@ def register_lightbox_api_routes(app):
 # =============================================================================
 # 🛣️ MAIN ROUTES SECTION
 # =============================================================================
+def insert_artwork(conn, image_path, title, description, position, version,
+                   image_info, phash, colors, generation):
+    """Insert one artwork row plus its facets inside the caller's transaction"""
+    cursor = conn.execute(
+        '''INSERT INTO artworks
+           (title, description, image_path, position, updated_at, version, created_version, content_version,
+            width, height, byte_size, format, placeholder, phash, color_histogram, palette,
+            prompt, negative_prompt, facets_indexed)
+           VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)''',
+        (title, description, image_path, position,
+         version, version, version, image_info['width'], image_info['height'],
+         image_info['byte_size'], image_info['format'], image_info['placeholder'],
+         to_signed64(phash) if phash is not None else None,
+         colors['color_histogram'], colors['palette'],
+         generation['prompt'], generation['negative_prompt'])
+    )
+    artwork_id = cursor.lastrowid
+    set_artwork_facets(conn, artwork_id, generation['facets'], is_new=True)
+    return artwork_id
+
 def register_routes(app):
     """Register main application routes"""
     
     @app.route('/')
     def index():
         conn = get_db_connection()
-        artworks = conn.execute('SELECT * FROM artworks ORDER BY position DESC').fetchall()
-        conn.close()
+        version = get_gallery_version(conn)
         
-        # Process artworks để thêm thumbnail path
-        processed_artworks = []
-        for artwork in artworks:
-            art_dict = dict(artwork)
-            filename = art_dict['image_path'].split('/')[-1]
-            art_dict['thumbnail_path'] = f"/thumbnail/{filename}"
-            processed_artworks.append(art_dict)
-            
-        return render_template('index.html', artworks=processed_artworks)
+        # Stream the page while rows are read; the connection closes when the loop ends
+        artworks = iter_artworks(conn, f'{ARTWORK_LISTING_SELECT} ORDER BY position DESC', close=True)
+        return stream_template('index.html', artworks=artworks, gallery_version=version)
 
     @app.route('/thumbnail/<path:filename>')
     def serve_thumbnail(filename):
-        """Serve thumbnail, create if not exists"""
-        thumb_path = f"static/thumbnails/{filename}"
-        original_path = f"static/uploads/{filename}"
+        """Serve thumbnail, create if not exists; served bytes go through the memory cache"""
+        cache_key = f'thumbnail:{filename}'
+        cached = memory_cache.get(cache_key)
+        if cached is None:
+            cached = load_thumbnail(filename)
+            if cached is not None:
+                memory_cache.put(cache_key, *cached)
+        if cached is None:
+            # send_file resolves relative paths against the app root, not the cwd
+            return send_file(os.path.abspath(f"static/uploads/{filename}"))
         
-        if not os.path.exists(thumb_path) and os.path.exists(original_path):
-            create_thumbnail_with_metadata(original_path)
-            
-        if os.path.exists(thumb_path):
-            return send_file(thumb_path)
-        else:
-            return send_file(original_path)
+        data, etag, mimetype = cached
+        response = Response(data, mimetype=mimetype)
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
 
+    @app.route('/img/<int:artwork_id>')
+    def serve_resized_image(artwork_id):
+        """
+        Resized rendition of an original, e.g. /img/12?w=1280 or ?w=320&h=320&fit=cover
+        w/h must be in RESIZE_SIZES; fmt=auto picks WebP when the browser accepts it
+        The URL names the artwork, not the image, so only ?v=<upload file stem>
+        makes a response cacheable; without it browsers revalidate by ETag
+        """
+        try:
+            width = int(request.args.get('w', 0))
+            height = int(request.args.get('h', 0))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'w and h must be integers'}), 400
+        fit = request.args.get('fit', 'contain')
+        fmt = request.args.get('fmt', 'auto').lower()
+        if not (width or height) or any(size and size not in RESIZE_SIZES for size in (width, height)):
+            return jsonify({'success': False, 'message': f'w/h must be one of {list(RESIZE_SIZES)}'}), 400
+        if fit not in ('contain', 'cover') or (fit == 'cover' and not (width and height)):
+            return jsonify({'success': False, 'message': 'fit must be contain, or cover with both w and h'}), 400
+        if fmt != 'auto' and fmt not in RESIZE_FORMATS:
+            return jsonify({'success': False, 'message': f'fmt must be auto or one of {list(RESIZE_FORMATS)}'}), 400
+        
+        conn = get_db_connection()
+        row = conn.execute('SELECT image_path FROM artworks WHERE id = ?', (artwork_id,)).fetchone()
+        conn.close()
+        if row is None:
+            return jsonify({'success': False, 'message': 'Artwork not found'}), 404
+        original = row['image_path']
+        if original.lower().endswith('.svg'):
+            return send_file(os.path.abspath(original))  # vector - already any size
+        
+        negotiated = fmt == 'auto'
+        if negotiated:
+            if 'image/webp' in request.headers.get('Accept', ''):
+                fmt = 'webp'
+            else:
+                fmt = 'png' if original.lower().endswith(('.png', '.gif')) else 'jpeg'
+        
+        # The upload's uuid name changes with the image, so keys never go stale
+        stem = os.path.splitext(os.path.basename(original))[0]
+        key = f"{stem}-{width}x{height}-{fit}.{fmt}"
+        fp = resize_cache.open(key)
+        if fp is None:
+            if not os.path.exists(original):
+                return jsonify({'success': False, 'message': 'Image file missing'}), 404
+            data = render_resized(original, width, height, fit, fmt)
+            resize_cache.put(key, data)
+            fp = io.BytesIO(data)
+        
+        max_age = RESIZE_MAX_AGE if request.args.get('v') == stem else 0
+        response = send_file(fp, mimetype=f'image/{fmt}', etag=key, max_age=max_age, conditional=True)
+        if negotiated:
+            response.vary.add('Accept')
+        return response
+    
+    @app.route('/api/sprites')
+    def get_sprite_sheet():
+        """
+        Layout of one gallery page's thumbnails in a single sprite image, so a
+        page paints from two requests instead of one per thumbnail:
+        ?sort=position&page=0&per_page=60
+        Sprites render in the background; until the page's current one is
+        ready, 'sprite' is null and clients load the thumbnails one by one
+        """
+        sort = request.args.get('sort', 'position')
+        if sort not in WINDOW_SORTS:
+            return jsonify({'success': False, 'message': 'Unknown sort'}), 400
+        try:
+            page = max(0, int(request.args.get('page', 0)))
+            per_page = int(request.args.get('per_page', SPRITE_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'page and per_page must be integers'}), 400
+        if not 1 <= per_page <= SPRITE_MAX_PAGE_SIZE:
+            return jsonify({'success': False, 'message': f'per_page must be 1-{SPRITE_MAX_PAGE_SIZE}'}), 400
+        if page > SPRITE_MAX_PAGE:
+            return jsonify({'success': False, 'message': f'page must be 0-{SPRITE_MAX_PAGE}'}), 400
+        
+        key, layout = build_sprite(sort, page, per_page, render=False)
+        if layout is None:
+            sprite_renderer.request(sort, page, per_page)
+        response = jsonify({
+            'success': True,
+            'sort': sort,
+            'page': page,
+            'per_page': per_page,
+            'sprite': f'/sprite/{key}.webp' if key and layout else None,
+            **(layout or {'tiles': []}),
+        })
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
+    @app.route('/sprite/<key>.webp')
+    def serve_sprite(key):
+        """Sprite image named by /api/sprites; keys are content hashes, so responses never go stale"""
+        fp = resize_cache.open(f'{key}.webp')
+        if fp is None:
+            # Evicted since /api/sprites named it; the next /api/sprites call renders it again
+            return jsonify({'success': False, 'message': 'Sprite not available'}), 404
+        return send_file(fp, mimetype='image/webp', etag=key, max_age=RESIZE_MAX_AGE, conditional=True)
+    
     @app.route('/add', methods=['POST'])
+    @admit_image_upload
     def add_artwork():
         try:
             if 'image' not in request.files:
@@ -1159,6 +5018,10 @@ def register_routes(app):
             
             # Create thumbnail with metadata
             create_thumbnail_with_metadata(file_path)
+            image_info = compute_image_info(file_path)
+            phash = compute_perceptual_hash(file_path)
+            colors = compute_color_features(file_path)
+            generation = compute_generation_info(file_path)
             
             title = request.form.get('title', '').strip()
             description = request.form.get('description', '').strip()
@@ -1166,17 +5029,15 @@ def register_routes(app):
                 description = "No description provided"
             
             conn = get_db_connection()
+            version = bump_gallery_version(conn)
             max_pos = conn.execute('SELECT MAX(position) FROM artworks').fetchone()[0] or 0
             new_pos = max_pos + 1
             
             # Get the new artwork ID and return artwork data
-            cursor = conn.execute(
-                'INSERT INTO artworks (title, description, image_path, position) VALUES (?, ?, ?, ?)',
-                (title if title else None, description, f"static/uploads/{unique_filename}", new_pos)
+            new_id = insert_artwork(
+                conn, f"static/uploads/{unique_filename}", title if title else None, description, new_pos,
+                version, image_info, phash, colors, generation
             )
-            new_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
             
             # Return complete artwork data for frontend animation
             artwork_data = {
@@ -1185,10 +5046,18 @@ def register_routes(app):
                 'description': description,
                 'image_path': f"static/uploads/{unique_filename}",
                 'thumbnail_path': f"/thumbnail/{unique_filename}",
-                'position': new_pos
+                'position': new_pos,
+                'version': version,
+                **image_info
             }
             
-            print(f"✅ Artwork added with metadata preserved: {unique_filename}")
+            publish_event(conn, 'add', {'version': version, 'artwork': artwork_data})
+            conn.commit()
+            conn.close()
+            event_broker.notify()
+            sprite_renderer.request('position', 0, SPRITE_PAGE_SIZE)  # uploads land on the first page
+            
+            log_event(logging.INFO, "✅ Artwork added with metadata preserved", artwork_id=new_id, file=unique_filename)
             
             return jsonify({
                 'success': True,
@@ -1198,7 +5067,7 @@ def register_routes(app):
             })
             
         except Exception as e:
-            print(f"❌ Error adding artwork: {e}")
+            log_event(logging.ERROR, "❌ Error adding artwork", error=e)
             if 'file_path' in locals() and os.path.exists(file_path):
                 try:
                     os.remove(file_path)
@@ -1207,6 +5076,7 @@ def register_routes(app):
             return jsonify({'success': False, 'message': f'Failed to add artwork: {str(e)}'}), 500
 
     @app.route('/edit/<int:id>', methods=['POST'])
+    @admit_image_upload
     def edit_artwork(id):
         try:
             title = request.form.get('title', '').strip()
@@ -1245,27 +5115,37 @@ def register_routes(app):
                     file.save(file_path)
                     
                 create_thumbnail_with_metadata(file_path)
+                image_info = compute_image_info(file_path)
+                phash = compute_perceptual_hash(file_path)
+                colors = compute_color_features(file_path)
+                generation = compute_generation_info(file_path)
                 new_image_path = f"static/uploads/{unique_filename}"
                 
-                # Cleanup old files
-                old_image = artwork['image_path']
-                cleanup_old_files(old_image)
-                
+                version = bump_gallery_version(conn)
                 conn.execute(
-                    'UPDATE artworks SET title = ?, description = ?, image_path = ? WHERE id = ?',
-                    (title if title else None, description, new_image_path, id)
+                    '''UPDATE artworks SET title = ?, description = ?, image_path = ?,
+                       width = ?, height = ?, byte_size = ?, format = ?, placeholder = ?, phash = ?,
+                       color_histogram = ?, palette = ?, prompt = ?, negative_prompt = ?, facets_indexed = 1,
+                       updated_at = CURRENT_TIMESTAMP, version = ?, content_version = ? WHERE id = ?''',
+                    (title if title else None, description, new_image_path,
+                     image_info['width'], image_info['height'], image_info['byte_size'],
+                     image_info['format'], image_info['placeholder'],
+                     to_signed64(phash) if phash is not None else None,
+                     colors['color_histogram'], colors['palette'],
+                     generation['prompt'], generation['negative_prompt'], version, version, id)
                 )
+                set_artwork_facets(conn, id, generation['facets'])
+                enqueue_file_deletes(conn, [artwork['image_path']])
                 
-                print(f"✅ Artwork updated with metadata preserved: {unique_filename}")
+                log_event(logging.INFO, "✅ Artwork updated with metadata preserved", artwork_id=id, file=unique_filename)
             else:
+                version = bump_gallery_version(conn)
                 conn.execute(
-                    'UPDATE artworks SET title = ?, description = ? WHERE id = ?',
-                    (title if title else None, description, id)
+                    '''UPDATE artworks SET title = ?, description = ?,
+                       updated_at = CURRENT_TIMESTAMP, version = ?, content_version = ? WHERE id = ?''',
+                    (title if title else None, description, version, version, id)
                 )
-                print(f"✅ Artwork metadata updated: {id}")
-            
-            conn.commit()
-            conn.close()
+                log_event(logging.INFO, "✅ Artwork metadata updated", artwork_id=id)
             
             # Return updated artwork data
             artwork_data = {
@@ -1274,9 +5154,18 @@ def register_routes(app):
                 'description': description,
                 'image_path': new_image_path if new_image_path else artwork['image_path'],
                 'thumbnail_path': f"/thumbnail/{new_unique_filename}" if new_unique_filename else f"/thumbnail/{artwork['image_path'].split('/')[-1]}",
-                'position': artwork['position']
+                'position': artwork['position'],
+                'version': version,
+                **(image_info if new_image_path else {
+                    key: artwork[key] for key in ('width', 'height', 'byte_size', 'format', 'placeholder')
+                })
             }
             
+            publish_event(conn, 'edit', {'version': version, 'artwork': artwork_data})
+            conn.commit()
+            conn.close()
+            event_broker.notify()
+            
             return jsonify({
                 'success': True,
                 'message': 'Artwork updated successfully!',
@@ -1285,7 +5174,7 @@ def register_routes(app):
             })
             
         except Exception as e:
-            print(f"❌ Error updating artwork: {e}")
+            log_event(logging.ERROR, "❌ Error updating artwork", artwork_id=id, error=e)
             if 'file_path' in locals() and os.path.exists(file_path):
                 try:
                     os.remove(file_path)
@@ -1302,14 +5191,20 @@ def register_routes(app):
             if not artwork:
                 return jsonify({'success': False, 'message': 'Artwork not found'}), 404
             
-            img_path = artwork['image_path']
-            cleanup_old_files(img_path)
-            
+            version = bump_gallery_version(conn)
             conn.execute('DELETE FROM artworks WHERE id = ?', (id,))
+            set_artwork_facets(conn, id, [])
+            enqueue_file_deletes(conn, [artwork['image_path']])
+            conn.execute(
+                'INSERT OR REPLACE INTO artwork_tombstones (artwork_id, version) VALUES (?, ?)',
+                (id, version)
+            )
+            publish_event(conn, 'delete', {'version': version, 'id': id})
             conn.commit()
             conn.close()
+            event_broker.notify()
             
-            print(f"✅ Artwork deleted: {id}")
+            log_event(logging.INFO, "✅ Artwork deleted", artwork_id=id)
             
             return jsonify({
                 'success': True,
@@ -1317,7 +5212,7 @@ def register_routes(app):
             })
             
         except Exception as e:
-            print(f"❌ Error deleting artwork: {e}")
+            log_event(logging.ERROR, "❌ Error deleting artwork", artwork_id=id, error=e)
             return jsonify({'success': False, 'message': f'Failed to delete artwork: {str(e)}'}), 500
 
     # Error handlers
@@ -1378,6 +5273,7 @@ def create_app():
     """Create and configure Flask application"""
     app = Flask(__name__)
     app.secret_key = SECRET_KEY
+    app.json = TimedJSONProvider(app)
 
     # Ensure directories exist
     ensure_directories()
@@ -1388,9 +5284,24 @@ def create_app():
     register_lightbox_api_routes(app)
     register_patch_middleware(app)
 
+    @app.before_request
+    def start_request_timer():
+        if METRICS_ENABLED:
+            g.request_start = time.perf_counter()
+
     # Security headers
     @app.after_request
     def after_request(response):
+        # Timing instrumentation
+        if METRICS_ENABLED and 'request_start' in g:
+            total = time.perf_counter() - g.request_start
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            timings = g.get('stage_timings', {})
+            request_histogram.observe((route, request.method), total)
+            for stage, (seconds, _count) in timings.items():
+                stage_histogram.observe((route, stage), seconds)
+            response.headers['Server-Timing'] = format_server_timing(timings, total)
+        
         response.headers['X-Content-Type-Options'] = 'nosniff'
         response.headers['X-Frame-Options'] = 'DENY'
         response.headers['X-XSS-Protection'] = '1; mode=block'
@@ -1414,34 +5325,547 @@ def create_app():
 
     return app
 
+# =============================================================================
+# 📥 BULK IMPORT SECTION
+# =============================================================================
+def iter_image_files(root):
+    """Image files under root in a stable order, skipping the gallery's own folders"""
+    own = (os.path.abspath(UPLOAD_FOLDER), os.path.abspath(THUMBNAIL_FOLDER))
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if os.path.join(dirpath, d) not in own)
+        for filename in sorted(filenames):
+            if allowed_file(filename):
+                yield os.path.join(dirpath, filename)
+
+def _import_worker_init():
+    """Pool workers log warnings straight to stderr - the queue listener lives in the parent"""
+    logger.handlers.clear()
+    handler = logging.StreamHandler()
+    handler.setFormatter(StructuredFormatter('%(asctime)s %(levelname)s [import] %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(max(logger.level, logging.WARNING))
+
+def import_image_file(source_path):
+    """
+    Pool worker: optimize one file into the uploads folder, create its thumbnail
+    and compute everything the artworks row needs. Never raises
+    """
+    ext = source_path.rsplit('.', 1)[1].lower()
+    unique_filename = f"{uuid.uuid4()}.{ext}"
+    file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
+    try:
+        if ext == 'svg':
+            shutil.copyfile(source_path, file_path)
+        else:
+            with Image.open(source_path) as probe:
+                probe.verify()  # corrupt files would otherwise be stored as-is
+            with open(source_path, 'rb') as source:
+                optimized = optimize_image_with_metadata(source)
+                with open(file_path, 'wb') as f:
+                    f.write(optimized.read())
+        create_thumbnail_with_metadata(file_path)
+        return {
+            'source_path': source_path,
+            'image_path': f"static/uploads/{unique_filename}",
+            'image_info': compute_image_info(file_path),
+            'phash': compute_perceptual_hash(file_path),
+            'colors': compute_color_features(file_path),
+            'generation': compute_generation_info(file_path),
+        }
+    except Exception as e:
+        cleanup_old_files(f"static/uploads/{unique_filename}")
+        return {'source_path': source_path, 'error': str(e)}
+
+def commit_import_batch(conn, batch, titles=False):
+    """
+    Insert processed files with sequential positions and checkpoint them, in
+    one transaction. On error nothing of the batch is kept; its files are
+    left to the orphan reconciler
+    """
+    try:
+        version = bump_gallery_version(conn)
+        position = conn.execute('SELECT MAX(position) FROM artworks').fetchone()[0] or 0
+        checkpoints = []
+        for item in batch:
+            position += 1
+            title = os.path.splitext(os.path.basename(item['source_path']))[0] if titles else None
+            description = item['generation']['prompt'] or "No description provided"
+            artwork_id = insert_artwork(
+                conn, item['image_path'], title, description, position, version,
+                item['image_info'], item['phash'], item['colors'], item['generation']
+            )
+            checkpoints.append((item['source_path'], artwork_id))
+        conn.executemany('INSERT OR REPLACE INTO imported_files (source_path, artwork_id) VALUES (?, ?)', checkpoints)
+        publish_event(conn, 'import', {'version': version, 'count': len(batch)})
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    event_broker.notify()
+
+def import_directory(root, workers=None, batch_size=IMPORT_BATCH_SIZE, titles=False):
+    """
+    Bulk-import every image under root using a process pool
+    Each committed batch is checkpointed in imported_files, so an interrupted
+    import re-run with the same directory skips what is already in
+    """
+    root = os.path.abspath(root)
+    if not os.path.isdir(root):
+        raise NotADirectoryError(root)
+    
+    conn = get_db_connection()
+    done = {row[0] for row in conn.execute('SELECT source_path FROM imported_files')}
+    files = list(iter_image_files(root))
+    pending = [path for path in files if path not in done]
+    workers = workers or os.cpu_count() or 1
+    log_event(logging.INFO, "📥 Import started", root=root, found=len(files),
+              already_imported=len(files) - len(pending), workers=workers)
+    
+    imported = failed = 0
+    batch = []
+    started = time.perf_counter()
+    pool = multiprocessing.Pool(workers, initializer=_import_worker_init)
+    try:
+        try:
+            for result in pool.imap(import_image_file, pending, chunksize=IMPORT_CHUNK_SIZE):
+                if 'error' in result:
+                    failed += 1
+                    log_event(logging.WARNING, "⚠️ Import failed", path=result['source_path'], error=result['error'])
+                    continue
+                batch.append(result)
+                if len(batch) >= batch_size:
+                    commit_import_batch(conn, batch, titles)
+                    imported += len(batch)
+                    batch = []
+                    elapsed = time.perf_counter() - started
+                    rate = imported / elapsed
+                    log_event(logging.INFO, "📥 Import progress", imported=imported, failed=failed,
+                              remaining=len(pending) - imported - failed, rate=f"{rate:.1f}/s",
+                              eta_s=int((len(pending) - imported - failed) / rate))
+            pool.close()
+        except KeyboardInterrupt:
+            pool.terminate()
+            log_event(logging.WARNING, "⚠️ Import interrupted - re-run the same command to resume")
+        # Files already processed are kept even when interrupted
+        if batch:
+            commit_import_batch(conn, batch, titles)
+            imported += len(batch)
+    except BaseException:
+        # A failed commit was rolled back; stop the workers and surface the original error
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        conn.close()
+    
+    log_event(logging.INFO, "✅ Import finished", imported=imported, failed=failed,
+              duration_s=f"{time.perf_counter() - started:.1f}")
+    return imported, failed
+
+# =============================================================================
+# 🏭 PRODUCTION SERVER SECTION
+# =============================================================================
+class GalleryRequestHandler(WSGIRequestHandler):
+    """
+    HTTP/1.1, so streamed responses go out chunked; werkzeug still closes each
+    connection. Clients that stall mid-request time out and free their thread
+    """
+    protocol_version = 'HTTP/1.1'
+    timeout = SERVE_CLIENT_TIMEOUT
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    werkzeug server on an inherited listening socket that handles connections
+    on a fixed pool of threads. It only accepts while a thread is free, so a
+    busy worker leaves new connections to its siblings
+    
+    Event streams stay open for as long as the page does, so they would pin
+    pool threads: a peek at the request line moves them to threads of their
+    own, capped at `streams`. Past the cap a stream is told to reconnect later
+    """
+    multithread = True
+    multiprocess = True
+    stream_prefix = b'GET /api/events'
+    # An empty event stream whose retry: makes EventSource reconnect, likely to another worker
+    stream_refusal = (b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n'
+                      b'Content-Length: 13\r\nConnection: close\r\n\r\nretry: 5000\n\n')
+    
+    def __init__(self, host, port, app, fd, threads=SERVE_THREADS, streams=SERVE_STREAMS):
+        super().__init__(host, port, app, handler=GalleryRequestHandler, fd=fd)
+        self.slots = threading.BoundedSemaphore(threads)
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='http')
+        self.stream_slots = threading.BoundedSemaphore(streams)
+        self.streams = set()  # threads serving event streams
+    
+    def _handle_request_noblock(self):
+        if not self.slots.acquire(timeout=0.05):
+            return
+        try:
+            request, client_address = self.get_request()
+        except OSError:
+            self.slots.release()  # another worker accepted it first
+            return
+        self.pool.submit(self._handle, request, client_address)
+    
+    def _handle(self, request, client_address):
+        if self._is_stream(request):
+            self.slots.release()
+            if not self.stream_slots.acquire(blocking=False):
+                with contextlib.suppress(OSError):
+                    request.recv(65536)  # unread request bytes would turn the close into a reset
+                    request.sendall(self.stream_refusal)
+                self.shutdown_request(request)
+                return
+            thread = threading.Thread(target=self._handle_stream, args=(request, client_address),
+                                      name='http-stream', daemon=True)
+            self.streams.add(thread)
+            thread.start()
+            return
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+    
+    def _is_stream(self, request):
+        """Whether the request line names the event stream; unsure counts as no"""
+        try:
+            request.settimeout(SERVE_CLIENT_TIMEOUT)
+            return request.recv(len(self.stream_prefix), socket.MSG_PEEK) == self.stream_prefix
+        except OSError:
+            return False
+    
+    def _handle_stream(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.streams.discard(threading.current_thread())
+            self.stream_slots.release()
+
+def warm_up(app):
+    """
+    Prime what workers inherit copy-on-write: the in-memory indexes, the first
+    page of every listing order, the first grid page's thumbnails and its sprite
+    """
+    started = time.perf_counter()
+    conn = get_db_connection()
+    try:
+        for index in (similarity_index, color_index, prompt_index, suggest_index):
+            if index is not None:
+                index.refresh(conn)
+        names = [row[0] for row in conn.execute(
+            f'SELECT {THUMBNAIL_PATH_SQL} FROM artworks ORDER BY position DESC LIMIT ?', (SPRITE_PAGE_SIZE,)
+        )]
+    finally:
+        conn.close()
+    
+    client = app.test_client()
+    # Same query strings the gallery sends, so the listing cache keys match
+    client.get('/api/artworks').close()
+    for sort in ('newest', 'oldest', 'a-z', 'z-a'):
+        client.get(f'/api/artworks?q=&sort={sort}').close()
+    for name in names:
+        client.get(name).close()
+    build_sprite('position', 0, SPRITE_PAGE_SIZE)
+    log_event(logging.INFO, "🔥 Caches warmed", thumbnails=len(names),
+              duration_ms=f"{(time.perf_counter() - started) * 1000:.1f}")
+
+def init_worker(slot, workers):
+    """
+    Per-process setup in a freshly forked worker. Database connections are
+    opened per request, so this only checks one can be made; slot 0 also runs
+    the storage collector so there is exactly one per server
+    """
+    reconfigure_logging_after_fork()
+    decode_admission.budget = max(DECODE_BUDGET_BYTES // workers, 1)
+    conn = get_db_connection()
+    try:
+        conn.execute('SELECT 1 FROM gallery_state LIMIT 1').fetchone()
+    finally:
+        conn.close()
+    if slot == 0:
+        storage_collector.start()
+
+class PreforkServer:
+    """
+    Pre-fork process manager behind `python app.py serve`
+    
+    The parent binds the socket, preloads the app, Pillow's plugins and the
+    warm caches, then forks workers that share them copy-on-write and respawns
+    any that die. SIGHUP re-warms and starts a new generation of workers
+    before draining the old one (code changes still need a restart);
+    SIGTERM/SIGINT drain the workers and exit
+    """
+    
+    def __init__(self, app, host='0.0.0.0', port=5000, workers=SERVE_WORKERS, threads=SERVE_THREADS,
+                 graceful_timeout=SERVE_GRACEFUL_TIMEOUT, warm=True):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.worker_count = workers
+        self.threads = threads
+        self.graceful_timeout = graceful_timeout
+        self.warm = warm
+        self.workers = {}  # pid -> slot
+        self.socket = None
+        self.stopping = False
+        self.reloading = False
+    
+    def run(self):
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        self.socket = socket.create_server((self.host, self.port), family=family, backlog=2048)
+        self.socket.setblocking(False)  # workers race for accept(); losers just go back to select()
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+        
+        if self.warm:
+            warm_up(self.app)
+        for slot in range(self.worker_count):
+            self.spawn(slot)
+        log_event(logging.INFO, "🏭 Serving", host=self.host, port=self.port,
+                  workers=self.worker_count, threads=self.threads)
+        
+        while not self.stopping:
+            if self.reloading:
+                self.reloading = False
+                self.reload()
+            self.reap()
+            time.sleep(0.5)
+        
+        log_event(logging.INFO, "🛑 Shutting down", workers=len(self.workers))
+        self.stop_workers(list(self.workers))
+        self.socket.close()
+    
+    def _on_stop(self, _signum, _frame):
+        self.stopping = True
+    
+    def _on_reload(self, _signum, _frame):
+        self.reloading = True
+    
+    def spawn(self, slot):
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = slot
+            return pid
+        code = 0
+        try:
+            self.run_worker(slot)
+        except BaseException as e:
+            log_event(logging.ERROR, "❌ Worker crashed", slot=slot, error=e)
+            code = 1
+        finally:
+            if log_listener is not None:
+                log_listener.stop()
+            os._exit(code)
+    
+    def run_worker(self, slot):
+        # The terminal's Ctrl+C reaches the whole process group; only the parent acts on it
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        init_worker(slot, self.worker_count)
+        server = PooledWSGIServer(self.host, self.port, self.app, fd=self.socket.fileno(), threads=self.threads)
+        
+        def drain():
+            event_broker.close()  # open event streams would otherwise last until SIGKILL
+            server.shutdown()
+        
+        # shutdown() waits for serve_forever, so it cannot run on the thread serving
+        signal.signal(signal.SIGTERM, lambda _signum, _frame: threading.Thread(
+            target=drain, daemon=True).start())
+        log_event(logging.INFO, "👷 Worker started", slot=slot, pid=os.getpid())
+        server.serve_forever(poll_interval=0.5)
+        server.pool.shutdown(wait=True)
+        for thread in list(server.streams):
+            thread.join()
+        log_event(logging.INFO, "👷 Worker stopped", slot=slot, pid=os.getpid())
+    
+    def reap(self):
+        """Collect exited workers and respawn their slots"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            slot = self.workers.pop(pid, None)
+            if slot is not None and not self.stopping:
+                log_event(logging.WARNING, "⚠️ Worker exited, respawning", slot=slot, pid=pid,
+                          status=os.waitstatus_to_exitcode(status))
+                self.spawn(slot)
+    
+    def reload(self):
+        old = list(self.workers)
+        log_event(logging.INFO, "🔄 Reloading workers", workers=len(old))
+        if self.warm:
+            warm_up(self.app)
+        for slot in range(self.worker_count):
+            self.spawn(slot)
+        self.stop_workers(old)
+    
+    def stop_workers(self, pids):
+        """SIGTERM, wait up to graceful_timeout for in-flight requests, then SIGKILL"""
+        for pid in pids:
+            self.workers.pop(pid, None)
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        pending = set(pids)
+        while pending and time.monotonic() < deadline:
+            for pid in list(pending):
+                try:
+                    if os.waitpid(pid, os.WNOHANG)[0]:
+                        pending.discard(pid)
+                except ChildProcessError:
+                    pending.discard(pid)
+            time.sleep(0.1)
+        for pid in pending:
+            log_event(logging.WARNING, "⚠️ Worker did not stop in time, killing", pid=pid)
+            with contextlib.suppress(ProcessLookupError, ChildProcessError):
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+
+def serve(app, host, port, workers=SERVE_WORKERS, threads=SERVE_THREADS,
+          graceful_timeout=SERVE_GRACEFUL_TIMEOUT, warm=True):
+    """Run the production server; preloading happens here, before any fork"""
+    global memory_cache
+    if not hasattr(os, 'fork'):
+        sys.exit('serve: needs a platform with fork(); use a WSGI server with app:create_app() instead')
+    if workers > 1 and MEMORY_CACHE_BYTES and not isinstance(memory_cache, SharedMemoryCache):
+        # Per-worker copies would keep serving what another worker's edit or delete invalidated
+        memory_cache = SharedMemoryCache()
+    if isinstance(memory_cache, SharedMemoryCache):
+        memory_cache.clear()  # the arena outlives the process; start from an empty one
+    Image.init()  # import every Pillow plugin once in the parent
+    conn = get_db_connection()
+    try:
+        # Readers in other workers no longer block on a writer
+        conn.execute('PRAGMA journal_mode=WAL')
+    finally:
+        conn.close()
+    PreforkServer(app, host, port, workers, threads, graceful_timeout, warm).run()
+
+# =============================================================================
+# 🧰 COMMAND LINE SECTION
+# =============================================================================
+def build_cli_parser():
+    parser = argparse.ArgumentParser(description='Art gallery server and maintenance commands')
+    commands = parser.add_subparsers(dest='command')
+    
+    import_parser = commands.add_parser('import', help='bulk-import a directory of images')
+    import_parser.add_argument('directory')
+    import_parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    import_parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='rows per transaction')
+    import_parser.add_argument('--titles', action='store_true', help='use file names as titles')
+    
+    gc_parser = commands.add_parser('gc', help='reconcile storage and delete orphaned files now')
+    gc_parser.add_argument('--min-age', type=int, default=GC_ORPHAN_MIN_AGE,
+                           help='seconds an unreferenced file must be old to count as orphaned')
+    
+    pack_parser = commands.add_parser('pack-thumbnails',
+                                      help='move loose thumbnail files into the thumbnail pack '
+                                           '(needs GALLERY_THUMBNAIL_PACK=1)')
+    pack_parser.add_argument('--remove-files', action='store_true', help='delete each file once it is packed')
+    pack_parser.add_argument('--compact', action='store_true',
+                             help='also compact every sealed segment with dead space')
+    
+    serve_parser = commands.add_parser('serve', help='run the production pre-fork server')
+    serve_parser.add_argument('--host', default='0.0.0.0')
+    serve_parser.add_argument('--port', type=int, default=5000)
+    serve_parser.add_argument('--workers', type=int, default=SERVE_WORKERS, help='worker processes')
+    serve_parser.add_argument('--threads', type=int, default=SERVE_THREADS, help='request threads per worker')
+    serve_parser.add_argument('--graceful-timeout', type=int, default=SERVE_GRACEFUL_TIMEOUT,
+                              help='seconds workers get to finish requests on reload/stop')
+    serve_parser.add_argument('--no-warm-up', action='store_true', help='skip priming caches before forking')
+    
+    export_parser = commands.add_parser('export', help='write a ZIP/TAR of the originals and a manifest')
+    export_parser.add_argument('output', help="archive path, or '-' for stdout")
+    export_parser.add_argument('--format', choices=sorted(EXPORT_FORMATS),
+                               help='archive format (default: from the output extension, else zip)')
+    export_parser.add_argument('--q', default='', help='title/description search')
+    export_parser.add_argument('--color', default='', help='dominant color filter')
+    export_parser.add_argument('--color-share', type=float, default=COLOR_MIN_SHARE)
+    for facet in FACET_KINDS:
+        export_parser.add_argument(f'--{facet}', action='append', default=[], help=f'{facet} facet filter')
+    return parser
+
 # =============================================================================
 # 🎯 MAIN EXECUTION SECTION
 # =============================================================================
 if __name__ == '__main__':
+    args = build_cli_parser().parse_args()
+    
     # Initialize database
     init_db()
     
+    if args.command == 'import':
+        _imported, failed = import_directory(args.directory, workers=args.workers,
+                                             batch_size=args.batch_size, titles=args.titles)
+        sys.exit(1 if failed else 0)
+    
+    if args.command == 'gc':
+        cleanup_orphaned_files(min_age=args.min_age)
+        sys.exit(0)
+    
+    if args.command == 'pack-thumbnails':
+        if not THUMBNAIL_PACK_ENABLED:
+            # The server would keep reading the loose files, or regenerate them if removed
+            sys.exit('pack-thumbnails: set GALLERY_THUMBNAIL_PACK=1 for both this command and the server')
+        packed = thumbnail_pack.pack_folder(remove_files=args.remove_files)
+        reclaimed = thumbnail_pack.compact(ratio=0, limit=sys.maxsize) if args.compact else 0
+        log_event(logging.INFO, "📦 Thumbnails packed", packed=packed, reclaimed=reclaimed)
+        sys.exit(0)
+    
+    if args.command == 'export':
+        archive_format = args.format or ('tar' if args.output.endswith('.tar') else 'zip')
+        filters = MultiDict([('q', args.q), ('color', args.color), ('color_share', args.color_share)]
+                            + [(facet, value) for facet in FACET_KINDS for value in getattr(args, facet)])
+        try:
+            export_to_file(args.output, archive_format, filters)
+        except FilterError as e:
+            sys.exit(f'export: {e}')
+        sys.exit(0)
+    
     # Generate thumbnails for existing images
     ensure_thumbnails_exist()
     
+    # Fill dimensions and placeholders for artworks uploaded before they were stored
+    backfill_image_info()
+    backfill_perceptual_hashes()
+    backfill_color_features()
+    backfill_generation_info()
+    
     # Create Flask application
     app = create_app()
     
+    if args.command == 'serve':
+        serve(app, args.host, args.port, workers=max(1, args.workers), threads=max(1, args.threads),
+              graceful_timeout=args.graceful_timeout, warm=not args.no_warm_up)
+        sys.exit(0)
+    
+    storage_collector.start()
+    
     # Startup messages
-    print("=" * 60)
-    print("🎨 ART GALLERY - COMPLETE MERGED APPLICATION")
-    print("=" * 60)
-    print("✅ Database initialized")
-    print("✅ Directories ensured")
-    print("✅ Standard routes registered")
-    print("✅ API routes registered") 
-    print("✅ Lightbox API routes registered")
-    print("✅ Metadata API with FIXED error handling enabled")
-    print("✅ Metadata Viewer API enabled")
-    print("✅ Enhanced error handling enabled")
-    print("✅ Thumbnails generated for existing images")
-    print("🚀 Ready for inline editing in lightbox!")
-    print("=" * 60)
+    logger.info("=" * 60)
+    logger.info("🎨 ART GALLERY - COMPLETE MERGED APPLICATION")
+    logger.info("=" * 60)
+    logger.info("✅ Database initialized")
+    logger.info("✅ Directories ensured")
+    logger.info("✅ Standard routes registered")
+    logger.info("✅ API routes registered")
+    logger.info("✅ Lightbox API routes registered")
+    logger.info("✅ Metadata API with FIXED error handling enabled")
+    logger.info("✅ Metadata Viewer API enabled")
+    logger.info("✅ Enhanced error handling enabled")
+    logger.info("✅ Thumbnails generated for existing images")
+    logger.info("🚀 Ready for inline editing in lightbox!")
+    logger.info("=" * 60)
     
     # Run the application
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,10 @@
+# =============================================================================
+# 📈 ART GALLERY - BENCHMARK SUITE
+# =============================================================================
+# Reproducible benchmarks for the upload, thumbnail, metadata and listing
+# paths. Run from the repository root:
+#
+#     python -m benchmarks.run --rows 1000
+#     python -m benchmarks.run --rows 100000 --save-baseline
+#     python -m benchmarks.run --rows 100000 --baseline benchmarks/baseline.json
+# =============================================================================
@@ -0,0 +1,124 @@
+# =============================================================================
+# 🏁 BENCHMARK CASES
+# =============================================================================
+# Each case receives the BenchContext and returns a zero-argument callable;
+# the runner times repeated calls of that callable.
+# =============================================================================
+import io
+import os
+import random
+import shutil
+
+from benchmarks.corpus import IMAGE_KINDS, a1111_parameters, make_image
+
+BENCHMARKS = []
+
+def benchmark(name):
+    """Register a benchmark case"""
+    def decorator(func):
+        BENCHMARKS.append((name, func))
+        return func
+    return decorator
+
+class BenchContext:
+    """Shared state: the imported app module, a test client and the corpus"""
+    
+    def __init__(self, app_module, image_paths, rows, image_size):
+        self.app = app_module
+        self.client = app_module.create_app().test_client()
+        self.image_paths = image_paths
+        self.rows = rows
+        self.images = {kind: make_image(kind, image_size, seed=0) for kind in IMAGE_KINDS}
+    
+    def corpus_path(self, kind):
+        return next(p for p in self.image_paths if os.path.basename(p).startswith(kind))
+
+# -----------------------------------------------------------------------------
+# Image pipeline
+# -----------------------------------------------------------------------------
+def _register_image_cases(kind):
+    
+    @benchmark(f'optimize_image_with_metadata[{kind}]')
+    def optimize(ctx):
+        data = ctx.images[kind]
+        return lambda: ctx.app.optimize_image_with_metadata(io.BytesIO(data))
+    
+    @benchmark(f'create_thumbnail_with_metadata[{kind}]')
+    def thumbnail(ctx):
+        src = ctx.corpus_path(kind)
+        original = os.path.join(ctx.app.UPLOAD_FOLDER, 'bench_' + os.path.basename(src)).replace('\\', '/')
+        shutil.copyfile(src, original)
+        thumb = original.replace('/uploads/', '/thumbnails/')
+        
+        def run():
+            # The pipeline skips existing thumbnails, so start from scratch each time
+            if os.path.exists(thumb):
+                os.remove(thumb)
+            ctx.app.create_thumbnail_with_metadata(original)
+        return run
+    
+    @benchmark(f'extract_ai_metadata_detailed[{kind}]')
+    def extract(ctx):
+        path = ctx.corpus_path(kind)
+        return lambda: ctx.app.extract_ai_metadata_detailed(path)
+
+for _kind in IMAGE_KINDS:
+    _register_image_cases(_kind)
+
+@benchmark('parse_ai_text_parameters')
+def parse_parameters(ctx):
+    text = a1111_parameters(random.Random(0))
+    return lambda: ctx.app.parse_ai_text_parameters(text)
+
+# -----------------------------------------------------------------------------
+# HTTP routes (Flask test client)
+# -----------------------------------------------------------------------------
+def _get(ctx, url):
+    def run():
+        response = ctx.client.get(url)
+        assert response.status_code == 200, (url, response.status_code)
+        response.get_data()
+    return run
+
+@benchmark('GET /')
+def index_page(ctx):
+    return _get(ctx, '/')
+
+for _sort in ('newest', 'oldest', 'a-z', 'z-a'):
+    benchmark(f'GET /api/artworks?sort={_sort}')(
+        lambda ctx, sort=_sort: _get(ctx, f'/api/artworks?sort={sort}'))
+
+@benchmark('GET /api/artworks?q=castle')
+def listing_query(ctx):
+    return _get(ctx, '/api/artworks?q=castle')
+
+@benchmark('GET /api/search?q=castle')
+def search(ctx):
+    return _get(ctx, '/api/search?q=castle')
+
+@benchmark('POST /update-order[100]')
+def update_order(ctx):
+    rng = random.Random(0)
+    ids = rng.sample(range(1, ctx.rows + 1), min(100, ctx.rows))
+    state = {'flip': False}
+    
+    def run():
+        # Alternate between two orders so every call really moves rows
+        state['flip'] = not state['flip']
+        order = [{'id': artwork_id, 'position': (i if state['flip'] else -i)} for i, artwork_id in enumerate(ids)]
+        response = ctx.client.post('/update-order', json={'order': order})
+        assert response.status_code == 200, response.status_code
+    return run
+
+@benchmark('POST /add')
+def add(ctx):
+    data = ctx.images['a1111']
+    
+    def run():
+        response = ctx.client.post(
+            '/add',
+            data={'image': (io.BytesIO(data), 'bench.png'), 'title': 'bench'},
+            content_type='multipart/form-data'
+        )
+        assert response.status_code == 200, response.status_code
+    return run
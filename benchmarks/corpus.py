@@ -0,0 +1,178 @@
+# =============================================================================
+# 🧪 SYNTHETIC CORPUS GENERATOR
+# =============================================================================
+# Deterministic images and databases for the benchmark suite:
+# - PNGs carrying SwarmUI (JSON), A1111 (text) and ComfyUI (JSON) chunks
+# - JPEGs carrying an EXIF UserComment with A1111 parameters
+# - A database with N artwork rows in the application's own schema
+# =============================================================================
+import io
+import json
+import os
+import random
+import sqlite3
+
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+IMAGE_KINDS = ('swarmui', 'a1111', 'comfyui', 'jpeg_exif')
+
+PROMPT_WORDS = [
+    'masterpiece', 'best quality', 'portrait', 'landscape', 'cinematic lighting',
+    'oil painting', 'cyberpunk city', 'forest', 'sunset', 'highly detailed',
+    'watercolor', 'dramatic sky', 'neon', 'fantasy', 'castle', 'ocean', 'dragon',
+]
+MODELS = ['sdxl_base_1.0', 'juggernautXL_v9', 'dreamshaper_8', 'realisticVision_v60']
+SAMPLERS = ['Euler a', 'DPM++ 2M Karras', 'DDIM', 'UniPC']
+LORAS = ['detail_tweaker', 'film_grain', 'add_more_details', 'epi_noiseoffset']
+
+def _prompt(rng):
+    words = rng.sample(PROMPT_WORDS, 6)
+    loras = ''.join(f' <lora:{name}:{rng.choice([0.5, 0.8, 1.0])}>' for name in rng.sample(LORAS, 2))
+    return ', '.join(words) + loras
+
+def _color_histogram(rng):
+    """64-bin uint8 histogram dominated by a few random bins"""
+    histogram = bytearray(64)
+    for index, share in zip(rng.sample(range(64), 3), (170, 60, 25)):
+        histogram[index] = share
+    return bytes(histogram)
+
+def _facets(rng, artwork_id):
+    """artwork_facets rows matching what the app extracts from generation parameters"""
+    facets = [
+        ('model', rng.choice(MODELS)),
+        ('sampler', rng.choice(SAMPLERS)),
+        ('steps', str(rng.randint(20, 50))),
+        ('cfg', str(rng.choice([5, 6.5, 7, 8]))),
+        ('seed', str(rng.randint(0, 2**32))),
+    ]
+    facets.extend(('lora', name) for name in rng.sample(LORAS, 2))
+    return [(facet, value, artwork_id) for facet, value in facets]
+
+def _pixels(size, seed):
+    """Deterministic RGB image built from rotated gradients (no random noise)"""
+    rng = random.Random(seed)
+    channels = []
+    for _ in range(3):
+        band = Image.linear_gradient('L').rotate(rng.randint(0, 359)).resize(size)
+        channels.append(band)
+    return Image.merge('RGB', channels)
+
+def a1111_parameters(rng):
+    """A1111/Evoke style parameter text"""
+    return (
+        f"{_prompt(rng)}\n"
+        f"Negative prompt: blurry, lowres, bad anatomy\n"
+        f"Steps: {rng.randint(20, 50)}, Sampler: {rng.choice(SAMPLERS)}, "
+        f"CFG scale: {rng.choice([5, 6.5, 7, 8])}, Seed: {rng.randint(0, 2**32)}, "
+        f"Size: 1024x1024, Model: {rng.choice(MODELS)}"
+    )
+
+def make_image(kind, size=(1024, 1024), seed=0):
+    """Return encoded image bytes for one corpus kind"""
+    rng = random.Random(seed)
+    img = _pixels(size, seed)
+    output = io.BytesIO()
+    
+    if kind == 'jpeg_exif':
+        exif = Image.Exif()
+        exif[0x9286] = a1111_parameters(rng)  # UserComment
+        img.save(output, format='JPEG', quality=90, exif=exif.tobytes())
+        return output.getvalue()
+    
+    pnginfo = PngInfo()
+    if kind == 'swarmui':
+        pnginfo.add_text('parameters', json.dumps({
+            'sui_image_params': {
+                'prompt': _prompt(rng),
+                'negativeprompt': 'blurry, lowres',
+                'model': rng.choice(MODELS),
+                'seed': rng.randint(0, 2**32),
+                'steps': rng.randint(20, 50),
+                'cfgscale': 7,
+                'sampler': rng.choice(SAMPLERS),
+                'scheduler': 'karras',
+                'width': size[0],
+                'height': size[1],
+                'loras': [{'model': name, 'weight': 0.8} for name in rng.sample(LORAS, 2)],
+            },
+            'sui_extra_data': {'date': '2024-01-01', 'aspectratio': '1:1'},
+        }))
+    elif kind == 'a1111':
+        pnginfo.add_text('parameters', a1111_parameters(rng))
+    elif kind == 'comfyui':
+        pnginfo.add_text('parameters', json.dumps({
+            'prompt': {'3': {'class_type': 'KSampler', 'inputs': {'seed': rng.randint(0, 2**32)}}},
+            'workflow': {'nodes': [{'id': 3, 'type': 'KSampler'}]},
+        }))
+    else:
+        raise ValueError(f'Unknown image kind: {kind}')
+    
+    img.save(output, format='PNG', pnginfo=pnginfo)
+    return output.getvalue()
+
+def write_image_corpus(folder, per_kind=2, size=(1024, 1024)):
+    """Write per_kind images of every kind into folder, return their paths"""
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for kind in IMAGE_KINDS:
+        ext = 'jpg' if kind == 'jpeg_exif' else 'png'
+        for i in range(per_kind):
+            path = os.path.join(folder, f'{kind}_{i}.{ext}').replace('\\', '/')
+            if not os.path.exists(path):
+                with open(path, 'wb') as f:
+                    f.write(make_image(kind, size, seed=i))
+            paths.append(path)
+    return paths
+
+def populate_database(db_path, rows, image_paths, batch_size=10000, seed=0):
+    """
+    Bulk-insert rows artworks referencing image_paths (cycled)
+    The schema must already exist (app.init_db). Rows are appended after any
+    existing ones, continuing their ids and positions
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA journal_mode = MEMORY')
+    last_id, last_position = conn.execute(
+        'SELECT COALESCE(MAX(id), 0), COALESCE(MAX(position), 0) FROM artworks'
+    ).fetchone()
+    
+    def batches():
+        batch, facets = [], []
+        for n in range(1, rows + 1):
+            i = last_id + n
+            title = None if i % 17 == 0 else ' '.join(rng.sample(PROMPT_WORDS, 3)).title()
+            batch.append((
+                i,
+                title,
+                _prompt(rng),
+                image_paths[i % len(image_paths)],
+                last_position + n,
+                f'2024-01-01 00:{(i // 60) % 60:02d}:{i % 60:02d}',
+                rng.getrandbits(64) - (1 << 63),
+                _color_histogram(rng),
+            ))
+            facets.extend(_facets(rng, i))
+            if len(batch) >= batch_size:
+                yield batch, facets
+                batch, facets = [], []
+        if batch:
+            yield batch, facets
+    
+    for batch, facets in batches():
+        conn.executemany(
+            'INSERT INTO artworks (id, title, description, image_path, position, created_at, phash, color_histogram,'
+            ' facets_indexed) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)',
+            batch
+        )
+        conn.executemany('INSERT OR IGNORE INTO artwork_facets (facet, value, artwork_id) VALUES (?, ?, ?)', facets)
+    # The app maintains these incrementally; seed is filter-only and not counted
+    conn.execute(
+        "INSERT OR REPLACE INTO facet_counts (facet, value, count)"
+        " SELECT facet, value, COUNT(*) FROM artwork_facets WHERE facet != 'seed' GROUP BY facet, value"
+    )
+    conn.commit()
+    conn.close()
@@ -0,0 +1,213 @@
+# =============================================================================
+# 🧮 QUERY BUDGET HARNESS
+# =============================================================================
+# Drives every route through the Flask test client with a QueryRecorder
+# installed, runs EXPLAIN QUERY PLAN on each statement and fails when a
+# route exceeds its declared budget:
+#   queries     - statements executed (executemany counts once)
+#   scans       - statements whose plan reads a whole table without an index
+#   temp_sorts  - statements that need a temporary B-tree for ORDER BY/GROUP BY
+# Identical statements repeated 3+ times in one request are reported as N+1.
+#
+#     python -m benchmarks.query_budget --rows 10000 [--verbose]
+# =============================================================================
+import argparse
+import io
+import shutil
+import sys
+
+from benchmarks.run import prepare_workspace
+
+# Routes that cannot be driven as a single request/response
+EXCLUDED_ROUTES = {'/api/events', '/static/<path:filename>'}
+
+def _upload(ctx, name='budget.png'):
+    return {'image': (io.BytesIO(ctx['image']), name), 'title': 'budget'}
+
+# (rule, label, method, url or url factory, request kwargs factory, budget)
+ROUTE_CASES = [
+    ('/', 'GET /', 'GET', '/', None,
+     {'queries': 2}),
+    ('/img/<int:artwork_id>', 'GET /img?w=640', 'GET', lambda ctx: f"/img/{ctx['id']}?w=640", None,
+     {'queries': 1}),  # the resize cache index is a separate database
+    ('/api/sprites', 'GET /api/sprites', 'GET', '/api/sprites?per_page=12', None,
+     {'queries': 1}),  # layout and image live in the resize cache
+    ('/sprite/<key>.webp', 'GET /sprite (cached)', 'GET', lambda ctx: ctx['sprite'], None,
+     {'queries': 0}),
+    ('/add', 'POST /add', 'POST', '/add', lambda ctx: {'data': _upload(ctx), 'content_type': 'multipart/form-data'},
+     {'queries': 7}),  # + facet rows and counts
+    ('/thumbnail/<path:filename>', 'GET /thumbnail', 'GET', lambda ctx: f"/thumbnail/{ctx['added_filename']}", None,
+     {'queries': 0}),
+    ('/edit/<int:id>', 'POST /edit', 'POST', lambda ctx: f"/edit/{ctx['id']}",
+     lambda ctx: {'data': {'title': 'edited', 'description': 'edited'}},
+     {'queries': 5}),
+    ('/delete/<int:id>', 'POST /delete', 'POST', lambda ctx: f"/delete/{ctx['added_id']}", None,
+     {'queries': 11}),  # + facet lookup, row delete, two count updates and the deferred-delete queue
+    ('/get_description/<int:id>', 'GET /get_description', 'GET', lambda ctx: f"/get_description/{ctx['id']}", None,
+     {'queries': 1}),
+    ('/update-order', 'POST /update-order[100]', 'POST', '/update-order',
+     lambda ctx: {'json': {'order': [{'id': i, 'position': 100 - i} for i in range(1, 101)]}},
+     {'queries': 4}),
+    ('/api/search', 'GET /api/search', 'GET', '/api/search?q=castle', None,
+     {'queries': 1}),
+    ('/api/suggest', 'GET /api/suggest', 'GET', '/api/suggest?prefix=ca', None,
+     {'queries': 2, 'scans': 1}),  # first call builds the suggest index
+    ('/api/suggest', 'GET /api/suggest (warm)', 'GET', '/api/suggest?prefix=cas', None,
+     {'queries': 1}),
+    ('/api/health', 'GET /api/health', 'GET', '/api/health', None,
+     {'queries': 0}),
+    ('/api/metrics', 'GET /api/metrics', 'GET', '/api/metrics', None,
+     {'queries': 0}),
+    ('/api/artworks', 'GET /api/artworks?sort=newest', 'GET', '/api/artworks?sort=newest', None,
+     {'queries': 2}),
+    ('/api/artworks', 'GET /api/artworks?sort=oldest', 'GET', '/api/artworks?sort=oldest', None,
+     {'queries': 2}),
+    ('/api/artworks', 'GET /api/artworks?sort=a-z', 'GET', '/api/artworks?sort=a-z', None,
+     {'queries': 2}),
+    ('/api/artworks', 'GET /api/artworks?sort=z-a', 'GET', '/api/artworks?sort=z-a', None,
+     {'queries': 2}),
+    ('/api/artworks', 'GET /api/artworks?q=castle', 'GET', '/api/artworks?q=castle', None,
+     {'queries': 2}),
+    ('/api/artworks', 'GET /api/artworks?color=blue', 'GET', '/api/artworks?color=blue', None,
+     {'queries': 4, 'scans': 1, 'temp_sorts': 1}),  # first call loads the histogram matrix; sorts only the matches
+    # A different sort, so the listing is queried rather than answered from the RAM tier
+    ('/api/artworks', 'GET /api/artworks?color=blue (warm)', 'GET', '/api/artworks?color=blue&sort=oldest', None,
+     {'queries': 3, 'temp_sorts': 1}),
+    ('/api/artworks', 'GET /api/artworks?model=&lora=', 'GET', '/api/artworks?model=dreamshaper_8&lora=film_grain', None,
+     {'queries': 2, 'temp_sorts': 1}),  # the facet postings select the rows, which are then sorted
+    ('/api/export', 'GET /api/export?format=tar&model=&lora=', 'GET',
+     '/api/export?format=tar&model=dreamshaper_8&lora=film_grain', None,
+     {'queries': 2}),  # one keyset batch per STREAM_BATCH_SIZE rows
+    ('/api/facets', 'GET /api/facets', 'GET', '/api/facets', None,
+     {'queries': 1}),
+    ('/api/facets', 'GET /api/facets?facet=lora', 'GET', '/api/facets?facet=lora', None,
+     {'queries': 1}),
+    ('/api/artworks/bulk', 'POST /api/artworks/bulk[update+move+delete]', 'POST', '/api/artworks/bulk',
+     lambda ctx: {'json': {'operations': [{'op': 'update', 'id': ctx['id'], 'title': 'bulk'},
+                                          {'op': 'move', 'id': ctx['id'], 'position': 5000},
+                                          {'op': 'delete', 'id': ctx['bulk_id']}]}},
+     {'queries': 12}),  # constant in the number of operations (two more when deletes touch counted facets)
+    ('/api/artworks/changes', 'GET /api/artworks/changes', 'GET', lambda ctx: f"/api/artworks/changes?since={ctx['version']}", None,
+     {'queries': 3}),
+    ('/api/metadata', 'GET /api/metadata?ids=[7]', 'GET',
+     lambda ctx: f"/api/metadata?ids={','.join(str(ctx['id'] + i) for i in range(7))}", None,
+     {'queries': 1}),
+    ('/api/lightbox/window', 'GET /api/lightbox/window?sort=position', 'GET',
+     lambda ctx: f"/api/lightbox/window?id={ctx['id']}&sort=position", None,
+     {'queries': 3}),
+    ('/api/lightbox/window', 'GET /api/lightbox/window?sort=newest', 'GET',
+     lambda ctx: f"/api/lightbox/window?id={ctx['id']}&sort=newest", None,
+     {'queries': 3}),
+    ('/api/metadata/<int:id>', 'GET /api/metadata', 'GET', lambda ctx: f"/api/metadata/{ctx['id']}", None,
+     {'queries': 1}),
+    ('/api/artwork/<int:artwork_id>/update-text', 'PATCH /api/artwork/update-text', 'PATCH',
+     lambda ctx: f"/api/artwork/{ctx['id']}/update-text", lambda ctx: {'json': {'title': 'patched'}},
+     {'queries': 6}),
+    ('/api/artwork/<int:artwork_id>/info', 'GET /api/artwork/info', 'GET', lambda ctx: f"/api/artwork/{ctx['id']}/info", None,
+     {'queries': 1}),
+    ('/api/artwork/<int:artwork_id>/similar', 'GET /api/artwork/similar', 'GET', lambda ctx: f"/api/artwork/{ctx['id']}/similar", None,
+     {'queries': 3, 'scans': 1}),  # first call loads the hash index
+    ('/api/artwork/<int:artwork_id>/similar', 'GET /api/artwork/similar (warm)', 'GET', lambda ctx: f"/api/artwork/{ctx['id']}/similar", None,
+     {'queries': 2}),
+    ('/api/search/semantic', 'GET /api/search/semantic', 'GET', '/api/search/semantic?q=castle+dragon', None,
+     {'queries': 3, 'scans': 1}),  # first call builds the prompt index
+    ('/api/artwork/<int:artwork_id>/similar-prompts', 'GET /api/artwork/similar-prompts', 'GET',
+     lambda ctx: f"/api/artwork/{ctx['id']}/similar-prompts", None,
+     {'queries': 3}),
+    ('/api/duplicates', 'GET /api/duplicates', 'GET', '/api/duplicates', None,
+     {'queries': 1}),
+    ('/api/extract-metadata', 'POST /api/extract-metadata', 'POST', '/api/extract-metadata',
+     lambda ctx: {'data': _upload(ctx), 'content_type': 'multipart/form-data'},
+     {'queries': 0}),
+]
+
+def check_route(app_module, client, ctx, case, verbose=False):
+    """Run one case, return (label, recorder, list of budget violations)"""
+    _rule, label, method, url, kwargs, budget = case
+    url = url(ctx) if callable(url) else url
+    kwargs = kwargs(ctx) if kwargs else {}
+    
+    with app_module.record_queries() as recorder:
+        response = client.open(url, method=method, **kwargs)
+        response.get_data()  # streamed bodies run their queries while being read
+    conn = app_module.get_db_connection()
+    recorder.explain(conn)
+    conn.close()
+    
+    if label == 'POST /add' and response.is_json:
+        artwork = response.get_json()['artwork']
+        ctx['added_id'] = artwork['id']
+        ctx['added_filename'] = artwork['thumbnail_path'].rsplit('/', 1)[-1]
+    
+    violations = []
+    if response.status_code >= 400:
+        violations.append(f'status {response.status_code}')
+    measured = {
+        'queries': recorder.count,
+        'scans': len(recorder.full_scans()),
+        'temp_sorts': len(recorder.temp_sorts()),
+    }
+    for key, value in measured.items():
+        allowed = budget.get(key, 0)
+        if value > allowed:
+            violations.append(f'{key} {value} > budget {allowed}')
+    for sql, n in recorder.repeated().items():
+        violations.append(f'N+1: {n}x {sql[:80]}')
+    
+    status = '❌' if violations else '✅'
+    print(f"{status} {label:<40} queries={measured['queries']:<3} scans={measured['scans']:<2} "
+          f"temp_sorts={measured['temp_sorts']:<2} {'; '.join(violations)}")
+    if verbose or violations:
+        for query in recorder.queries:
+            print(f"      {query['sql'][:110]}")
+            for step in query['plan'] or []:
+                print(f"          └ {step}")
+    return label, recorder, violations
+
+def uncovered_routes(flask_app):
+    """Registered URL rules that have no budget case"""
+    covered = {case[0] for case in ROUTE_CASES} | EXCLUDED_ROUTES
+    return sorted({rule.rule for rule in flask_app.url_map.iter_rules()} - covered)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Per-route query budgets and plan checks')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--image-size', type=int, default=256)
+    parser.add_argument('--workdir', default=None)
+    parser.add_argument('--verbose', action='store_true', help='print every statement and its plan')
+    args = parser.parse_args(argv)
+    
+    app_module, image_paths = prepare_workspace(args)
+    # Start without a saved prompt index so first-call budgets are deterministic
+    shutil.rmtree(app_module.PROMPT_INDEX_FOLDER, ignore_errors=True)
+    from benchmarks.corpus import make_image
+    
+    flask_app = app_module.create_app()
+    client = flask_app.test_client()
+    conn = app_module.get_db_connection()
+    first = conn.execute('SELECT id FROM artworks ORDER BY id LIMIT 1').fetchone()
+    ctx = {
+        'id': first['id'],
+        'bulk_id': conn.execute('SELECT MAX(id) FROM artworks').fetchone()[0],  # deleted by the bulk case
+        'version': app_module.get_gallery_version(conn),
+        'image': make_image('a1111', (args.image_size, args.image_size)),
+        # Rendered up front: /api/sprites only queues renders
+        'sprite': f"/sprite/{app_module.build_sprite('position', 0, 12)[0]}.webp",
+    }
+    conn.close()
+    
+    failures = 0
+    for case in ROUTE_CASES:
+        _label, _recorder, violations = check_route(app_module, client, ctx, case, args.verbose)
+        failures += bool(violations)
+    
+    missing = uncovered_routes(flask_app)
+    if missing:
+        print(f"❌ Routes without a query budget: {', '.join(missing)}")
+        failures += len(missing)
+    
+    print(f"\n{failures} failure(s)" if failures else '\nAll routes within budget')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
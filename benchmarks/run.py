@@ -0,0 +1,160 @@
+# =============================================================================
+# 🏃 BENCHMARK RUNNER
+# =============================================================================
+# Builds (or reuses) a workspace with a synthetic corpus and database, times
+# every registered case, writes JSON results and compares them against a
+# stored baseline. Exits with status 1 when a case regresses past the
+# threshold.
+# =============================================================================
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+PRISTINE_DB = 'database.pristine.db'  # untouched corpus database, copied over database.db for every run
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Art gallery benchmark suite')
+    parser.add_argument('--rows', type=int, default=1000, help='artwork rows in the benchmark database (e.g. 1000, 100000, 1000000)')
+    parser.add_argument('--image-size', type=int, default=1024, help='edge length of corpus images')
+    parser.add_argument('--repeat', type=int, default=20, help='timed runs per case')
+    parser.add_argument('--max-seconds', type=float, default=10.0, help='time budget per case (at least 3 runs)')
+    parser.add_argument('--filter', default='', help='only run cases whose name contains this text')
+    parser.add_argument('--workdir', default=None, help='workspace directory (default: benchmarks/.work/<rows>)')
+    parser.add_argument('--output', default=None, help='results JSON path (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--baseline', default=None, help='baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help=f'also write results to {DEFAULT_BASELINE}')
+    parser.add_argument('--threshold', type=float, default=0.15, help='allowed median slowdown before a case counts as a regression')
+    return parser.parse_args(argv)
+
+def prepare_workspace(args):
+    """
+    chdir into the workspace, import the app there and build the corpus
+    Cases write to the database, so every run starts from a fresh copy of the
+    pristine one and baseline and current runs measure the same data
+    """
+    # Resolve user paths before leaving the caller's directory
+    for attr in ('workdir', 'output', 'baseline'):
+        if getattr(args, attr, None):
+            setattr(args, attr, os.path.abspath(getattr(args, attr)))
+    
+    workdir = args.workdir or os.path.join(BENCH_DIR, '.work', str(args.rows))
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    
+    # Keep the pipeline quiet and import the app relative to the workspace
+    os.environ.setdefault('GALLERY_LOG_LEVEL', 'WARNING')
+    sys.path.insert(0, REPO_DIR)
+    import app as app_module
+    from benchmarks.corpus import populate_database, write_image_corpus
+    
+    image_paths = write_image_corpus('corpus', per_kind=2, size=(args.image_size, args.image_size))
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(f'database.db{suffix}'):
+            os.remove(f'database.db{suffix}')
+    if os.path.exists(PRISTINE_DB):
+        shutil.copyfile(PRISTINE_DB, 'database.db')
+    app_module.init_db()
+    
+    conn = sqlite3.connect('database.db')
+    existing = conn.execute('SELECT COUNT(*) FROM artworks').fetchone()[0]
+    conn.close()
+    if existing < args.rows or not os.path.exists(PRISTINE_DB):
+        if existing < args.rows:
+            print(f'Populating database with {args.rows - existing} rows...')
+            populate_database('database.db', args.rows - existing, image_paths)
+        shutil.copyfile('database.db', PRISTINE_DB)
+    
+    return app_module, image_paths
+
+def time_case(func, repeat, max_seconds):
+    """Warm up once, then time up to repeat runs within max_seconds"""
+    func()
+    samples = []
+    deadline = time.perf_counter() + max_seconds
+    while len(samples) < repeat and (len(samples) < 3 or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'runs': len(samples),
+        'min_ms': samples[0],
+        'median_ms': statistics.median(samples),
+        'mean_ms': statistics.fmean(samples),
+        'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+
+def compare(results, baseline, threshold):
+    """Return a list of (name, base_ms, current_ms, ratio, regressed)"""
+    rows = []
+    for name, current in results['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        ratio = current['median_ms'] / base['median_ms'] if base['median_ms'] else float('inf')
+        rows.append((name, base['median_ms'], current['median_ms'], ratio, ratio > 1 + threshold))
+    return rows
+
+def main(argv=None):
+    args = parse_args(argv)
+    app_module, image_paths = prepare_workspace(args)
+    from benchmarks.cases import BENCHMARKS, BenchContext
+    
+    ctx = BenchContext(app_module, image_paths, args.rows, (args.image_size, args.image_size))
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'rows': args.rows,
+            'image_size': args.image_size,
+        },
+        'results': {}
+    }
+    
+    for name, factory in BENCHMARKS:
+        if args.filter and args.filter not in name:
+            continue
+        stats = time_case(factory(ctx), args.repeat, args.max_seconds)
+        results['results'][name] = stats
+        print(f"{name:<50} median {stats['median_ms']:9.3f} ms   p95 {stats['p95_ms']:9.3f} ms   ({stats['runs']} runs)")
+    
+    output = args.output or os.path.join(BENCH_DIR, 'results', f"{datetime.now():%Y%m%d-%H%M%S}-{args.rows}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'Results written to {output}')
+    
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Baseline saved to {DEFAULT_BASELINE}')
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('rows') != args.rows:
+            print(f"⚠️ Baseline was recorded with {baseline.get('meta', {}).get('rows')} rows")
+        regressions = 0
+        print(f"\n{'case':<50} {'baseline':>10} {'current':>10} {'ratio':>7}")
+        for name, base_ms, current_ms, ratio, regressed in compare(results, baseline, args.threshold):
+            flag = '  ❌ REGRESSION' if regressed else ''
+            regressions += regressed
+            print(f'{name:<50} {base_ms:10.3f} {current_ms:10.3f} {ratio:7.2f}{flag}')
+        if regressions:
+            print(f'{regressions} case(s) regressed more than {args.threshold:.0%}')
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -734,22 +734,24 @@ class EditModeManager {
 		}
 		
 		try {
-			const deletePromises = Array.from(this.selectedItems).map(async (id) => {
-				const response = await fetch(`/delete/${id}`, {
-					method: 'POST'
-				});
-				
-				if (response.ok) {
-					const artwork = document.querySelector(`[data-id="${id}"]`);
-					if (artwork) {
-						artwork.remove();
-					}
-				}
-				
-				return response;
+			// One request, one transaction for the whole selection
+			const response = await fetch('/api/artworks/bulk', {
+				method: 'POST',
+				headers: { 'Content-Type': 'application/json' },
+				body: JSON.stringify({
+					operations: Array.from(this.selectedItems).map(id => ({ op: 'delete', id: parseInt(id, 10) }))
+				})
 			});
+			const result = await response.json();
+			if (!response.ok || !result.success) {
+				throw new Error(result.message || `HTTP ${response.status}`);
+			}
 			
-			await Promise.all(deletePromises);
+			result.results.forEach(item => {
+				if (item.status === 'ok' || item.status === 'not_found') {
+					document.querySelector(`[data-id="${item.id}"]`)?.remove();
+				}
+			});
 			
 			this.clearAllSelections();
 			this.updateCounters();
@@ -890,10 +892,13 @@ class EditModeManager {
         const artworks = Array.from(gallery.children);
         const totalCount = artworks.length;
         
-        const order = artworks.map((el, idx) => ({
-            id: el.dataset.id,
-            position: totalCount - idx
-        }));
+        const order = artworks.map((el, idx) => {
+            el.dataset.position = totalCount - idx;
+            return {
+                id: el.dataset.id,
+                position: totalCount - idx
+            };
+        });
         
         try {
             const response = await fetch('/update-order', {
@@ -1141,13 +1146,31 @@ class EditModeManager {
     
     async refreshGalleryInEditMode() {
         try {
-            const response = await fetch('/api/artworks');
-            const data = await response.json();
+            const gallery = document.getElementById('gallery');
+            const since = parseInt(gallery.dataset.version, 10);
+            
+            // Fetch only what changed since the version the page was rendered at
+            let applied = false;
+            if (!Number.isNaN(since)) {
+                const response = await fetch(`/api/artworks/changes?since=${since}`);
+                const changes = await response.json();
+                if (changes.success && !changes.full_resync) {
+                    this.applyGalleryChanges(gallery, changes);
+                    applied = true;
+                }
+            }
+            
+            let data = { success: applied };
+            if (!applied) {
+                const response = await fetch('/api/artworks');
+                data = await response.json();
+                if (data.success) {
+                    gallery.innerHTML = data.artworks.map(artwork => this.createArtworkHTML(artwork)).join('');
+                    gallery.dataset.version = data.version;
+                }
+            }
             
             if (data.success) {
-                const gallery = document.getElementById('gallery');
-                gallery.innerHTML = data.artworks.map(artwork => this.createArtworkHTML(artwork)).join('');
-                
                 // Re-setup based on current mode
                 if (this.currentMode === this.MODES.EDIT_SELECT) {
                     this.addCheckboxes();
@@ -1171,13 +1194,55 @@ class EditModeManager {
         }
     }
     
+    applyGalleryChanges(gallery, changes) {
+        const byId = new Map(
+            Array.from(gallery.querySelectorAll('.artwork')).map(el => [el.dataset.id, el])
+        );
+        
+        changes.deleted.forEach(id => {
+            byId.get(String(id))?.remove();
+            byId.delete(String(id));
+        });
+        
+        [...changes.inserted, ...changes.updated].forEach(artwork => {
+            const template = document.createElement('template');
+            template.innerHTML = this.createArtworkHTML(artwork).trim();
+            const el = template.content.firstElementChild;
+            const existing = byId.get(String(artwork.id));
+            if (existing) {
+                existing.replaceWith(el);
+            } else {
+                gallery.appendChild(el);
+            }
+            byId.set(String(artwork.id), el);
+        });
+        
+        changes.reordered.forEach(({ id, position }) => {
+            const el = byId.get(String(id));
+            if (el) el.dataset.position = position;
+        });
+        
+        // Gallery is rendered by position DESC - only move nodes that are out of place
+        const sorted = Array.from(byId.values())
+            .sort((a, b) => Number(b.dataset.position) - Number(a.dataset.position));
+        sorted.forEach((el, idx) => {
+            if (gallery.children[idx] !== el) {
+                gallery.insertBefore(el, gallery.children[idx] || null);
+            }
+        });
+        
+        gallery.dataset.version = changes.version;
+    }
+    
     createArtworkHTML(artwork) {
         return `
-            <div class="artwork" data-id="${artwork.id}">
-                <div class="artwork-container">
+            <div class="artwork" data-id="${artwork.id}" data-position="${artwork.position}">
+                <div class="artwork-container${artwork.placeholder ? ' has-placeholder' : ''}"
+                     ${artwork.placeholder ? `style="background-image: url('${artwork.placeholder}')"` : ''}>
                     <img data-src="${artwork.thumbnail_path}" 
                          data-full-src="${artwork.image_path}"
                          alt="${artwork.title || ''}" 
+                         ${artwork.width ? `width="${artwork.width}" height="${artwork.height}"` : ''}
                          class="lazy">
                     <div class="artwork-actions">
                         <button class="btn-edit" data-id="${artwork.id}" 
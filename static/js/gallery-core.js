@@ -209,16 +209,138 @@ class NetworkMonitor {
   }
 }
 
+/**
+ * Gallery Event Stream
+ * Subscribes to /api/events (SSE) and applies pushed changes via delta sync.
+ * EventSource resends Last-Event-ID on reconnect, so missed events are replayed.
+ */
+class GalleryEventStream {
+  constructor() {
+    this.source = null;
+    this.eventTypes = ['add', 'edit', 'delete', 'reorder', 'text-update', 'import', 'bulk', 'resync'];
+    this.scheduleSync = debounce(() => this.syncGallery(), 250);
+  }
+
+  connect() {
+    if (!window.EventSource || this.source) return;
+    
+    this.source = new EventSource('/api/events');
+    this.eventTypes.forEach(type => {
+      this.source.addEventListener(type, (event) => this.handleEvent(type, event));
+    });
+  }
+
+  handleEvent(type, event) {
+    let payload = {};
+    try {
+      payload = JSON.parse(event.data);
+    } catch (error) {
+      console.warn('Invalid gallery event payload:', error);
+    }
+    
+    window.dispatchEvent(new CustomEvent('galleryChange', { detail: { type, ...payload } }));
+    
+    // Skip events the rendered grid already reflects (e.g. our own writes)
+    const gallery = document.getElementById('gallery');
+    const currentVersion = parseInt(gallery?.dataset.version, 10);
+    if (Number.isNaN(currentVersion)) return;
+    if (type !== 'resync' && payload.version && payload.version <= currentVersion) return;
+    
+    this.scheduleSync();
+  }
+
+  syncGallery() {
+    if (window.editModeManager?.refreshGalleryInEditMode) {
+      window.editModeManager.refreshGalleryInEditMode();
+    }
+  }
+
+  close() {
+    if (this.source) {
+      this.source.close();
+      this.source = null;
+    }
+  }
+}
+
+/**
+ * Sprite Sheet Loader - paints the first page of thumbnails from one sprite
+ */
+class SpriteSheetLoader {
+  constructor(pageSize = 60) {
+    this.pageSize = pageSize;
+    this.claims = new Map(); // artwork id -> Promise of the loaded sheet
+  }
+
+  /**
+   * Claim the first page of the server-rendered gallery: those thumbnails
+   * wait for the sprite instead of loading one request each
+   */
+  load(gallery, sort = 'position') {
+    if (!gallery || !window.fetch) return;
+
+    const ids = [...gallery.querySelectorAll('.artwork')].slice(0, this.pageSize).map(el => el.dataset.id);
+    if (!ids.length) return;
+
+    const sheet = this.fetchSheet(sort).catch(error => {
+      console.warn('Sprite sheet unavailable, loading thumbnails individually:', error);
+      return null;
+    });
+    ids.forEach(id => this.claims.set(id, sheet));
+  }
+
+  async fetchSheet(sort) {
+    const response = await fetch(`/api/sprites?sort=${sort}&page=0&per_page=${this.pageSize}`);
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    const layout = await response.json();
+    // Not rendered yet for the current page - the thumbnails load one by one
+    if (!layout.sprite) return null;
+
+    const image = new Image();
+    image.src = layout.sprite;
+    await image.decode();
+    return { image, tiles: new Map(layout.tiles.map(tile => [String(tile.id), tile])) };
+  }
+
+  /**
+   * Promise of an object URL with a claimed artwork's tile, or null when the
+   * sprite failed or left it out; undefined if the artwork was not claimed
+   */
+  take(id) {
+    const sheet = this.claims.get(id);
+    if (!sheet) return undefined;
+    this.claims.delete(id);
+
+    return sheet.then(loaded => {
+      const tile = loaded && loaded.tiles.get(id);
+      if (!tile) return null;
+
+      const canvas = document.createElement('canvas');
+      canvas.width = tile.w;
+      canvas.height = tile.h;
+      canvas.getContext('2d').drawImage(loaded.image, tile.x, tile.y, tile.w, tile.h, 0, 0, tile.w, tile.h);
+      return new Promise(resolve => canvas.toBlob(blob => resolve(blob ? URL.createObjectURL(blob) : null)));
+    });
+  }
+}
+
 /**
  * Lazy Image Loader with Intersection Observer
  */
 class LazyImageLoader {
-  constructor() {
+  constructor(sprites = null) {
+    this.sprites = sprites;
     this.imageObserver = new IntersectionObserver((entries, observer) => {
       entries.forEach(entry => {
         if (entry.isIntersecting) {
           const img = entry.target;
-          img.src = img.dataset.src;
+          const artwork = img.closest('.artwork');
+          const tile = this.sprites && artwork ? this.sprites.take(artwork.dataset.id) : undefined;
+          if (tile) {
+            tile.then(url => { img.src = url || img.dataset.src; }, () => { img.src = img.dataset.src; });
+          } else {
+            img.src = img.dataset.src;
+          }
           img.classList.remove('lazy');
           img.classList.add('lazy-loaded');
           observer.unobserve(img);
@@ -838,8 +960,10 @@ class ArtGalleryApp {
       this.managers.theme = new ThemeManager();
       window.themeManager = this.managers.theme;
       
-      // Initialize lazy loader
-      this.managers.lazyLoader = new LazyImageLoader();
+      // Initialize lazy loader; the first page comes from one sprite sheet
+      this.managers.sprites = new SpriteSheetLoader();
+      this.managers.sprites.load(document.getElementById('gallery'));
+      this.managers.lazyLoader = new LazyImageLoader(this.managers.sprites);
       window.lazyLoader = this.managers.lazyLoader;
 
       // Initialize core features (will be extended by UI)
@@ -1158,6 +1282,10 @@ document.addEventListener('DOMContentLoaded', () => {
   // Create global app instance
   window.artGalleryApp = new ArtGalleryApp();
   window.artGalleryApp.init();
+  
+  // Live updates from other editors/viewers
+  window.galleryEvents = new GalleryEventStream();
+  window.galleryEvents.connect();
 });
 
 /**
@@ -573,12 +573,15 @@ class FormHandler {
     const div = document.createElement('div');
     div.className = 'artwork';
     div.dataset.id = artwork.id;
+    div.dataset.position = artwork.position;
     
     div.innerHTML = `
-      <div class="artwork-container">
+      <div class="artwork-container${artwork.placeholder ? ' has-placeholder' : ''}"
+           ${artwork.placeholder ? `style="background-image: url('${artwork.placeholder}')"` : ''}>
         <img data-src="${artwork.thumbnail_path}" 
              data-full-src="${artwork.image_path}"
              alt="${artwork.title || ''}" 
+             ${artwork.width ? `width="${artwork.width}" height="${artwork.height}"` : ''}
              class="lazy">
         <div class="artwork-actions">
           <button class="btn-edit" data-id="${artwork.id}" 
@@ -735,6 +738,7 @@ class FormHandler {
 class SearchSort {
   constructor() {
     this.searchInput = document.getElementById('search-input');
+    this.suggestList = document.getElementById('search-suggestions');
     this.sortSelect = document.getElementById('sort-select');
     this.resultsText = document.getElementById('results-text');
     this.gallery = document.getElementById('gallery');
@@ -743,17 +747,32 @@ class SearchSort {
     this.currentSort = 'newest';
     this.debounceTimer = null;
     
+    // Autocomplete: cheap /api/suggest calls while typing, the gallery
+    // itself is only re-queried on a pause, Enter or a picked suggestion
+    this.suggestTimer = null;
+    this.suggestController = null;
+    this.suggestCache = new Map();
+    
     this.init();
   }
   
   init() {
     if (this.searchInput) {
       this.searchInput.addEventListener('input', (e) => {
+        const value = e.target.value.trim();
+        this.requestSuggestions(value);
+        
+        // Choosing a datalist option fires input without a typing inputType
+        const picked = !e.inputType || e.inputType === 'insertReplacementText';
         clearTimeout(this.debounceTimer);
-        this.debounceTimer = setTimeout(() => {
-          this.currentQuery = e.target.value.trim();
-          this.updateGallery();
-        }, 300);
+        this.debounceTimer = setTimeout(() => this.search(value), picked ? 0 : 600);
+      });
+      
+      this.searchInput.addEventListener('keydown', (e) => {
+        if (e.key === 'Enter') {
+          clearTimeout(this.debounceTimer);
+          this.search(e.target.value.trim());
+        }
       });
     }
     
@@ -775,6 +794,54 @@ class SearchSort {
     });
   }
   
+  search(query) {
+    if (query === this.currentQuery) return;
+    this.currentQuery = query;
+    this.updateGallery();
+  }
+  
+  requestSuggestions(prefix) {
+    clearTimeout(this.suggestTimer);
+    if (!this.suggestList || !prefix) return;
+    
+    const key = prefix.toLowerCase();
+    const cached = this.suggestCache.get(key);
+    if (cached) {
+      this.renderSuggestions(cached);
+      return;
+    }
+    
+    this.suggestTimer = setTimeout(async () => {
+      if (this.suggestController) this.suggestController.abort();
+      this.suggestController = new AbortController();
+      
+      try {
+        const params = new URLSearchParams({ prefix });
+        const response = await fetch(`/api/suggest?${params}`, { signal: this.suggestController.signal });
+        const data = await response.json();
+        
+        if (data.success) {
+          if (this.suggestCache.size > 200) this.suggestCache.clear();
+          this.suggestCache.set(key, data.suggestions);
+          this.renderSuggestions(data.suggestions);
+        }
+      } catch (error) {
+        if (error.name !== 'AbortError') {
+          console.error('Suggest error:', error);
+        }
+      }
+    }, 80);
+  }
+  
+  renderSuggestions(suggestions) {
+    this.suggestList.replaceChildren(...suggestions.map(suggestion => {
+      const option = document.createElement('option');
+      option.value = suggestion.text;
+      option.label = suggestion.kind === 'tag' ? `${suggestion.count}` : `${suggestion.kind} · ${suggestion.count}`;
+      return option;
+    }));
+  }
+  
   async updateGallery() {
     if (this.gallery) {
       this.gallery.style.opacity = '0.5';
@@ -820,6 +887,8 @@ class SearchSort {
   renderResults(artworks) {
     if (this.gallery) {
       this.gallery.innerHTML = artworks.map(artwork => this.createArtworkHTML(artwork)).join('');
+      // A filtered/sorted view can't be patched by delta sync
+      delete this.gallery.dataset.version;
       
       if (window.lazyLoader) {
         const images = this.gallery.querySelectorAll('img.lazy');
@@ -835,11 +904,13 @@ class SearchSort {
   // ✅ FIXED: Updated createArtworkHTML with data-full-src attribute
   createArtworkHTML(artwork) {
     return `
-      <div class="artwork" data-id="${artwork.id}">
-        <div class="artwork-container">
+      <div class="artwork" data-id="${artwork.id}" data-position="${artwork.position}">
+        <div class="artwork-container${artwork.placeholder ? ' has-placeholder' : ''}"
+             ${artwork.placeholder ? `style="background-image: url('${artwork.placeholder}')"` : ''}>
           <img data-src="${artwork.thumbnail_path}" 
                data-full-src="${artwork.image_path}"
                alt="${artwork.title || ''}" 
+               ${artwork.width ? `width="${artwork.width}" height="${artwork.height}"` : ''}
                class="lazy">
           <div class="artwork-actions">
             <button class="btn-edit" data-id="${artwork.id}" 
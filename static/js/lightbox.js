@@ -7,6 +7,9 @@
 // ============================================================================
 
 class LightboxCore {
+    // Must match RESIZE_SIZES on the server
+    static DISPLAY_SIZES = [640, 800, 960, 1080, 1280, 1600, 1920, 2560];
+    
     constructor() {
         this.currentIndex = 0;
         this.images = [];
@@ -513,17 +516,22 @@ class LightboxCore {
         // Update image with loading state
         const img = new Image();
         img.onload = () => {
-            this.elements.image.src = imageData.src;
+            this.elements.image.src = img.src;
             this.elements.image.style.opacity = '1';
             this.log('[SUCCESS] Image loaded successfully');
         };
         
         img.onerror = () => {
+            // Fall back to the original if the rendition cannot be served
+            if (img.src !== new URL(imageData.src, location.href).href) {
+                img.src = imageData.src;
+                return;
+            }
             this.elements.image.style.opacity = '1';
             this.log('[ERROR] Image failed to load');
         };
         
-        img.src = imageData.src;
+        img.src = this.displaySrc(imageData);
         
         // Update title and description - will be handled by editing module
         this.updateTextContent('title', imageData.title);
@@ -544,6 +552,19 @@ class LightboxCore {
         this.updateURLHash(index);
     }
     
+    // Screen-sized rendition from /img instead of the full original
+    displaySrc(imageData) {
+        if (!/^\d+$/.test(imageData.id)) return imageData.src;
+        
+        const dpr = window.devicePixelRatio || 1;
+        const snap = (pixels) => LightboxCore.DISPLAY_SIZES.find(size => size >= pixels) || LightboxCore.DISPLAY_SIZES.at(-1);
+        const width = snap(window.innerWidth * dpr);
+        const height = snap(window.innerHeight * dpr);
+        // The upload's file name changes with the image, so an edit gets a fresh URL
+        const version = imageData.src.split('/').pop().split('.')[0];
+        return `/img/${imageData.id}?w=${width}&h=${height}&v=${encodeURIComponent(version)}`;
+    }
+    
     updateTextContent(type, text) {
         const element = type === 'title' ? this.elements.title : this.elements.description;
         const contentElement = type === 'title' ? this.elements.titleContent : this.elements.descriptionContent;
@@ -1219,6 +1240,8 @@ class LightboxMetadata {
     constructor(lightboxCore) {
         this.core = lightboxCore;
         this.copyTimeouts = new Map();
+        this.cache = new Map();         // artwork id -> metadata (null when none)
+        this.prefetchRadius = 3;        // neighbours fetched and preloaded on each side
         
         this.init();
     }
@@ -1227,6 +1250,9 @@ class LightboxMetadata {
         // Expose methods to core
         this.core.showMetadataLoading = () => this.showMetadataLoading();
         this.core.loadMetadata = (artworkId) => this.loadMetadata(artworkId);
+        
+        // Metadata follows the image file, which edits may replace
+        window.addEventListener('galleryChange', () => this.cache.clear());
     }
     
     showMetadataLoading() {
@@ -1240,22 +1266,59 @@ class LightboxMetadata {
     
     async loadMetadata(artworkId) {
         try {
-            const response = await fetch(`/api/metadata/${artworkId}`);
-            const data = await response.json();
+            if (!this.cache.has(artworkId)) {
+                // Fetch the current image together with its uncached neighbours
+                await this.fetchMetadata([artworkId, ...this.neighbourIds()]);
+            }
             
-            this.hideMetadataLoading();
+            // The user may have paged on while the request was in flight
+            if (this.core.images[this.core.currentIndex]?.id !== artworkId) return;
             
-            if (data.success && data.metadata) {
-                this.displayEnhancedMetadata(data.metadata);
-            } else {
-                this.displayEnhancedMetadata(null);
-            }
+            this.hideMetadataLoading();
+            this.displayEnhancedMetadata(this.cache.get(artworkId) || null);
+            this.prefetchNeighbours();
         } catch (error) {
             this.hideMetadataLoading();
             this.displayEnhancedMetadata(null);
         }
     }
     
+    neighbourIds() {
+        const ids = [];
+        for (let offset = 1; offset <= this.prefetchRadius; offset++) {
+            for (const index of [this.core.currentIndex + offset, this.core.currentIndex - offset]) {
+                const image = this.core.images[index];
+                if (image && /^\d+$/.test(image.id) && !this.cache.has(image.id)) {
+                    ids.push(image.id);
+                }
+            }
+        }
+        return ids;
+    }
+    
+    async fetchMetadata(ids) {
+        const response = await fetch(`/api/metadata?ids=${ids.join(',')}`);
+        const data = await response.json();
+        if (!data.success) throw new Error(data.message);
+        
+        ids.forEach(id => this.cache.set(id, data.metadata[id] || null));
+    }
+    
+    prefetchNeighbours() {
+        // Warm the browser cache with the next/previous full-size images
+        for (let offset = 1; offset <= this.prefetchRadius; offset++) {
+            for (const index of [this.core.currentIndex + offset, this.core.currentIndex - offset]) {
+                const image = this.core.images[index];
+                if (image?.src) new Image().src = this.core.displaySrc(image);
+            }
+        }
+        
+        const ids = this.neighbourIds();
+        if (ids.length) {
+            this.fetchMetadata(ids).catch(error => this.core.log('[WARN] Metadata prefetch failed', error));
+        }
+    }
+    
     displayEnhancedMetadata(metadata) {
         const container = this.core.elements.metadataContent;
         